@@ -1 +1,2 @@
-__import__('pkg_resources').declare_namespace(__name__)
\ No newline at end of file
+# pkgutil-style namespace package ("pkg_resources" is very slow to import)
+__path__ = __import__('pkgutil').extend_path(__path__, __name__)
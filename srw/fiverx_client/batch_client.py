@@ -0,0 +1,105 @@
+
+"""
+Batch mode for "srwlink-client": run many SOAP requests within a single
+process so the HTTP connection, the compiled XML schemas and the settings are
+reused for all requests.
+
+Every (non-empty) line of the manifest contains a JSON object:
+    {"id": "optional", "command": "<subcommand>", "args": ["...", ...]}
+
+For each line one JSON object is written to the output:
+    {"line": 1, "id": ..., "command": ..., "rc": 0, "message": "OK", "payload": "<...>"}
+
+"rc" uses the same exit codes as "srwlink-client" (1 for unexpected errors,
+e.g. missing input files). The batch itself returns the first non-zero exit
+code (or 0 if all commands succeeded).
+"""
+
+import json
+import sys
+
+from docopt import DocoptExit
+from lxml import etree
+
+from .soapclient import preload_schemas
+
+
+__all__ = ['run_batch', 'run_manifest_entry']
+
+def run_batch(manifest_path, settings, global_args, subcommand_modules, *, transport=None, output=None):
+    if output is None:
+        output = sys.stdout
+    preload_schemas()
+    if manifest_path == '-':
+        return _run_manifest(sys.stdin, settings, global_args, subcommand_modules, transport=transport, output=output)
+    with open(manifest_path, 'r', encoding='utf-8') as manifest_fp:
+        return _run_manifest(manifest_fp, settings, global_args, subcommand_modules, transport=transport, output=output)
+
+def _run_manifest(manifest_fp, settings, global_args, subcommand_modules, *, transport, output):
+    batch_rc = 0
+    try:
+        for line_nr, line in enumerate(manifest_fp, start=1):
+            line = line.strip()
+            if (not line) or line.startswith('#'):
+                continue
+            record = run_manifest_entry(line, settings, global_args, subcommand_modules, transport=transport)
+            record['line'] = line_nr
+            output.write(json.dumps(record) + '\n')
+            output.flush()
+            if record['rc'] and (not batch_rc):
+                batch_rc = record['rc']
+    except KeyboardInterrupt:
+        sys.stderr.write('batch cancelled\n')
+        return batch_rc or 1
+    return batch_rc
+
+def run_manifest_entry(line, settings, global_args, subcommand_modules, *, transport=None):
+    # imported here to avoid a circular import (cli_client uses this module)
+    from .cli_client import run_command
+
+    try:
+        entry = json.loads(line)
+    except ValueError as e:
+        return _record(None, None, rc=10, message=f'invalid manifest entry: {e}')
+    if not isinstance(entry, dict):
+        return _record(None, None, rc=10, message='invalid manifest entry: expected JSON object')
+    entry_id = entry.get('id')
+    command_name = entry.get('command')
+    cmd_module = subcommand_modules.get(command_name)
+    if cmd_module is None:
+        return _record(entry_id, command_name, rc=10, message='unknown command')
+    command_args = [str(arg) for arg in entry.get('args', ())]
+
+    # "run_command()" consumes the global arguments so every command needs
+    # its own copy. Human-readable output would garble the JSON records.
+    args = dict(global_args)
+    args.update({
+        '--quiet': True,
+        '--nagios': False,
+        '--print-request': False,
+        '--raw-output': None,
+        '--timings': False,
+    })
+    try:
+        result = run_command(cmd_module, settings, args, command_args, transport=transport, as_result=True)
+    except DocoptExit as e:
+        return _record(entry_id, command_name, rc=10, message=f'invalid arguments: {e}')
+    except SystemExit as e:
+        rc = e.code if isinstance(e.code, int) else 10
+        return _record(entry_id, command_name, rc=rc, message='invalid request')
+    except Exception as e:
+        # e.g. missing input files: a single bad entry must not abort the batch
+        return _record(entry_id, command_name, rc=1, message=f'{type(e).__name__}: {e}')
+
+    document = result.data.get('document')
+    payload = etree.tostring(document, encoding='unicode') if (document is not None) else None
+    return _record(entry_id, command_name, rc=result.value, message=result.message, payload=payload)
+
+def _record(entry_id, command_name, *, rc, message, payload=None):
+    return {
+        'id': entry_id,
+        'command': command_name,
+        'rc': rc,
+        'message': message,
+        'payload': payload,
+    }
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+srwlink-benchmark
+
+Microbenchmarks for the request/response hot paths of the client (building,
+validating, formatting and parsing SOAP messages). No network access is
+needed. Run it before/after an upgrade to spot performance regressions.
+
+For each benchmark the best time of all runs is reported. The peak memory
+is measured in a separate run with "tracemalloc" and only covers memory
+allocated by Python (not by libxml2).
+
+The import time of the command line tools is measured in a fresh Python
+process. The benchmark fails (exit code 1) if it exceeds "--import-budget"
+as every call of "srwlink-client" has to pay for it.
+
+Usage:
+  srwlink-benchmark [options]
+
+Options:
+  --sizes=<sizes>   Comma-separated numbers of prescriptions per envelope [default: 1,100,10000]
+  --repeat=<N>      Number of timed runs per benchmark [default: 3]
+  --filter=<name>   Only run benchmarks whose name contains <name>
+  --import-budget=<ms>  Maximum import time of the command line tools [default: 50]
+  -h, --help        Show this screen
+"""
+
+from base64 import b64encode
+from pathlib import Path
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from docopt import docopt
+from lxml import etree
+
+from . import soapclient
+from .soapclient import (assemble_soap_request, extract_response_payload,
+    parse_soap_envelope, validate_payload)
+from .utils import prettify_xml
+
+
+__all__ = ['benchmark_main', 'run_benchmarks']
+
+FIVERX_NS = 'http://fiverx.de/spec/abrechnungsservice'
+
+HEADER_PARAMS = {
+    'user': '123456789',
+    'password': 'secret-password',
+    'apoik': '123456789',
+    'test': 'true',
+}
+
+# (name, scales_with_size, function) - the function receives the benchmark
+# data and returns a callable which is timed
+BENCHMARKS = []
+# modules which are imported on every start of a command line tool
+IMPORT_BENCHMARKS = (
+    'srw.fiverx_client.cli_client',
+)
+
+def benchmark(name, *, scales=True):
+    def decorator(func):
+        BENCHMARKS.append((name, scales, func))
+        return func
+    return decorator
+
+
+def benchmark_main(argv=sys.argv):
+    arguments = docopt(__doc__, argv=argv[1:])
+    sizes = [int(size) for size in arguments['--sizes'].split(',')]
+    repeat = int(arguments['--repeat'])
+    name_filter = arguments['--filter']
+    import_budget = float(arguments['--import-budget']) / 1000
+
+    rc = 0
+    print('%-40s %8s %12s %14s' % ('benchmark', 'size', 'time [ms]', 'peak mem [KiB]'))
+    for report in run_benchmarks(sizes, repeat=repeat, name_filter=name_filter):
+        peak_memory = report['peak_memory']
+        peak_memory_str = ('%14.1f' % (peak_memory / 1024)) if (peak_memory is not None) else ('%14s' % '-')
+        print('%-40s %8d %12.2f %s' % (
+            report['name'], report['size'], report['seconds'] * 1000, peak_memory_str))
+        if report.get('is_import') and (report['seconds'] > import_budget):
+            print('==> import time exceeds budget (%.0f ms)' % (import_budget * 1000))
+            rc = 1
+        sys.stdout.flush()
+    return rc
+
+def run_benchmarks(sizes, *, repeat=3, name_filter=None):
+    """Yield a dict (name, size, seconds, peak_memory) for every benchmark and
+    size. Benchmarks which do not depend on the number of prescriptions only
+    run once (size 1). Import benchmarks are marked with "is_import" (and
+    have no "peak_memory")."""
+    for module_name in IMPORT_BENCHMARKS:
+        name = f'import {module_name}'
+        if name_filter and (name_filter not in name):
+            continue
+        yield {
+            'name': name,
+            'size': 1,
+            'seconds': min(measure_import_time(module_name) for i in range(max(repeat, 1))),
+            'peak_memory': None,
+            'is_import': True,
+        }
+    # the schemas are compiled once per process, this should not be measured
+    soapclient.preload_schemas()
+    for size in sizes:
+        with BenchmarkData(size) as data:
+            for name, scales, func in BENCHMARKS:
+                if name_filter and (name_filter not in name):
+                    continue
+                if (not scales) and (size != min(sizes)):
+                    continue
+                run = func(data)
+                seconds = min(_measure_time(run) for i in range(max(repeat, 1)))
+                yield {
+                    'name': name,
+                    'size': size if scales else 1,
+                    'seconds': seconds,
+                    'peak_memory': _measure_peak_memory(run),
+                }
+
+# The import of the "srw" namespace package is measured as well (every
+# command has to import it).
+_import_time_code = '''
+import time
+start = time.perf_counter()
+import %s
+print(time.perf_counter() - start)
+'''
+
+def measure_import_time(module_name):
+    "return the time (seconds) to import \"module_name\" in a new Python process"
+    output = subprocess.check_output(
+        [sys.executable, '-c', _import_time_code % module_name], universal_newlines=True)
+    return float(output.strip())
+
+def _measure_time(run):
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+def _measure_peak_memory(run):
+    tracemalloc.start()
+    try:
+        run()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+class BenchmarkData(object):
+    """Generated prescription files, payloads and SOAP responses with "size"
+    prescriptions. All files are removed when the context manager exits."""
+    def __init__(self, size):
+        self.size = size
+        self.tmp_dir = None
+        self._cache = {}
+
+    def __enter__(self):
+        self.tmp_dir = Path(tempfile.mkdtemp(prefix='srwlink-benchmark-'))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        shutil.rmtree(str(self.tmp_dir))
+
+    def _cached(self, key, factory):
+        if key not in self._cache:
+            self._cache[key] = factory()
+        return self._cache[key]
+
+    @property
+    def prescription_paths(self):
+        return self._cached('prescription_paths', self._write_prescriptions)
+
+    def _write_prescriptions(self):
+        paths = []
+        for i in range(self.size):
+            path = self.tmp_dir / f'prescription-{i}.xml'
+            path.write_bytes(prescription_xml(i))
+            paths.append(str(path))
+        return paths
+
+    @property
+    def sendeRezepte_request(self):
+        return self._cached('sendeRezepte_request', lambda: soapclient.sendeRezepte.build_soap_request(
+            HEADER_PARAMS, {'<XML>': self.prescription_paths}, version='01.10'))
+
+    @property
+    def request_path(self):
+        def write_request():
+            path = self.tmp_dir / 'request.xml'
+            path.write_bytes(self.sendeRezepte_request.soap_bytes)
+            return str(path)
+        return self._cached('request_path', write_request)
+
+    @property
+    def response_payload(self):
+        "schema-valid response payload (bytes, ISO-8859-15)"
+        return self._cached('response_payload', lambda: response_payload_xml(self.size))
+
+    @property
+    def response(self):
+        return self._cached('response', lambda: _FakeResponse(soap_response_xml(self.response_payload)))
+
+
+class _FakeResponse(object):
+    status_code = 200
+    headers = {'Content-Type': 'text/xml; charset=UTF-8'}
+
+    def __init__(self, content):
+        self.content = content
+
+
+def prescription_xml(nr):
+    if nr % 10 == 9:
+        return (
+            b'<?xml version="1.0" encoding="UTF-8"?>\n'
+            b'<eDispensierung RezeptId="160.000.000.000.%03d.00">' % (nr % 1000) +
+            b'<Abgabe>' + b'<Position><PZN>01234567</PZN><Menge>1</Menge></Position>' * 10 + b'</Abgabe>'
+            b'</eDispensierung>'
+        )
+    return (
+        b'<?xml version="1.0" encoding="ISO-8859-15"?>\n'
+        b'<eMuster16><rezeptTyp>STANDARDREZEPT</rezeptTyp><muster16Id>%d</muster16Id>' % nr +
+        b'<abgabeDatum>2020-01-01</abgabeDatum><bemerkung>\xc4rztliche Verordnung</bemerkung>' +
+        b'<position><pzn>01234567</pzn><menge>1</menge><preis>12.34</preis></position>' * 5 +
+        b'</eMuster16>'
+    )
+
+def response_payload_xml(size):
+    "rzeRetLeistung (no upper limit for the number of eRezept elements)"
+    erezept_data = b64encode(prescription_xml(9)).decode('ascii')
+    root = etree.Element(f'{{{FIVERX_NS}}}rzeRetLeistung', nsmap={None: FIVERX_NS})
+    ret_header = etree.SubElement(root, f'{{{FIVERX_NS}}}retHeader')
+    for tag, value in (('rzKdNr', '123456789'), ('rzIk', '123456789'), ('apoIk', '123456789')):
+        etree.SubElement(ret_header, f'{{{FIVERX_NS}}}{tag}').text = value
+    for i in range(size):
+        inhalt = etree.SubElement(root, f'{{{FIVERX_NS}}}rzRetLeistungInhalt')
+        erezept = etree.SubElement(inhalt, f'{{{FIVERX_NS}}}eRezept')
+        etree.SubElement(erezept, f'{{{FIVERX_NS}}}eRezeptId').text = f'160.000.000.000.{i:03d}'
+        etree.SubElement(erezept, f'{{{FIVERX_NS}}}eRezeptData').text = erezept_data
+    return etree.tostring(root, xml_declaration=True, encoding='ISO-8859-15', pretty_print=True)
+
+def soap_response_xml(payload_bytes):
+    payload_str = payload_bytes.decode('ISO-8859-15')
+    envelope = etree.Element('{http://schemas.xmlsoap.org/soap/envelope/}Envelope')
+    body = etree.SubElement(envelope, '{http://schemas.xmlsoap.org/soap/envelope/}Body')
+    method = etree.SubElement(body, '{http://fiverx.de/spec/abrechnungsservice/types}ladeRezeptResponse')
+    etree.SubElement(method, 'result').text = payload_str
+    return etree.tostring(envelope, xml_declaration=True, encoding='UTF-8')
+
+response_payload_xpath = '//fiverx:ladeRezeptResponse/result'
+
+
+# --- request building --------------------------------------------------------
+def _build(cmd_module, command_args):
+    def run(data):
+        # input files must be generated before the time is measured
+        args = command_args(data)
+        return lambda: cmd_module.build_soap_xml(HEADER_PARAMS, args, version='01.10')
+    return run
+
+benchmark('build_soap_xml: ladeRzDienste', scales=False)(
+    _build(soapclient.ladeRzDienste, lambda data: {}))
+benchmark('build_soap_xml: ladeRzVersion', scales=False)(
+    _build(soapclient.ladeRzVersion, lambda data: {}))
+benchmark('build_soap_xml: ladeStatusRezept', scales=False)(
+    _build(soapclient.ladeStatusRezept, lambda data: {
+        'lieferung': True, 'erezept': False, 'muster16': False, 'prezept': False, '<LIEFERID>': '42'}))
+
+@benchmark('prepared request: ladeStatusRezept', scales=False)
+def _prepared_ladeStatusRezept(data):
+    prepared = soapclient.ladeStatusRezept.prepare_request(HEADER_PARAMS, version='01.10')
+    query_perLieferID = soapclient.ladeStatusRezept.query_perLieferID
+    return lambda: prepared.build(query_perLieferID('42', 'ALLE')).soap_bytes
+
+benchmark('build_soap_xml: storniereRezept', scales=False)(
+    _build(soapclient.storniereRezept, lambda data: {
+        'muster16': True, 'prezept': False, '<MUSTER16ID>': '1234567890'}))
+benchmark('build_soap_xml: pruefeRezept', scales=False)(
+    _build(soapclient.pruefeRezept, lambda data: {'<XML>': data.prescription_paths[0], '--async': False}))
+benchmark('build_soap_xml: sendeRezepte')(
+    _build(soapclient.sendeRezepte, lambda data: {'<XML>': data.prescription_paths}))
+benchmark('build_soap_xml: raw')(
+    _build(soapclient.raw, lambda data: {'<XML>': data.request_path}))
+
+@benchmark('stream request: sendeRezepte')
+def _stream_sendeRezepte(data):
+    xml_paths = data.prescription_paths
+    def run():
+        soap_request = soapclient.sendeRezepte.build_streaming_request(
+            HEADER_PARAMS, {'<XML>': xml_paths}, version='01.10')
+        for chunk in soap_request.iter_chunks():
+            pass
+    return run
+
+@benchmark('build_soap_request: sendeRezepte')
+def _build_soap_request_sendeRezepte(data):
+    command_args = {'<XML>': data.prescription_paths}
+    return lambda: soapclient.sendeRezepte.build_soap_request(HEADER_PARAMS, command_args, version='01.10').soap_bytes
+
+@benchmark('assemble_soap_request')
+def _assemble_soap_request(data):
+    payload = data.sendeRezepte_request.payload
+    return lambda: assemble_soap_request('sendeRezepte', payload, version='01.10')
+
+@benchmark('assemble_soap_request (minimized)')
+def _assemble_soap_request_minimized(data):
+    payload = data.sendeRezepte_request.payload
+    return lambda: assemble_soap_request('sendeRezepte', payload, minimized=True, version='01.10')
+
+
+# --- response processing -----------------------------------------------------
+@benchmark('validate_payload 01.08')
+def _validate_payload_0108(data):
+    payload = data.response_payload
+    return lambda: validate_payload(payload, version='01.08')
+
+@benchmark('validate_payload 01.10')
+def _validate_payload_0110(data):
+    payload = data.response_payload
+    return lambda: validate_payload(payload, version='01.10')
+
+@benchmark('prettify_xml')
+def _prettify_xml(data):
+    payload = data.response_payload
+    return lambda: prettify_xml(payload)
+
+@benchmark('extract_response_payload')
+def _extract_response_payload(data):
+    root = parse_soap_envelope(data.response.content)
+    return lambda: extract_response_payload(root, response_payload_xpath)
+
+@benchmark('parse_soap_response')
+def _parse_soap_response(data):
+    response = data.response
+    return lambda: soapclient.parse_soap_response(response, response_payload_xpath, version='01.10')
+
+
+if __name__ == '__main__':
+    sys.exit(benchmark_main())
@@ -11,9 +11,11 @@ Options:
   --no-cert-verification    disable TLS certificate verification
   --config=<config> Specify config file
   --print-request  Also print the request payload
+  --raw-output=<path>  Write the unformatted response payload to <path> ("-": stdout)
   --api-version=<apoti_version>  Version of the ApoTI protocol [default: 01.10]
   --quiet          Suppress all output
-  --nagios         Use nagios-compatible return codes/output
+  --nagios         Use nagios-compatible return codes/output (with perfdata)
+  --timings        Write the duration of each phase as JSON to stderr
   -h, --help       Show this screen
   --test           Set "test" flag
 
@@ -25,26 +27,34 @@ Exit codes:
  22    response data is not well-formed XML
  23    invalid XML response (XML Schema)
 
+Batch mode:
+  srwlink-client [options] batch <MANIFEST>
+
+  Runs all commands listed in the manifest file ("-" reads from stdin) within
+  a single process. Each line contains a JSON object like
+      {"id": "optional", "command": "ladeStatusRezept", "args": ["erezept", "123"]}
+  and results are written as JSON lines to stdout.
+
 Subcommands:
 """
 # subcommand names are added automatically
 
-import cgi
 from configparser import ConfigParser
 import functools
+import json
 from pathlib import Path
 import re
 import sys
 from urllib.parse import urlparse
 
 from docopt import docopt, DocoptExit
-from lxml import etree
-from requests.exceptions import RequestException
 
+# "soapclient" only imports the (heavy) submodules when they are used so
+# "--help" or a missing config file do not load lxml/requests at all.
 from . import soapclient
-from .lib import Result
+from .lib import Result, Timings
 from .utils import (is_colorama_available, parse_command_args, prettify_xml,
-    strip_xml_encoding, textcolor, TermColor)
+    textcolor, TermColor)
 
 
 __all__ = ['client_main']
@@ -56,10 +66,11 @@ class NagiosRC:
     UNKNOWN  = 3
 _N = NagiosRC
 
+# response data is parsed in chunks of this size with "--records"
+RECORDS_CHUNK_SIZE = 64 * 1024
+
 def client_main(argv=sys.argv):
-    submodules = [getattr(soapclient, c) for c in sorted(dir(soapclient))]
-    available_subcommands = [m for m in submodules if hasattr(m, 'build_soap_xml')]
-    subcommand_names = [m.__name__.rsplit('.', 1)[-1] for m in available_subcommands]
+    subcommand_names = sorted(soapclient.SUBCOMMANDS)
     # add all available subcommands to __doc__ so we never have to list them
     # explicitely
     indent = lambda s: '    ' + s
@@ -74,6 +85,9 @@ def client_main(argv=sys.argv):
     #     srwlink-client --config=... ladeRzDienste --help
     if ('--help' in _cmd_args) or (subcommand == 'help'):
         docopt(client_doc, ('--help',))
+    is_batch = (subcommand == 'batch')
+    if is_batch and (len(_cmd_args) != 1):
+        raise DocoptExit('batch mode requires exactly one manifest file')
 
     settings = load_settings(arguments)
     if not settings:
@@ -84,24 +98,42 @@ def client_main(argv=sys.argv):
     del arguments['--config']
     del arguments['--help']
 
-    cmd_module = None
-    subcommand_modules = dict(zip(subcommand_names, available_subcommands))
-    for command_name in subcommand_names:
-        is_active_command = (subcommand == command_name)
-        if is_active_command:
-            module = subcommand_modules[command_name]
-            cmd_module = module
-    if cmd_module is None:
+    if is_batch:
+        from .batch_client import run_batch
+        subcommand_modules = {name: getattr(soapclient, name) for name in subcommand_names}
+        transport = soapclient.Transport.from_settings(settings)
+        manifest_path, = _cmd_args
+        return run_batch(manifest_path, settings, arguments, subcommand_modules, transport=transport)
+
+    if subcommand not in subcommand_names:
         raise DocoptExit('unexpected command')
+    # only the selected subcommand is imported
+    cmd_module = getattr(soapclient, subcommand)
+    transport = soapclient.Transport.from_settings(settings)
 
-    rc = run_command(cmd_module, settings, arguments, _cmd_args)
+    rc = run_command(cmd_module, settings, arguments, _cmd_args, transport=transport)
     if hasattr(rc, 'nagios'):
         # used for "--nagios"
         print(rc.message)
         return rc.nagios
     return rc
 
-def run_command(cmd_module, settings, global_args, command_args):
+def run_command(cmd_module, settings, global_args, command_args, *, transport=None, as_result=False, timings=None):
+    show_timings = global_args.pop('--timings', False)
+    nagios_output = global_args.get('--nagios')
+    if (timings is None) and (show_timings or nagios_output):
+        timings = Timings()
+    with Timings.or_null(timings).measure('total'):
+        result = _run_command(cmd_module, settings, global_args, command_args,
+            transport=transport, as_result=as_result, timings=timings)
+    if show_timings:
+        sys.stderr.write(json.dumps(timings.as_dict()) + '\n')
+    if nagios_output and hasattr(result, 'nagios'):
+        result.message = f'{result.message} | {timings.perfdata()}'
+    return result
+
+def _run_command(cmd_module, settings, global_args, command_args, *, transport, as_result, timings):
+    timer = Timings.or_null(timings)
     use_chunking = global_args.pop('--chunked')
     is_test_request = global_args.pop('--test')
     print_request = global_args.pop('--print-request')
@@ -110,30 +142,46 @@ def run_command(cmd_module, settings, global_args, command_args):
     assert (api_version in ('01.08', '01.10'))
     quiet = global_args.pop('--quiet')
     nagios_output = global_args.pop('--nagios')
+    raw_output = global_args.pop('--raw-output', None)
     if quiet or nagios_output:
         assert (not print_request)
+    if raw_output == '-':
+        # stdout must only contain the payload
+        assert (not print_request) and (not nagios_output)
+        quiet = True
     if nagios_output:
         quiet = True
     command_args = parse_command_args(cmd_module.__doc__, command_args, global_args)
 
-    soap_user, apo_ik = get_soap_user_and_apo_ik(settings)
-    header_params = {
-        'user': soap_user,
-        'password': settings['soap_password'],
-        'apoik': apo_ik,
-        'test': 'true' if is_test_request else 'false',
-    }
-    soap_builder = getattr(cmd_module, 'build_soap_xml')
-    soap_xml = soap_builder(header_params, command_args, version=api_version)
-
-    _R = functools.partial(_result_or_value, use_nagios_output=nagios_output)
-    request_payload_xpath = guess_payload_xpath(soap_xml)
-    is_valid = validate_prettified_request(soap_xml, request_payload_xpath)
-    if print_request:
-        print_soap_request(is_valid.payload_xml, is_valid=is_valid)
-        print('-------------------------------------------------------------')
-    if not is_valid:
-        return _R(10, nagios=_N.UNKNOWN, message='Invalid SOAP request')
+    header_params = build_header_params(settings, is_test_request=is_test_request)
+    _R = functools.partial(_result_or_value, use_nagios_output=(nagios_output or as_result))
+    is_streaming = bool(command_args.get('--stream'))
+    if is_streaming:
+        # The request is generated while sending so there is no way to
+        # validate (or print) it upfront.
+        assert (not print_request)
+        soap_builder = cmd_module.build_streaming_request
+    else:
+        soap_builder = getattr(cmd_module, 'build_soap_request')
+    try:
+        with timer.measure('build_request'):
+            soap_request = soap_builder(header_params, command_args, version=api_version)
+    except soapclient.InvalidInputError as e:
+        if not quiet:
+            with textcolor(TermColor.Fore.RED):
+                print(e)
+        return _R(10, nagios=_N.UNKNOWN, message=str(e))
+    if is_streaming:
+        soap_data = soap_request
+    else:
+        with timer.measure('validate_request'):
+            is_valid = validate_request(soap_request)
+        if print_request:
+            print_soap_request(soap_request.payload, is_valid=is_valid)
+            print('-------------------------------------------------------------')
+        if not is_valid:
+            return _R(10, nagios=_N.UNKNOWN, message='Invalid SOAP request')
+        soap_data = soap_request.soap_bytes
 
     ws_url = settings['url']
     hostname = settings.get('hostname')
@@ -141,8 +189,9 @@ def run_command(cmd_module, settings, global_args, command_args):
         verify_cert = False
         if not hostname:
             msg = f'web service URL "{ws_url}" references specific IP address but no hostname set in config'
-            with textcolor(TermColor.Fore.YELLOW):
-                print(msg)
+            if not quiet:
+                with textcolor(TermColor.Fore.YELLOW):
+                    print(msg)
             if nagios_output:
                 return _R(10, nagios=_N.WARNING, message=msg)
     elif hostname:
@@ -154,24 +203,47 @@ def run_command(cmd_module, settings, global_args, command_args):
         if nagios_output:
             return _R(10, nagios=_N.WARNING, message=msg)
     payload_xpath = getattr(cmd_module, 'response_payload_xpath')
+    iter_records = None
+    if command_args.get('--records'):
+        iter_records = getattr(cmd_module, 'iter_response_records')
     return submit_soap_request(
         ws_url,
-        soap_xml,
+        soap_data,
         payload_xpath = payload_xpath,
         use_chunking  = use_chunking,
         verify_cert   = verify_cert,
         hostname      = hostname,
         nagios_output = nagios_output,
         quiet         = quiet,
+        transport     = transport,
+        as_result     = as_result,
+        raw_output    = raw_output,
+        iter_records  = iter_records,
+        timings       = timings,
+        idempotent    = getattr(cmd_module, 'is_idempotent', False),
     )
 
 
-def submit_soap_request(ws_url, soap_xml, payload_xpath, *, use_chunking=False, verify_cert=True, quiet=False, nagios_output=False, hostname=None):
-    _R = functools.partial(_result_or_value, use_nagios_output=nagios_output)
+def submit_soap_request(ws_url, soap_xml, payload_xpath, *, use_chunking=False, verify_cert=True, quiet=False, nagios_output=False, hostname=None, transport=None, as_result=False, raw_output=None, iter_records=None, timings=None, idempotent=False):
+    import cgi
+    from requests.exceptions import RequestException
+
+    _R = functools.partial(_result_or_value, use_nagios_output=(nagios_output or as_result))
 
     try:
-        response = soapclient.send_request(ws_url, soap_xml, use_chunking, verify_cert=verify_cert, hostname=hostname)
+        response = soapclient.send_request(ws_url, soap_xml, use_chunking,
+            verify_cert = verify_cert,
+            hostname    = hostname,
+            transport   = transport,
+            stream      = (iter_records is not None),
+            timings     = timings,
+            idempotent  = idempotent,
+        )
     except KeyboardInterrupt:
+        if as_result:
+            # callers which process many requests need to know that the user
+            # wants to stop
+            raise
         # avoid ugly traceback when user cancels request with Ctrl+C
         if not quiet:
             with textcolor(TermColor.Fore.YELLOW):
@@ -196,7 +268,10 @@ def submit_soap_request(ws_url, soap_xml, payload_xpath, *, use_chunking=False,
                 else:
                     print(response.content)
         return _R(21, nagios=_N.CRITICAL, message=msg)
-    result = process_soap_response(response, payload_xpath, quiet=quiet)
+    if iter_records is not None:
+        result = print_response_records(response, iter_records, quiet=quiet, timings=timings)
+    else:
+        result = process_soap_response(response, payload_xpath, quiet=quiet, raw_output=raw_output, timings=timings)
     return _R(result)
 
 def _result_or_value(value, *, use_nagios_output, nagios=None, message=None):
@@ -242,6 +317,16 @@ def parse_config(config_path):
     settings = dict(config.items('srw.link'))
     return settings
 
+def build_header_params(settings, *, is_test_request=False):
+    soap_user, apo_ik = get_soap_user_and_apo_ik(settings)
+    header_params = {
+        'user': soap_user,
+        'password': settings['soap_password'],
+        'apoik': apo_ik,
+        'test': 'true' if is_test_request else 'false',
+    }
+    return header_params
+
 def get_soap_user_and_apo_ik(settings):
     soap_user = settings.get('soap_user')
     apo_ik = settings.get('soap_apoik')
@@ -261,65 +346,90 @@ def contains_hostname(url_str):
     contains_ipv4 = ipv4_regex.match(url.hostname)
     return not contains_ipv4
 
-def guess_payload_xpath(soap_xml):
-    root = etree.fromstring(strip_xml_encoding(soap_xml))
-    fiverx_root = soapclient.match_xpath(root, '//soap:Body/fiverx:*')
-    assert fiverx_root is not None
-    simple_name = fiverx_root.tag.split('}', 1)[-1]
-    return '//soap:Body/fiverx:%s/*' % simple_name
-
-def validate_prettified_request(soap_xml, payload_xpath):
-    root = etree.fromstring(strip_xml_encoding(soap_xml))
-    payload_xml_str = soapclient.extract_response_payload(root, payload_xpath)
-    prettified_xml = prettify_xml(payload_xml_str)
-    match = re.search(r'&lt;versionNr&gt;(01\.\d{2})&lt;/versionNr&gt;', soap_xml)
-    if match:
-        version = match.group(1)
-    else:
-        # This can happen for "ladeRzVersion"
-        version = '01.10'
-
-    is_valid = soapclient.validate_payload(prettified_xml, version=version)
-    is_valid.data['payload_xml'] = prettified_xml
-    return is_valid
+def validate_request(soap_request):
+    """Validate the payload of "soap_request" (the payload tree is used
+    directly so the request is not parsed again)."""
+    return soapclient.validate_document(soap_request.payload, version=soap_request.payload_version)
 
-def print_soap_request(payload_xml, *, is_valid):
+def print_soap_request(payload, *, is_valid):
     xml_color = TermColor.Fore.GREEN if is_valid else TermColor.Fore.RED
     with textcolor(xml_color):
-        print(payload_xml)
+        print(prettify_xml(payload))
 
-def process_soap_response(response, payload_xpath, *, quiet=False):
+def process_soap_response(response, payload_xpath, *, quiet=False, raw_output=None, timings=None):
     if (response.status_code != 200) and not quiet:
         print('Status Code: %r' % response.status_code)
-    response_body = response.text.strip()
-    contains_xml = response_body.startswith('<')
-    if contains_xml:
-        # If the server response starts with an XML encoding declaration this
-        # will lead to an lxml exception because "response_body" is already
-        # a string. Just ignore the XML encoding by stripping it.
-        try:
-            root = etree.fromstring(strip_xml_encoding(response_body))
-        except:
-            if not quiet:
-                with textcolor(TermColor.Fore.RED):
-                    print(response_body)
-            return Result(22, nagios=_N.CRITICAL, message='response data is not well-formed XML')
-        payload_xml_str = soapclient.extract_response_payload(root, payload_xpath)
-        prettified_xml = prettify_xml(payload_xml_str or response_body)
-        is_valid = soapclient.validate_payload(prettified_xml)
-        xml_color = TermColor.Fore.GREEN if is_valid else TermColor.Fore.RED
+    # The response is parsed only once (from bytes), the payload is validated
+    # while parsing and printed from the resulting tree.
+    result = soapclient.parse_soap_response(response, payload_xpath, timings=timings)
+    if result.payload is None:
         if not quiet:
-            with textcolor(xml_color):
-                print(prettified_xml)
+            print(response.text.strip())
+        return Result(22, nagios=_N.CRITICAL, message=result.message)
 
-        if not is_valid:
-            if not quiet:
-                error_color = (TermColor.Style.BRIGHT + xml_color) if is_colorama_available else None
-                with textcolor(error_color):
-                    print('==> INVALID XML in server response!')
-            return Result(23, nagios=_N.CRITICAL, message='invalid XML response (XML Schema)')
-        return Result(0, nagios=_N.OK, message='OK', document=is_valid.validated_document)
-    else:
+    if raw_output:
+        write_raw_payload(result.payload, raw_output)
+    is_valid = (result.document is not None)
+    xml_color = TermColor.Fore.GREEN if is_valid else TermColor.Fore.RED
+    # Formatting large payloads is expensive so this is only done if the
+    # output is actually shown.
+    if not quiet:
+        if is_valid:
+            prettified_xml = prettify_xml(result.document)
+        else:
+            # schema violation (or no payload found at all)
+            prettified_xml = _prettify_invalid_xml(result.payload or response.content)
+        with textcolor(xml_color):
+            print(prettified_xml)
+
+    if not is_valid:
         if not quiet:
-            print(response_body)
-        return Result(22, nagios=_N.CRITICAL, message='response data is not well-formed XML')
+            error_color = (TermColor.Style.BRIGHT + xml_color) if is_colorama_available else None
+            with textcolor(error_color):
+                print('==> INVALID XML in server response!')
+        return Result(23, nagios=_N.CRITICAL, message=result.message)
+    return Result(0, nagios=_N.OK, message='OK', document=result.document)
+
+def print_response_records(response, iter_records, *, quiet=False, timings=None):
+    """Print each record of the (streamed) response as JSON line as soon as it
+    was received."""
+    from lxml import etree
+
+    if (response.status_code != 200) and not quiet:
+        # stdout should only contain JSON records
+        sys.stderr.write('Status Code: %r\n' % response.status_code)
+    nr_records = 0
+    # the response is downloaded while parsing so both are measured together
+    with Timings.or_null(timings).measure('parse_response'):
+        try:
+            for record in iter_records(response.iter_content(chunk_size=RECORDS_CHUNK_SIZE)):
+                nr_records += 1
+                if not quiet:
+                    print(json.dumps(record, ensure_ascii=False), flush=True)
+        except etree.XMLSyntaxError:
+            return Result(22, nagios=_N.CRITICAL, message='response data is not well-formed XML')
+        except ValueError as e:
+            return Result(23, nagios=_N.CRITICAL, message=f'invalid XML response ({e})')
+        finally:
+            response.close()
+    return Result(0, nagios=_N.OK, message=f'OK ({nr_records} records)')
+
+def write_raw_payload(payload, output_path):
+    """Write the payload to a file or stdout ('-'). The payload is the
+    unescaped text of the SOAP response re-encoded as UTF-8 (without XML
+    declaration), not the bytes sent by the server."""
+    if output_path == '-':
+        sys.stdout.flush()
+        sys.stdout.buffer.write(payload)
+        sys.stdout.buffer.flush()
+        return
+    with open(output_path, 'wb') as output_fp:
+        output_fp.write(payload)
+
+def _prettify_invalid_xml(xml_bytes):
+    from lxml import etree
+
+    try:
+        return prettify_xml(xml_bytes)
+    except etree.XMLSyntaxError:
+        return xml_bytes.decode('UTF-8', errors='replace')
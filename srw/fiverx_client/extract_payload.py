@@ -11,47 +11,93 @@ This can help to answer questions like:
 
 Usage:
   srwlink-extract-payload [options] <filename>
+
+Options:
+  --raw         Write the payload unformatted while it is read (captures
+                do not have to fit into memory)
+  -h, --help    Show this screen
 """
-import re
 import sys
 
 from docopt import docopt
-from lxml import etree
+from lxml.etree import XMLPullParser, XMLSyntaxError
 
-from .soapclient import match_xpath, validate_payload
+from .lib import Result
+from .soapclient import get_schema, get_validating_parser, iter_payload_chunks
+from .soapclient.streaming import STREAM_CHUNK_SIZE
 from .utils import is_colorama_available, prettify_xml, textcolor, TermColor
 
 
+PAYLOAD_CONTAINERS = ('sendeRezepte', 'pruefeRezept', 'sendeRezepteResponse')
+
 def extract_payload_main(argv=sys.argv):
     arguments = docopt(__doc__, argv=argv[1:])
     input_fn = arguments['<filename>']
-    with open(input_fn, 'rb') as input_fp:
-        content_bytes = input_fp.read().strip()
-    soap_envelope = etree.fromstring(content_bytes)
-    soap_body = match_xpath(soap_envelope, '//soap:Body')
-    fiverx_root, = tuple(soap_body)
-
-    fiverx_tag = fiverx_root.tag
-    match = re.match('\{(.+)\}(.+)', fiverx_tag)
-    ns_qualifier, tag_name = match.groups()
-
-    if tag_name in ('sendeRezepte', 'pruefeRezept'):
-        rze_leistung, rze_param_version = tuple(fiverx_root)
-        fiverx_xml = rze_leistung.text
+    payload_chunks = iter_capture_payload(input_fn)
+    if arguments['--raw']:
+        result = write_payload(payload_chunks, sys.stdout.buffer, version='01.10')
     else:
-        assert (tag_name == 'sendeRezepteResponse')
-        fiverx_container, = tuple(fiverx_root)
-        fiverx_xml = fiverx_container.text
-
-    result = validate_payload(fiverx_xml, version='01.10')
+        result = parse_payload(payload_chunks, version='01.10')
     if not result:
         xml_color = TermColor.Fore.RED
         error_color = (TermColor.Style.BRIGHT + xml_color) if is_colorama_available else None
+        # the raw payload was written to stdout already
+        error_fp = sys.stderr if arguments['--raw'] else sys.stdout
         with textcolor(error_color):
-            print('invalid fiverx xml:')
+            print('invalid fiverx xml:', file=error_fp)
             for error in result.errors:
-                print('    ' + str(error))
+                print('    ' + str(error), file=error_fp)
         return
+    if not arguments['--raw']:
+        print(prettify_xml(result.validated_document))
+
+
+def iter_capture_payload(input_fn, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the fiverx payload of the recorded SOAP request/response as UTF-8
+    bytes. The capture is read in chunks and the SOAP envelope is parsed
+    incrementally so neither the capture nor the payload (a single text node
+    within the envelope) are kept in memory as a whole."""
+    def is_container(tag):
+        return tag.rsplit('}', 1)[-1] in PAYLOAD_CONTAINERS
+
+    def iter_file_chunks():
+        with open(input_fn, 'rb') as capture_fp:
+            yield from iter(lambda: capture_fp.read(chunk_size), b'')
+    return iter_payload_chunks(iter_file_chunks(), is_container=is_container)
+
+def parse_payload(payload_chunks, *, version):
+    "parse and validate the payload, returns a Result with the validated document"
+    parser = get_validating_parser(version)
+    try:
+        for chunk in payload_chunks:
+            parser.feed(chunk)
+        validated_document = parser.close()
+    except XMLSyntaxError as e:
+        return Result(False, errors=[e])
+    return Result(True, validated_document=validated_document, errors=None)
+
+def write_payload(payload_chunks, output, *, version):
+    """Write the payload to "output" while it is validated. Processed elements
+    are discarded so the memory usage does not depend on the payload size.
+    Returns a Result (with the validation errors if the payload is invalid)."""
+    parser = XMLPullParser(events=('end',), schema=get_schema(version))
+    try:
+        for chunk in payload_chunks:
+            output.write(chunk)
+            parser.feed(chunk)
+            _discard_processed_elements(parser)
+        parser.close()
+    except XMLSyntaxError as e:
+        return Result(False, errors=[e])
+    finally:
+        output.flush()
+    return Result(True, errors=None)
 
-    xml = prettify_xml(fiverx_xml)
-    print(xml)
+def _discard_processed_elements(parser):
+    for event, element in parser.read_events():
+        element.clear(keep_tail=True)
+        parent = element.getparent()
+        if parent is None:
+            continue
+        while element.getprevious() is not None:
+            del parent[0]
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta as TimeDelta
+import json
+import os
+import threading
+import time
+
+from soapfish import xsd
+
+
+__all__ = ['FetchCheckpoint']
+
+STATE_FILENAME = '.fiverx-fetch-state.json'
+IDS_FILENAME = '.fiverx-fetch-ids.txt'
+# The "since" timestamp for the next run is slightly earlier than the start
+# of the last successful run to compensate for clock differences between
+# client and server. Prescriptions fetched twice are skipped anyway.
+SINCE_OVERLAP = TimeDelta(minutes=10)
+
+class FetchCheckpoint(object):
+    """Local state of "fiverx-fetch-prescriptions" so an aborted run can be
+    resumed without storing prescriptions again.
+
+    The state consists of two files in the export directory:
+      - a JSON file with the start time of the last complete run
+      - an append-only index with the ids (and storage time) of the stored
+        prescriptions. Ids which can not be returned by the next run are
+        removed when a run is completed.
+    """
+    def __init__(self, export_dir):
+        self.state_path = os.path.join(export_dir, STATE_FILENAME)
+        self.ids_path = os.path.join(export_dir, IDS_FILENAME)
+        self.last_success = None
+        # prescription id -> time when it was stored (seconds since epoch)
+        self._stored_ids = {}
+        self._lock = threading.Lock()
+        self._ids_fp = None
+
+    @classmethod
+    def load(cls, export_dir):
+        checkpoint = cls(export_dir)
+        if os.path.exists(checkpoint.state_path):
+            with open(checkpoint.state_path, 'r', encoding='utf-8') as state_fp:
+                state = json.load(state_fp)
+            last_success = state.get('last_success')
+            if last_success:
+                checkpoint.last_success = xsd.DateTime().pythonvalue(last_success)
+        if os.path.exists(checkpoint.ids_path):
+            with open(checkpoint.ids_path, 'r', encoding='utf-8') as ids_fp:
+                for line in ids_fp:
+                    if not line.strip():
+                        continue
+                    id_str, _, stored_at = line.strip().partition('\t')
+                    # older versions did not store the time
+                    checkpoint._stored_ids[id_str] = float(stored_at) if stored_at else None
+        return checkpoint
+
+    def resume_since(self):
+        if self.last_success is None:
+            return None
+        return self.last_success - SINCE_OVERLAP
+
+    def is_stored(self, prescription_id):
+        return (str(prescription_id) in self._stored_ids)
+
+    def mark_stored(self, prescription_id):
+        # might be called from multiple writer threads
+        id_str = str(prescription_id)
+        stored_at = time.time()
+        with self._lock:
+            if self._ids_fp is None:
+                self._ids_fp = open(self.ids_path, 'a', encoding='utf-8')
+            self._ids_fp.write('%s\t%d\n' % (id_str, stored_at))
+            # each line is flushed so a crash loses at most the last id
+            self._ids_fp.flush()
+            self._stored_ids[id_str] = stored_at
+
+    def mark_run_completed(self, started_at):
+        state = {'last_success': xsd.DateTime().xmlvalue(started_at)}
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as state_fp:
+            json.dump(state, state_fp)
+        os.replace(tmp_path, self.state_path)
+        self.last_success = started_at
+        self._prune_ids(self.resume_since())
+
+    def _prune_ids(self, since):
+        # The next run only returns prescriptions created after "since" so
+        # ids stored before that time are not needed anymore.
+        min_stored_at = since.timestamp()
+        with self._lock:
+            if self._ids_fp is not None:
+                self._ids_fp.close()
+                self._ids_fp = None
+            self._stored_ids = {
+                id_str: stored_at for id_str, stored_at in self._stored_ids.items()
+                if (stored_at is not None) and (stored_at >= min_stored_at)
+            }
+            if not os.path.exists(self.ids_path):
+                return
+            tmp_path = self.ids_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as ids_fp:
+                for id_str, stored_at in self._stored_ids.items():
+                    ids_fp.write('%s\t%d\n' % (id_str, stored_at))
+            os.replace(tmp_path, self.ids_path)
+
+    def close(self):
+        with self._lock:
+            if self._ids_fp is not None:
+                self._ids_fp.close()
+                self._ids_fp = None
@@ -9,18 +9,26 @@ try:
 except ImportError:
     from ConfigParser import SafeConfigParser
 from datetime import datetime as DateTime
+import functools
 import os
 import sys
 import time
 
 from babel.util import LOCALTZ
 from soapfish import xsd
-import requests
 from requests.auth import HTTPBasicAuth
 
+from srw.fiverx_client.fetch_checkpoint import FetchCheckpoint
+from srw.fiverx_client.lib import iter_json_array_items
 from srw.fiverx_client.logging_utilities import build_logger
+from srw.fiverx_client.prescription_archive import PrescriptionArchive
+from srw.fiverx_client.prescription_writer import PrescriptionWriter
+from srw.fiverx_client.soapclient.retry import call_with_retries, iter_body, read_body
+from srw.fiverx_client.soapclient.transport import Transport
 
 
+STREAM_CHUNK_SIZE = 64 * 1024
+
 def submission_xml(prescription_xml):
     xml = '''<?xml version="1.0" encoding="utf-8"?>
 <rzeLeistung xmlns="http://fiverx.de/spec/abrechnungsservice">
@@ -48,59 +56,162 @@ def submission_xml(prescription_xml):
 </rzeLeistung>''' % prescription_xml
     return xml
 
-def store_prescription(prescription_data, result_dir):
+def prescription_filename(prescription_data):
     id_ = prescription_data['id']
     pharmacy_id = prescription_data['pharmacy_id']
     now = time.time()
-    content_xml = prescription_data['content_xml']
+    return '%(id)06d-%(pharmacy_id)s-%(time)s.xml' % (dict(id=id_, pharmacy_id=pharmacy_id, time=now))
 
-    filename = '%(id)06d-%(pharmacy_id)s-%(time)s.xml' % (dict(id=id_, pharmacy_id=pharmacy_id, time=now))
+def prescription_bytes(prescription_data):
+    content_xml = prescription_data['content_xml']
+    return submission_xml(content_xml).encode('utf8')
+
+def store_prescription(prescription_data, result_dir, *, writer=None, archive=None, on_stored=None):
+    filename = prescription_filename(prescription_data)
+    binary_xml = prescription_bytes(prescription_data)
+    if archive is not None:
+        archive.add(filename, binary_xml,
+            id          = prescription_data['id'],
+            pharmacy_id = prescription_data['pharmacy_id'],
+            on_stored   = on_stored,
+        )
+        return
+    if writer is not None:
+        writer.submit(filename, binary_xml, on_written=on_stored)
+        return
     path = os.path.join(result_dir, filename)
     with open(path, 'wb') as fp:
-        binary_xml = submission_xml(content_xml).encode('utf8')
         fp.write(binary_xml)
+    if on_stored is not None:
+        on_stored()
 
 
-def fetch(export_dir, settings, since=None):
+def fetch(export_dir, settings, since=None, *, transport=None, stream=False, writers=0, write_queue=100, resume=False, archive=False):
     logging_base = os.path.join(os.getcwd(), os.path.basename(sys.argv[0]))
     log = build_logger(logging_base)
     base_url = settings['url']
     user = settings['username']
     password = settings['password']
 
+    checkpoint = None
+    if resume:
+        checkpoint = FetchCheckpoint.load(export_dir)
+        if (since is None) and (checkpoint.last_success is not None):
+            since = checkpoint.resume_since()
+            log.info('Setze Abruf fort (seit %s)' % xsd.DateTime().xmlvalue(since))
+    started_at = DateTime.now(LOCALTZ)
+
     path = '/internal/export-prescriptions/'
     url = base_url + path
     if since:
         url += xsd.DateTime().xmlvalue(since)
 
     log.info('Hole neue Rezepte vom Server')
-    response = requests.post(url, auth=HTTPBasicAuth(user, password))
+    if transport is None:
+        # "hostname" (Host header) is only used for SOAP requests, the export
+        # never sent it
+        transport = Transport.from_settings(settings, hostname=None)
+    # The export only returns data so it can be retried (stored prescriptions
+    # are skipped with "resume").
+    deadline = transport.new_deadline()
+    def send_attempt(timeout):
+        # the body is read separately so the deadline also covers the download
+        read_separately = stream or (deadline is not None)
+        return transport.post(url, auth=HTTPBasicAuth(user, password), allow_redirects=True, stream=read_separately, timeout=timeout)
+    response = call_with_retries(send_attempt, transport.timeout,
+        policy     = transport.retry_policy,
+        deadline   = deadline,
+        idempotent = True,
+    )
+    if not stream:
+        read_body(response, deadline)
     if response.status_code != 200:
         print('Error while fetching data: %r (code: %r)' % (response.text, response.status_code))
         return
-    results = response.json()
-    prescriptions = results['prescriptions']
+    if stream:
+        # Parse the JSON response incrementally so every prescription can be
+        # stored as soon as it was received (constant memory usage).
+        chunks = iter_body(response, deadline, chunk_size=STREAM_CHUNK_SIZE)
+        prescriptions = iter_json_array_items(chunks, 'prescriptions')
+    else:
+        results = response.json()
+        prescriptions = results['prescriptions']
+        log.info('Speichere %d Rezepte' % len(prescriptions))
 
     now = DateTime.now(LOCALTZ)
     # Windows does not like ':' in path names
     pathname = xsd.DateTime().xmlvalue(now).replace(':', '_')
     result_dir = os.path.join(export_dir, pathname)
-    if prescriptions and not os.path.exists(result_dir):
-        os.makedirs(result_dir)
 
-    log.info('Speichere %d Rezepte' % len(prescriptions))
-    for prescription_data in prescriptions:
-        store_prescription(prescription_data, result_dir)
-    log.info('Rezepte gespeichert')
+    nr_prescriptions = 0
+    nr_skipped = 0
+    writer = None
+    prescription_archive = None
+    try:
+        for prescription_data in prescriptions:
+            on_stored = None
+            if checkpoint is not None:
+                id_ = prescription_data['id']
+                if checkpoint.is_stored(id_):
+                    nr_skipped += 1
+                    continue
+                on_stored = functools.partial(checkpoint.mark_stored, id_)
+            if nr_prescriptions == 0:
+                if archive:
+                    # one archive per run instead of a directory
+                    os.makedirs(export_dir, exist_ok=True)
+                    prescription_archive = PrescriptionArchive(result_dir + '.zip')
+                elif not os.path.exists(result_dir):
+                    os.makedirs(result_dir)
+                if writers:
+                    writer = PrescriptionWriter(result_dir, workers=writers, queue_size=write_queue)
+            store_prescription(prescription_data, result_dir,
+                writer    = writer,
+                archive   = prescription_archive,
+                on_stored = on_stored,
+            )
+            nr_prescriptions += 1
+        if writer is not None:
+            writer.close()
+            writer = None
+        if prescription_archive is not None:
+            prescription_archive.close()
+            prescription_archive = None
+    finally:
+        if writer is not None:
+            writer.close()
+        if prescription_archive is not None:
+            # incomplete archive (prescriptions are not marked as stored)
+            prescription_archive.discard()
+        if checkpoint is not None:
+            checkpoint.close()
+    if checkpoint is not None:
+        # only reached if all prescriptions were stored successfully
+        checkpoint.mark_run_completed(started_at)
+        if nr_skipped:
+            log.info('%d bereits gespeicherte Rezepte übersprungen' % nr_skipped)
+    log.info('%d Rezepte gespeichert' % nr_prescriptions)
 
 
 def main():
     parser = ArgumentParser(description='export prescription data from srw.link service.')
     parser.add_argument('--config', dest='config_filename', default='fiverx.ini')
     parser.add_argument('--since', dest='since')
+    parser.add_argument('--stream', dest='stream', action='store_true',
+        help='store prescriptions while downloading (constant memory usage)')
+    parser.add_argument('--writers', dest='writers', type=int, default=0,
+        help='number of threads writing the prescription files (atomically)')
+    parser.add_argument('--write-queue', dest='write_queue', type=int, default=100,
+        help='max. number of prescriptions waiting to be written')
+    parser.add_argument('--resume', dest='resume', action='store_true',
+        help='skip prescriptions stored by previous runs, continue after last complete run')
+    parser.add_argument('--archive', dest='archive', action='store_true',
+        help='store all prescriptions of a run in a single zip archive (with index)')
     parser.add_argument('export_dir')
 
     args = parser.parse_args()
+    if args.archive and args.writers:
+        parser.error('--archive can not be combined with --writers')
 
     config = SafeConfigParser()
     config.read(args.config_filename)
@@ -110,7 +221,13 @@ def main():
     if args.since:
         since = xsd.DateTime().pythonvalue(args.since)
 
-    fetch(args.export_dir, settings, since)
+    fetch(args.export_dir, settings, since,
+        stream      = args.stream,
+        writers     = args.writers,
+        write_queue = args.write_queue,
+        resume      = args.resume,
+        archive     = args.archive,
+    )
 
 if __name__ == '__main__':
     main()
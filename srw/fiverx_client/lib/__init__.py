@@ -1,2 +1,5 @@
 
 from .result import *
+from .json_stream import *
+from .timings import *
+from .mapped_file import *
@@ -0,0 +1,109 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+import codecs
+import json
+
+
+__all__ = ['iter_json_array_items']
+
+_WHITESPACE = ' \t\n\r'
+_json_decoder = json.JSONDecoder()
+
+def iter_json_array_items(chunks, key, *, encoding='utf-8'):
+    """Yield the items of the array stored as "key" in a top-level JSON object
+    (e.g. '{"key": [{...}, {...}]}') while reading the JSON data from "chunks"
+    (iterable of bytes).
+
+    Only a single array item is kept in memory so the memory usage depends on
+    the size of the largest item and not on the number of items.
+    Raises KeyError if the top-level object does not contain "key" and
+    ValueError if the data is not valid JSON."""
+    buffer = _StreamBuffer(chunks, encoding)
+    buffer.expect('{')
+    if buffer.consume_if('}'):
+        raise KeyError(key)
+    while True:
+        member_key = buffer.decode_value()
+        buffer.expect(':')
+        if member_key != key:
+            buffer.decode_value()
+        else:
+            buffer.expect('[')
+            if not buffer.consume_if(']'):
+                while True:
+                    yield buffer.decode_value()
+                    if buffer.consume_if(']'):
+                        break
+                    buffer.expect(',')
+            return
+        if buffer.consume_if('}'):
+            raise KeyError(key)
+        buffer.expect(',')
+
+
+class _StreamBuffer(object):
+    def __init__(self, chunks, encoding):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def _read(self, min_chars=1):
+        # drop data which was already processed
+        self.text = self.text[self.pos:]
+        self.pos = 0
+        new_text = []
+        nr_chars = 0
+        while nr_chars < min_chars:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                new_text.append(self._decoder.decode(b'', final=True))
+                self.eof = True
+                break
+            text = self._decoder.decode(chunk)
+            new_text.append(text)
+            nr_chars += len(text)
+        self.text += ''.join(new_text)
+
+    def _skip_whitespace(self):
+        while True:
+            text = self.text
+            pos = self.pos
+            while (pos < len(text)) and (text[pos] in _WHITESPACE):
+                pos += 1
+            self.pos = pos
+            if (pos < len(text)) or self.eof:
+                return
+            self._read()
+
+    def consume_if(self, char):
+        self._skip_whitespace()
+        if self.text[self.pos:self.pos+1] == char:
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, char):
+        if not self.consume_if(char):
+            found = self.text[self.pos:self.pos+1] or 'end of data'
+            raise ValueError(f'expected {char!r} but found {found!r}')
+
+    def decode_value(self):
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = _json_decoder.raw_decode(self.text, self.pos)
+            except ValueError:
+                end = None
+            # a value which ends exactly at the end of the buffer might be
+            # incomplete (e.g. number "12" followed by "3" in the next chunk)
+            if (end is not None) and ((end < len(self.text)) or self.eof):
+                self.pos = end
+                return value
+            if self.eof:
+                raise ValueError('incomplete JSON data')
+            # Read at least as much data as is already buffered so large values
+            # are only parsed a few times (instead of once per chunk).
+            self._read(min_chars=max(len(self.text) - self.pos, 1))
@@ -0,0 +1,52 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+from contextlib import contextmanager
+import mmap
+import os
+
+
+__all__ = ['map_file', 'mapped_file', 'strip_buffer']
+
+_WHITESPACE = b' \t\n\r'
+
+def map_file(path):
+    """Return the content of "path" as read-only memory map so (large) files
+    are not copied into memory, the OS loads the pages on demand.
+
+    The result supports the buffer protocol so it can be passed to lxml
+    ("etree.fromstring()"), regular expressions, zlib or sockets directly.
+    The map is closed when it is garbage collected."""
+    with open(path, 'rb') as fp:
+        if os.fstat(fp.fileno()).st_size == 0:
+            # empty files can not be mapped
+            return b''
+        # the map keeps its own file descriptor
+        return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+@contextmanager
+def mapped_file(path):
+    """Like "map_file()" but the map is closed when the block is left. Use
+    this when mapping many files: each map holds an open file descriptor.
+
+    The block must not keep memoryviews of the map (closing would fail)."""
+    data = map_file(path)
+    try:
+        yield data
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+def strip_buffer(data):
+    """Like "bytes.strip()" (ASCII whitespace only) but returns a memoryview
+    instead of a copy if "data" is not a bytes instance (e.g. a memory map)."""
+    if isinstance(data, bytes):
+        return data.strip()
+    view = memoryview(data)
+    start = 0
+    end = len(view)
+    while (start < end) and (view[start] in _WHITESPACE):
+        start += 1
+    while (end > start) and (view[end - 1] in _WHITESPACE):
+        end -= 1
+    return view[start:end]
@@ -0,0 +1,34 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+import json
+
+from pythonic_testcase import *
+
+from ..json_stream import iter_json_array_items
+
+
+class IterJsonArrayItemsTest(PythonicTestCase):
+    def _chunks(self, data, chunk_size):
+        raw = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        return [raw[i:i+chunk_size] for i in range(0, len(raw), chunk_size)]
+
+    def test_yields_array_items_independent_of_chunk_size(self):
+        items = [{'id': i, 'content_xml': '<ä>' * i} for i in range(20)]
+        data = {'count': 12345, 'prescriptions': items, 'extra': [1, 2]}
+        for chunk_size in (1, 2, 7, 1000):
+            chunks = self._chunks(data, chunk_size)
+            assert_equals(items, list(iter_json_array_items(chunks, 'prescriptions')))
+
+    def test_can_handle_empty_array(self):
+        chunks = self._chunks({'prescriptions': []}, 5)
+        assert_equals([], list(iter_json_array_items(chunks, 'prescriptions')))
+
+    def test_raises_key_error_for_missing_key(self):
+        chunks = self._chunks({'foo': 1}, 5)
+        with assert_raises(KeyError):
+            list(iter_json_array_items(chunks, 'prescriptions'))
+
+    def test_raises_value_error_for_incomplete_data(self):
+        with assert_raises(ValueError):
+            list(iter_json_array_items([b'{"prescriptions": [{"id": 1'], 'prescriptions'))
@@ -0,0 +1,49 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+import os
+import tempfile
+
+from lxml import etree
+from pythonic_testcase import *
+
+from ..mapped_file import map_file, mapped_file, strip_buffer
+
+
+class MapFileTest(PythonicTestCase):
+    def setUp(self):
+        super().setUp()
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+        super().tearDown()
+
+    def _write(self, content):
+        with open(self.path, 'wb') as fp:
+            fp.write(content)
+
+    def test_can_parse_mapped_file(self):
+        self._write(b'\n <?xml version="1.0" encoding="ISO-8859-15"?>\n<foo>\xa4</foo>\n\n')
+        xml_data = strip_buffer(map_file(self.path))
+        assert_equals('€', etree.fromstring(xml_data).text)
+
+    def test_can_map_empty_files(self):
+        self._write(b'')
+        assert_equals(b'', map_file(self.path))
+
+    def test_closes_map_after_block(self):
+        self._write(b'<foo />')
+        with mapped_file(self.path) as xml_data:
+            assert_equals(b'<foo />', xml_data[:])
+        assert_true(xml_data.closed)
+        # empty files are not mapped at all
+        self._write(b'')
+        with mapped_file(self.path) as xml_data:
+            assert_equals(b'', xml_data)
+
+    def test_can_strip_buffers(self):
+        assert_equals(b'foo', strip_buffer(b' foo\n'))
+        assert_equals(b'foo', bytes(strip_buffer(bytearray(b'\r\n\tfoo  '))))
+        assert_equals(b'', bytes(strip_buffer(bytearray(b' \n'))))
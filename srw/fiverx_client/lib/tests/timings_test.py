@@ -0,0 +1,54 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+from pythonic_testcase import *
+
+from ..timings import Timings
+
+
+class TimingsTest(PythonicTestCase):
+    def test_accumulates_phases_in_order(self):
+        timings = Timings()
+        with timings.measure('send'):
+            pass
+        timings.add('parse', 0.5)
+        timings.add('parse', 0.25)
+        assert_equals(['send', 'parse'], list(timings.phases))
+        assert_equals(0.75, timings.phases['parse'])
+
+    def test_measures_phase_even_if_an_exception_is_raised(self):
+        timings = Timings()
+        with assert_raises(ValueError):
+            with timings.measure('send'):
+                raise ValueError()
+        assert_equals(['send'], list(timings.phases))
+
+    def test_total_does_not_count_nested_phases_twice(self):
+        timings = Timings()
+        timings.add('send', 0.25)
+        timings.add('parse', 0.5)
+        assert_equals(0.75, timings.total)
+        # "total" includes the other phases
+        timings.add('total', 1)
+        assert_equals(1, timings.total)
+
+    def test_can_format_nagios_perfdata(self):
+        timings = Timings()
+        timings.add('send', 0.25)
+        timings.add('parse_response', 0.0015)
+        assert_equals('send=0.250000s parse_response=0.001500s', timings.perfdata())
+
+    def test_can_record_byte_counts(self):
+        timings = Timings()
+        timings.add('send', 0.25)
+        timings.set_bytes('request_bytes', 2048)
+        assert_equals({'send': 0.25, 'request_bytes': 2048}, timings.as_dict())
+        assert_equals('send=0.250000s request_bytes=2048B', timings.perfdata())
+
+    def test_null_timings_record_nothing(self):
+        timings = Timings.or_null(None)
+        with timings.measure('send'):
+            pass
+        timings.add('parse', 1)
+        timings.set_bytes('request_bytes', 1)
+        assert_equals({}, timings.as_dict())
@@ -0,0 +1,85 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+from contextlib import contextmanager
+from time import perf_counter
+
+
+__all__ = ['Timings']
+
+class Timings(object):
+    """Accumulates the duration (seconds) of named phases, e.g.
+
+        timings = Timings()
+        with timings.measure('send'):
+            ...
+
+    Phases are reported in the order they were first recorded (a measured
+    phase is recorded when it finishes, so an outer phase like "total" comes
+    after the phases it contains). Byte counts (e.g. the size of the request
+    body before/after compression) can be recorded with "set_bytes()".
+    Functions which accept an optional "timings" parameter use
+    "Timings.or_null(timings)" so there is (almost) no overhead if no timings
+    are requested."""
+    def __init__(self):
+        self.phases = {}
+        self.byte_counts = {}
+
+    @classmethod
+    def or_null(cls, timings):
+        return timings if (timings is not None) else _NULL_TIMINGS
+
+    @contextmanager
+    def measure(self, phase):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, perf_counter() - start)
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+    def set_bytes(self, name, nr_bytes):
+        self.byte_counts[name] = nr_bytes
+
+    @property
+    def total(self):
+        """duration of the "total" phase (if measured, it includes all other
+        phases) or the sum of all phases"""
+        if 'total' in self.phases:
+            return self.phases['total']
+        return sum(self.phases.values())
+
+    def as_dict(self):
+        data = dict(self.phases)
+        data.update(self.byte_counts)
+        return data
+
+    def perfdata(self):
+        "phase durations and byte counts in Nagios' perfdata format"
+        values = ['%s=%.6fs' % (phase, seconds) for phase, seconds in self.phases.items()]
+        values.extend('%s=%dB' % (name, nr_bytes) for name, nr_bytes in self.byte_counts.items())
+        return ' '.join(values)
+
+
+class _NullTimings(Timings):
+    def measure(self, phase):
+        return _null_context
+
+    def add(self, phase, seconds):
+        pass
+
+    def set_bytes(self, name, nr_bytes):
+        pass
+
+
+class _NullContext(object):
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_null_context = _NullContext()
+_NULL_TIMINGS = _NullTimings()
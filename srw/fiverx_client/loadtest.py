@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+srwlink-loadtest
+
+Sends the same SOAP request (any "srwlink-client" subcommand) repeatedly for a
+fixed duration and reports throughput, errors and latency percentiles. The
+request is built and validated only once so the numbers reflect sending the
+request and processing the response.
+
+Without "--rate" every worker sends the next request as soon as the previous
+one is complete (closed loop, "--concurrency" requests in flight). With
+"--rate" requests are started at a fixed rate (at most "--concurrency" in
+flight). Latencies are then measured from the scheduled start so a slow
+server is not hidden by requests which were started late.
+
+Usage:
+  srwlink-loadtest [options] <command> [<args>...]
+
+Options:
+  --config=<config>         Specify config file
+  --api-version=<apoti_version>  Version of the ApoTI protocol [default: 01.10]
+  --duration=<seconds>      Run the load test for <seconds> [default: 30]
+  --concurrency=<N>         Number of concurrent requests [default: 10]
+  --rate=<N>                Start <N> requests per second
+  --json                    Write the report as JSON
+  --chunked                 Use chunked HTTP requests
+  --no-cert-verification    disable TLS certificate verification
+  --test                    Set "test" flag
+  -h, --help                Show this screen
+
+Errors are reported with the exit codes of "srwlink-client":
+  15    problem sending request
+ 21    unexpected content type in response
+ 22    response data is not well-formed XML
+ 23    invalid XML response (XML Schema)
+"""
+
+from collections import Counter
+import json
+import math
+import sys
+import threading
+import time
+
+from docopt import docopt, DocoptExit
+
+from . import soapclient
+from .cli_client import (build_header_params, contains_hostname, load_settings,
+    submit_soap_request, validate_request)
+from .utils import parse_command_args
+
+
+__all__ = ['loadtest_main', 'run_load_test', 'LoadTestReport']
+
+# exit code for requests which raised an exception (same as "srwlink-client"
+# batch mode uses for unexpected errors)
+ERROR_EXCEPTION = 1
+
+def loadtest_main(argv=sys.argv):
+    arguments = docopt(__doc__, argv=argv[1:], options_first=True)
+    settings = load_settings(arguments)
+    if not settings:
+        return 5
+    api_version = arguments['--api-version']
+    assert (api_version in ('01.08', '01.10'))
+    cmd_module = getattr(soapclient, arguments['<command>'], None)
+    if not hasattr(cmd_module, 'build_soap_xml'):
+        raise DocoptExit('unexpected command')
+    command_args = parse_command_args(cmd_module.__doc__, arguments['<args>'], {})
+
+    header_params = build_header_params(settings, is_test_request=arguments['--test'])
+    if command_args.get('--stream'):
+        soap_data = cmd_module.build_streaming_request(header_params, command_args, version=api_version)
+    else:
+        soap_request = cmd_module.build_soap_request(header_params, command_args, version=api_version)
+        if not validate_request(soap_request):
+            sys.stderr.write('Invalid SOAP request\n')
+            return 10
+        soap_data = soap_request.soap_bytes
+
+    ws_url = settings['url']
+    verify_cert = not arguments['--no-cert-verification']
+    if not contains_hostname(ws_url):
+        verify_cert = False
+    concurrency = int(arguments['--concurrency'])
+    transport = soapclient.Transport.from_settings(settings, pool_size=concurrency)
+    soapclient.preload_schemas()
+    def send():
+        result = submit_soap_request(ws_url, soap_data, cmd_module.response_payload_xpath,
+            use_chunking = arguments['--chunked'],
+            verify_cert  = verify_cert,
+            hostname     = settings.get('hostname'),
+            quiet        = True,
+            transport    = transport,
+            as_result    = True,
+        )
+        return result.value
+
+    rate = arguments['--rate']
+    report = run_load_test(send,
+        duration    = float(arguments['--duration']),
+        concurrency = concurrency,
+        rate        = float(rate) if rate else None,
+    )
+    transport.close()
+    if arguments['--json']:
+        print(json.dumps(report.as_dict(), indent=2))
+    else:
+        print(report.format())
+    return 0
+
+
+def run_load_test(send, *, duration, concurrency=10, rate=None):
+    """Call "send()" (returns an exit code, 0 = success) from "concurrency"
+    threads until "duration" seconds have passed and return a LoadTestReport.
+    If "rate" is set at most "rate" calls per second are started.
+    Exceptions raised by "send()" are counted as errors (ERROR_EXCEPTION)."""
+    assert concurrency > 0
+    scheduler = _Scheduler(time.perf_counter(), duration, rate)
+    latencies = []
+    exit_codes = Counter()
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            scheduled_start = scheduler.next_start()
+            if scheduled_start is None:
+                return
+            try:
+                rc = send()
+            except Exception:
+                # otherwise the worker thread would die silently and the
+                # report would only contain the successful requests
+                rc = ERROR_EXCEPTION
+            latency = time.perf_counter() - scheduled_start
+            with lock:
+                latencies.append(latency)
+                exit_codes[rc] += 1
+
+    threads = [threading.Thread(target=worker, daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - scheduler.start
+    return LoadTestReport(latencies, exit_codes, elapsed)
+
+
+class _Scheduler(object):
+    "hands out the start time for each request (thread-safe)"
+    def __init__(self, start, duration, rate):
+        self.start = start
+        self.end = start + duration
+        self.interval = (1 / rate) if rate else None
+        self._nr_started = 0
+        self._lock = threading.Lock()
+
+    def next_start(self):
+        if self.interval is None:
+            now = time.perf_counter()
+            return now if (now < self.end) else None
+        with self._lock:
+            scheduled_start = self.start + self._nr_started * self.interval
+            if scheduled_start >= self.end:
+                return None
+            self._nr_started += 1
+        delay = scheduled_start - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        return scheduled_start
+
+
+class LoadTestReport(object):
+    PERCENTILES = (50, 95, 99)
+
+    def __init__(self, latencies, exit_codes, elapsed):
+        self.latencies = sorted(latencies)
+        self.exit_codes = exit_codes
+        self.elapsed = elapsed
+
+    @property
+    def nr_requests(self):
+        return len(self.latencies)
+
+    @property
+    def nr_errors(self):
+        return self.nr_requests - self.exit_codes.get(0, 0)
+
+    @property
+    def throughput(self):
+        "successful requests per second"
+        if not self.elapsed:
+            return 0.0
+        return self.exit_codes.get(0, 0) / self.elapsed
+
+    def percentile(self, p):
+        "latency (seconds) for percentile \"p\" (nearest-rank method)"
+        if not self.latencies:
+            return None
+        rank = max(math.ceil(p / 100 * len(self.latencies)), 1)
+        return self.latencies[rank - 1]
+
+    @property
+    def max_latency(self):
+        return self.latencies[-1] if self.latencies else None
+
+    def as_dict(self):
+        latencies = {f'p{p}': self.percentile(p) for p in self.PERCENTILES}
+        latencies['max'] = self.max_latency
+        return {
+            'requests': self.nr_requests,
+            'duration': self.elapsed,
+            'throughput': self.throughput,
+            'errors': {str(rc): nr for rc, nr in sorted(self.exit_codes.items()) if rc},
+            'latency': latencies,
+        }
+
+    def format(self):
+        lines = [
+            'requests:    %d (%d errors)' % (self.nr_requests, self.nr_errors),
+            'duration:    %.1f s' % self.elapsed,
+            'throughput:  %.1f requests/s' % self.throughput,
+        ]
+        for rc, nr in sorted(self.exit_codes.items()):
+            if rc:
+                lines.append('exit code %2d: %d' % (rc, nr))
+        if self.latencies:
+            labels = [f'p{p}' for p in self.PERCENTILES] + ['max']
+            values = [self.percentile(p) for p in self.PERCENTILES] + [self.max_latency]
+            latency_str = '  '.join('%s=%.1f' % (label, value * 1000) for label, value in zip(labels, values))
+            lines.append(f'latency [ms]: {latency_str}')
+        return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    sys.exit(loadtest_main())
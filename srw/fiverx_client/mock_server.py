@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+srwlink-mock-server
+
+Local stand-in for a fiverx server (RZ) to measure client throughput without
+a live system. All SOAP operations of "srwlink-client" are answered with
+schema-valid responses. Additionally "/internal/export-prescriptions/" (used
+by "fiverx-fetch-prescriptions") returns generated prescriptions.
+
+Erroneous responses (--error-rate) are picked randomly from: HTML error page
+(client exit code 21), truncated XML (22) and schema-invalid payload (23).
+
+Compressed request bodies ("Content-Encoding: gzip/deflate") are accepted.
+With --gzip SOAP responses are compressed if the client accepts gzip.
+
+Usage:
+  srwlink-mock-server [options]
+
+Options:
+  --host=<host>         Listen on this address [default: 127.0.0.1]
+  --port=<port>         Listen on this port [default: 8080]
+  --latency=<ms>        Delay every response by <ms> milliseconds [default: 0]
+  --jitter=<ms>         Add a random delay of up to <ms> milliseconds [default: 0]
+  --error-rate=<rate>   Fraction of requests answered with an error (0..1) [default: 0]
+  --records=<N>         Status records per ladeStatusRezept response (schema: max. 300) [default: 10]
+  --prescriptions=<N>   Prescriptions per export-prescriptions response [default: 100]
+  --gzip                Compress responses ("Content-Encoding: gzip")
+  --quiet               Do not log requests
+  -h, --help            Show this screen
+"""
+
+from datetime import datetime as DateTime
+import gzip
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import random
+from socketserver import ThreadingMixIn
+import sys
+import threading
+import time
+import uuid
+import zlib
+
+from docopt import docopt
+from lxml import etree
+
+from .soapclient import match_xpath, parse_soap_envelope, parse_xml
+from .soapclient.compression import CONTENT_ENCODINGS
+from .soapclient.request import F, FIVERX_TYPES_NS, SOAP_ENV_NS
+from .utils import strip_xml_declaration
+
+
+__all__ = ['MockConfig', 'MockFiverxServer', 'mock_server_main']
+
+EXPORT_PATH = '/internal/export-prescriptions/'
+ERROR_KINDS = ('html', 'malformed', 'invalid')
+
+class MockConfig(object):
+    def __init__(self, *, latency=0, jitter=0, error_rate=0, records=10, prescriptions=100, gzip=False, quiet=False):
+        # latency/jitter in seconds
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.records = records
+        self.prescriptions = prescriptions
+        self.gzip = gzip
+        self.quiet = quiet
+
+
+class MockFiverxServer(ThreadingMixIn, HTTPServer):
+    """Threaded HTTP server (one thread per connection). Use port 0 to pick a
+    free port, the actual address is available as "server_address"."""
+    daemon_threads = True
+
+    def __init__(self, server_address, config=None):
+        self.config = config or MockConfig()
+        HTTPServer.__init__(self, server_address, MockRequestHandler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def serve_in_thread(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    # keep-alive is important for realistic throughput numbers
+    protocol_version = 'HTTP/1.1'
+    server_version = 'srwlink-mock-server'
+    # headers and body are written separately, with Nagle's algorithm every
+    # response would be delayed by the client's delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        config = self.server.config
+        try:
+            body = self._read_body()
+        except (zlib.error, KeyError):
+            self._send(415, b'<html><body>Unsupported Media Type</body></html>', 'text/html')
+            return
+        delay = config.latency + random.uniform(0, config.jitter)
+        if delay:
+            time.sleep(delay)
+        if self.path.startswith(EXPORT_PATH):
+            self._send_prescriptions(config.prescriptions)
+            return
+
+        error_kind = None
+        if config.error_rate and (random.random() < config.error_rate):
+            error_kind = random.choice(ERROR_KINDS)
+        if error_kind == 'html':
+            self._send(503, b'<html><body>Service Unavailable</body></html>', 'text/html')
+            return
+        try:
+            operation, payload = parse_soap_request(body)
+            builder = RESPONSE_BUILDERS[operation]
+        except (etree.XMLSyntaxError, AssertionError, AttributeError, IndexError, KeyError):
+            self._send(400, b'<html><body>Bad Request</body></html>', 'text/html')
+            return
+        response_payload = builder(payload, config)
+        if error_kind == 'invalid':
+            # payload is still well-formed but lacks a mandatory element
+            del response_payload[0]
+        response_bytes = soap_response(operation, response_payload)
+        if error_kind == 'malformed':
+            response_bytes = response_bytes[:len(response_bytes) // 2]
+        self._send(200, response_bytes, 'text/xml; charset=UTF-8', compress=config.gzip)
+
+    def log_message(self, format, *args):
+        if not self.server.config.quiet:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def _read_body(self):
+        body = self._read_raw_body()
+        content_encoding = self.headers.get('Content-Encoding', '').strip().lower()
+        if content_encoding and (content_encoding != 'identity'):
+            body = zlib.decompress(body, CONTENT_ENCODINGS[content_encoding])
+        return body
+
+    def _read_raw_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size_line = self.rfile.readline()
+                chunk_size = int(size_line.split(b';', 1)[0].strip(), 16)
+                if chunk_size == 0:
+                    # skip trailers
+                    while self.rfile.readline().strip():
+                        pass
+                    break
+                chunks.append(self.rfile.read(chunk_size))
+                self.rfile.readline()
+            return b''.join(chunks)
+        content_length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(content_length)
+
+    def _send(self, status_code, body, content_type, *, compress=False):
+        accept_encoding = self.headers.get('Accept-Encoding', '')
+        compress = compress and ('gzip' in accept_encoding.lower())
+        if compress:
+            body = gzip.compress(body)
+        self.send_response(status_code)
+        self.send_header('Content-Type', content_type)
+        if compress:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_prescriptions(self, nr_prescriptions):
+        # chunked response so large exports are not built in memory
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for chunk in iter_export_json(nr_prescriptions):
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+        self.wfile.write(b'0\r\n\r\n')
+
+
+def parse_soap_request(body):
+    "return the operation name and the payload (lxml element) of a request"
+    root = parse_soap_envelope(body)
+    method_element = match_xpath(root, '//soap:Body/fiverx:*')
+    assert method_element is not None
+    operation = etree.QName(method_element).localname
+    payload_bytes = strip_xml_declaration(method_element[0].text.encode('UTF-8'))
+    return operation, parse_xml(payload_bytes)
+
+def soap_response(operation, payload):
+    payload_bytes = etree.tostring(payload, xml_declaration=True, encoding='UTF-8')
+    envelope = etree.Element(f'{{{SOAP_ENV_NS}}}Envelope', nsmap={'senv': SOAP_ENV_NS})
+    body = etree.SubElement(envelope, f'{{{SOAP_ENV_NS}}}Body')
+    method = etree.SubElement(body, f'{{{FIVERX_TYPES_NS}}}{operation}Response', nsmap={'fiverx': FIVERX_TYPES_NS})
+    etree.SubElement(method, 'result').text = payload_bytes.decode('UTF-8')
+    return etree.tostring(envelope, xml_declaration=True, encoding='UTF-8')
+
+def iter_export_json(nr_prescriptions):
+    yield b'{"prescriptions": ['
+    for i in range(nr_prescriptions):
+        prescription = {
+            'id': i + 1,
+            'pharmacy_id': '123456789',
+            'content_xml': f'<eMuster16><muster16Id>{i+1:09d}</muster16Id><rezeptTyp>STANDARDREZEPT</rezeptTyp></eMuster16>',
+        }
+        separator = b',' if i else b''
+        yield separator + json.dumps(prescription).encode('UTF-8')
+    yield b']}'
+
+
+# --- response payloads -------------------------------------------------------
+def _text(payload, local_name):
+    elements = payload.xpath('.//*[local-name()=$name]', name=local_name)
+    return elements[0].text if elements else None
+
+def _ret_header(payload):
+    apo_ik = _text(payload, 'apoIk') or '123456789'
+    return F.retHeader(
+        F.rzKdNr(_text(payload, 'rzKdNr') or apo_ik),
+        F.rzIk('123456789'),
+        F.apoIk(apo_ik),
+    )
+
+def _now():
+    return DateTime.now().replace(microsecond=0).isoformat()
+
+def _liefer_id():
+    return uuid.uuid4().hex
+
+def _prescription_id(container, nr):
+    "return the elements which identify the prescription in \"container\""
+    erezept_id = _text(container, 'eRezeptId')
+    if erezept_id:
+        return [F.eRezeptId(erezept_id)]
+    transaction_nr = _text(container, 'transaktionsNummer')
+    year = _text(container, 'erstellungsJahr')
+    if transaction_nr and year:
+        return [F.transaktionsNummer(transaction_nr), F.erstellungsJahr(year)]
+    muster16_id = _text(container, 'muster16Id')
+    if not (muster16_id and muster16_id.isdigit() and (len(muster16_id) == 9)):
+        muster16_id = '%09d' % nr
+    return [F.muster16Id(muster16_id)]
+
+def _status_element(avs_id, id_elements, liefer_id):
+    id_tag = etree.QName(id_elements[0]).localname
+    if id_tag == 'eRezeptId':
+        return F.eRezeptStatus(F.avsId(avs_id), *id_elements, F.status('VOR_PRUEFUNG'), F.rzLieferId(liefer_id))
+    elif id_tag == 'transaktionsNummer':
+        return F.pRezeptStatus(F.avsId(avs_id), *id_elements, F.p16Status('VOR_PRUEFUNG'), F.rzLieferId(liefer_id))
+    return F.muster16Status(F.avsId(avs_id), *id_elements, F.m16Status('VOR_PRUEFUNG'), F.rzLieferId(liefer_id))
+
+def ladeRzVersion_response(payload, config):
+    return F.rzeVersion(
+        F.uVersion(F.versionNr('01.08'), F.gracePeriod('2030-12')),
+        F.uVersion(F.versionNr('01.10'), F.gracePeriod('2030-12')),
+    )
+
+def ladeRzDienste_response(payload, config):
+    return F.rzeDienste(
+        _ret_header(payload),
+        F.u4('true'),
+        F.u5(F.u5_1('true'), F.u5_2('true')),
+        F.u6(
+            F.u6_1(F.asynchron('true'), F.synchron('true'), F.u1('true')),
+            F.u6_2(F.synchron('true'), F.asynchron('true')),
+        ),
+    )
+
+def sendeRezepte_response(payload, config):
+    ids = []
+    leistungen = payload.xpath('.//*[local-name()="rzLeistungInhalt"]')
+    for nr, leistung in enumerate(leistungen[:300], start=1):
+        ids.append(F.id(*_prescription_id(leistung, nr)))
+    if not ids:
+        ids.append(F.id(F.muster16Id('%09d' % 1)))
+    return F.rzeQuittung(
+        _ret_header(payload),
+        F.bodyQuittung(
+            F.rzDatum(_now()),
+            F.rzLieferId(_liefer_id()),
+            F.rezeptIds(*ids),
+            F.rzAnzLeistung(str(len(leistungen))),
+        ),
+    )
+
+def pruefeRezept_response(payload, config):
+    avs_id = _text(payload, 'avsId') or '1'
+    status = _status_element(avs_id, _prescription_id(payload, 1), _liefer_id())
+    return F.rzeRetPruefung(
+        F.rzeLeistungStatus(
+            _ret_header(payload),
+            F.statusUpd(status),
+        ),
+    )
+
+def ladeStatusRezept_response(payload, config):
+    liefer_id = _text(payload, 'rzLieferId') or _liefer_id()
+    records = []
+    for nr in range(1, config.records + 1):
+        records.append(F.statusUpd(
+            F.muster16Status(
+                F.avsId(str(nr)),
+                F.muster16Id('%09d' % nr),
+                F.m16Status('FEHLER' if (nr % 10 == 0) else 'ABRECHENBAR'),
+                F.rzLieferId(liefer_id),
+                *([F.statusInfo(F.fCode('123'), F.fStatus('FEHLER'))] if (nr % 10 == 0) else [])
+            )
+        ))
+    return F.rzeLeistungStatus(_ret_header(payload), *records)
+
+def storniereRezept_response(payload, config):
+    return F.rzeRetStorno(
+        _ret_header(payload),
+        F.eStorno('STORNIERT'),
+        *_prescription_id(payload, 1)
+    )
+
+RESPONSE_BUILDERS = {
+    'ladeRzDienste': ladeRzDienste_response,
+    'ladeRzVersion': ladeRzVersion_response,
+    'ladeStatusRezept': ladeStatusRezept_response,
+    'pruefeRezept': pruefeRezept_response,
+    'sendeRezepte': sendeRezepte_response,
+    'storniereRezept': storniereRezept_response,
+}
+
+
+def mock_server_main(argv=sys.argv):
+    arguments = docopt(__doc__, argv=argv[1:])
+    config = MockConfig(
+        latency       = int(arguments['--latency']) / 1000,
+        jitter        = int(arguments['--jitter']) / 1000,
+        error_rate    = float(arguments['--error-rate']),
+        records       = int(arguments['--records']),
+        prescriptions = int(arguments['--prescriptions']),
+        gzip          = arguments['--gzip'],
+        quiet         = arguments['--quiet'],
+    )
+    server_address = (arguments['--host'], int(arguments['--port']))
+    server = MockFiverxServer(server_address, config)
+    print(f'fiverx mock server listening on {server.url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(mock_server_main())
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import struct
+import zipfile
+import zlib
+
+
+__all__ = ['PrescriptionArchive', 'read_archive_index', 'read_archived_prescription']
+
+INDEX_NAME = 'index.json'
+# zip "local file header" (APPNOTE.TXT 4.3.7) without file name and extra field
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+LOCAL_HEADER_SIGNATURE = 0x04034b50
+
+class PrescriptionArchive(object):
+    """Append prescriptions to a single zip archive (one deflated member per
+    prescription) instead of writing one file per prescription.
+
+    The archive is written to a temporary file which is renamed when the
+    archive is closed so other processes never see an incomplete archive.
+    "on_stored" callbacks are called only after the archive was renamed.
+
+    The last member ("index.json") lists "id", "pharmacy_id", member "name"
+    and the "offset" of each member's local header so consumers can read
+    single prescriptions directly (see "read_archived_prescription()")."""
+    def __init__(self, path, *, compresslevel=6):
+        self.path = path
+        dirname, basename = os.path.split(path)
+        self._tmp_path = os.path.join(dirname, '.' + basename + '.tmp')
+        self._zip = zipfile.ZipFile(self._tmp_path, 'w',
+            compression   = zipfile.ZIP_DEFLATED,
+            compresslevel = compresslevel,
+        )
+        self._index = []
+        self._on_stored = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def add(self, filename, content, *, id=None, pharmacy_id=None, on_stored=None):
+        self._zip.writestr(filename, content)
+        zip_info = self._zip.infolist()[-1]
+        self._index.append({
+            'id': id,
+            'pharmacy_id': pharmacy_id,
+            'name': filename,
+            'offset': zip_info.header_offset,
+        })
+        if on_stored is not None:
+            self._on_stored.append(on_stored)
+
+    def close(self):
+        index = {'prescriptions': self._index}
+        self._zip.writestr(INDEX_NAME, json.dumps(index, indent=1))
+        self._zip.close()
+        os.replace(self._tmp_path, self.path)
+        for on_stored in self._on_stored:
+            on_stored()
+        self._on_stored = []
+
+    def discard(self):
+        "close the archive without storing it (e.g. after an error)"
+        self._zip.close()
+        os.remove(self._tmp_path)
+        self._on_stored = []
+
+
+def read_archive_index(path):
+    with zipfile.ZipFile(path) as zip_file:
+        return json.loads(zip_file.read(INDEX_NAME))['prescriptions']
+
+def read_archived_prescription(fp, offset):
+    """Return the (uncompressed) prescription stored at "offset" (see index)
+    of the archive opened as "fp" without reading the central directory."""
+    fp.seek(offset)
+    header = fp.read(LOCAL_HEADER.size)
+    (signature, _version, _flags, compression, _time, _date, _crc,
+        compressed_size, _size, name_length, extra_length) = LOCAL_HEADER.unpack(header)
+    if signature != LOCAL_HEADER_SIGNATURE:
+        raise ValueError(f'no zip member at offset {offset}')
+    fp.seek(name_length + extra_length, os.SEEK_CUR)
+    data = fp.read(compressed_size)
+    if compression == zipfile.ZIP_STORED:
+        return data
+    elif compression == zipfile.ZIP_DEFLATED:
+        # raw deflate stream without zlib header
+        return zlib.decompress(data, -zlib.MAX_WBITS)
+    raise ValueError(f'unsupported compression method {compression}')
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+
+
+__all__ = ['PrescriptionWriter']
+
+class PrescriptionWriter(object):
+    """Write files concurrently using a thread pool.
+
+    Each file is written to a temporary file first which is renamed
+    atomically afterwards so other processes never see partially written XML.
+    "submit()" only blocks if "queue_size" files are waiting to be written.
+
+    The directory itself is synced after every "sync_every" files (and when
+    the writer is closed) instead of after every single file. Set
+    "fsync_files" to flush each file to disk before it is renamed (slow on
+    network shares)."""
+    def __init__(self, target_dir, *, workers=4, queue_size=100, sync_every=100, fsync_files=False):
+        self.target_dir = target_dir
+        self.sync_every = sync_every
+        self.fsync_files = fsync_files
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._slots = threading.BoundedSemaphore(max(queue_size, workers))
+        self._lock = threading.Lock()
+        self._unsynced_files = 0
+        self._error = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, filename, content, *, on_written=None):
+        """Queue "content" to be written as "filename". "on_written" is called
+        (from a worker thread) after the file was renamed successfully."""
+        self._raise_error()
+        # blocks (and thereby slows down the download) if too many files are
+        # waiting to be written
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._write, filename, content, on_written)
+        except:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._on_done)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self._unsynced_files:
+            self._unsynced_files = 0
+            self._sync_directory()
+        self._raise_error()
+
+    def _raise_error(self):
+        error = self._error
+        if error is not None:
+            self._error = None
+            raise error
+
+    def _on_done(self, future):
+        self._slots.release()
+        error = future.exception()
+        if (error is not None) and (self._error is None):
+            self._error = error
+
+    def _write(self, filename, content, on_written=None):
+        path = os.path.join(self.target_dir, filename)
+        tmp_path = os.path.join(self.target_dir, '.' + filename + '.tmp')
+        with open(tmp_path, 'wb') as fp:
+            fp.write(content)
+            if self.fsync_files:
+                fp.flush()
+                os.fsync(fp.fileno())
+        os.replace(tmp_path, path)
+        if on_written is not None:
+            on_written()
+
+        with self._lock:
+            self._unsynced_files += 1
+            needs_sync = (self._unsynced_files >= self.sync_every)
+            if needs_sync:
+                self._unsynced_files = 0
+        if needs_sync:
+            self._sync_directory()
+
+    def _sync_directory(self):
+        if os.name == 'nt':
+            # Windows can not open directories (and does not need it anyway)
+            return
+        dir_fd = os.open(self.target_dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+srwlink-probe
+
+Long-running replacement for "srwlink-client --nagios" checks: runs the
+given probes (subcommands without arguments) periodically within a single
+process so the HTTP connection and the compiled XML schemas are reused.
+The results are available in the Prometheus text format at
+"http://<listen>/metrics":
+
+  srwlink_probe_duration_seconds          latency histogram per probe
+  srwlink_probe_phase_seconds             duration of each phase (last run)
+  srwlink_probe_errors_total              failed runs per probe and exit code
+  srwlink_probe_last_exit_code            exit code of the last run
+  srwlink_probe_last_success_timestamp_seconds
+
+Exit codes are the same as for "srwlink-client".
+
+Usage:
+  srwlink-probe [options] [<probe>...]
+
+Options:
+  --config=<config>         Specify config file
+  --api-version=<apoti_version>  Version of the ApoTI protocol [default: 01.10]
+  --interval=<seconds>      Run all probes every <seconds> [default: 60]
+  --listen=<address>        Serve metrics at <host:port> [default: 127.0.0.1:9423]
+  --chunked                 Use chunked HTTP requests
+  --no-cert-verification    disable TLS certificate verification
+  --test                    Set "test" flag
+  -h, --help                Show this screen
+
+Probes default to "ladeRzVersion ladeRzDienste".
+"""
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+import sys
+import threading
+import time
+import traceback
+
+from docopt import docopt, DocoptExit
+
+from . import soapclient
+from .cli_client import load_settings, run_command
+from .lib import Timings
+
+
+__all__ = ['probe_main', 'ProbeMetrics', 'run_probe']
+
+DEFAULT_PROBES = ('ladeRzVersion', 'ladeRzDienste')
+# upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def probe_main(argv=sys.argv):
+    arguments = docopt(__doc__, argv=argv[1:])
+    settings = load_settings(arguments)
+    if not settings:
+        return 5
+    probe_names = arguments['<probe>'] or DEFAULT_PROBES
+    probes = []
+    for probe_name in probe_names:
+        cmd_module = getattr(soapclient, probe_name, None)
+        if not hasattr(cmd_module, 'build_soap_xml'):
+            raise DocoptExit(f'unknown probe "{probe_name}"')
+        probes.append((probe_name, cmd_module))
+    host, port = arguments['--listen'].rsplit(':', 1)
+    global_args = {
+        '--api-version': arguments['--api-version'],
+        '--chunked': arguments['--chunked'],
+        '--no-cert-verification': arguments['--no-cert-verification'],
+        '--test': arguments['--test'],
+    }
+
+    metrics = ProbeMetrics()
+    server = MetricsServer((host, int(port)), metrics)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    transport = soapclient.Transport.from_settings(settings)
+    soapclient.preload_schemas()
+    interval = float(arguments['--interval'])
+    try:
+        while True:
+            start = time.monotonic()
+            for probe_name, cmd_module in probes:
+                run_probe(probe_name, cmd_module, settings, global_args, metrics=metrics, transport=transport)
+            time.sleep(max(interval - (time.monotonic() - start), 0))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        transport.close()
+    return 0
+
+def run_probe(probe_name, cmd_module, settings, global_args, *, metrics, transport=None):
+    "run a single probe and record its result in \"metrics\", returns the exit code"
+    # "run_command()" consumes the global arguments
+    args = dict(global_args)
+    args.update({
+        '--quiet': True,
+        '--nagios': False,
+        '--print-request': False,
+        '--raw-output': None,
+        '--timings': False,
+    })
+    timings = Timings()
+    start = time.perf_counter()
+    try:
+        result = run_command(cmd_module, settings, args, [], transport=transport, as_result=True, timings=timings)
+        rc = result.value
+    except SystemExit as e:
+        rc = e.code if isinstance(e.code, int) else 10
+    except Exception:
+        # a broken probe must not stop the daemon
+        traceback.print_exc()
+        rc = 1
+    duration = time.perf_counter() - start
+    metrics.observe(probe_name, rc, duration, timings=timings)
+    return rc
+
+
+class ProbeMetrics(object):
+    "thread-safe collection of probe results"
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._probes = {}
+
+    def observe(self, probe_name, rc, duration, *, timings=None, timestamp=None):
+        with self._lock:
+            probe = self._probes.setdefault(probe_name, _ProbeData(len(self.buckets)))
+            for i, upper_bound in enumerate(self.buckets):
+                if duration <= upper_bound:
+                    probe.bucket_counts[i] += 1
+            probe.count += 1
+            probe.sum += duration
+            probe.last_rc = rc
+            if rc == 0:
+                probe.last_success = timestamp if (timestamp is not None) else time.time()
+            else:
+                probe.errors[rc] = probe.errors.get(rc, 0) + 1
+            if timings is not None:
+                probe.phases = dict(timings.phases)
+
+    def render(self):
+        "return all metrics in the Prometheus text exposition format"
+        lines = []
+        def add_metric(name, metric_type, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for suffix, labels, value in samples:
+                label_str = ','.join('%s="%s"' % item for item in labels)
+                lines.append(f'{name}{suffix}{{{label_str}}} {_format_value(value)}')
+
+        with self._lock:
+            probes = sorted(self._probes.items())
+            duration_samples = []
+            phase_samples = []
+            error_samples = []
+            rc_samples = []
+            success_samples = []
+            for probe_name, probe in probes:
+                label = ('probe', probe_name)
+                for upper_bound, count in zip(self.buckets, probe.bucket_counts):
+                    duration_samples.append(('_bucket', (label, ('le', _format_value(upper_bound))), count))
+                duration_samples.append(('_bucket', (label, ('le', '+Inf')), probe.count))
+                duration_samples.append(('_sum', (label,), probe.sum))
+                duration_samples.append(('_count', (label,), probe.count))
+                for phase, seconds in probe.phases.items():
+                    phase_samples.append(('', (label, ('phase', phase)), seconds))
+                for rc, count in sorted(probe.errors.items()):
+                    error_samples.append(('', (label, ('rc', str(rc))), count))
+                rc_samples.append(('', (label,), probe.last_rc))
+                if probe.last_success is not None:
+                    success_samples.append(('', (label,), probe.last_success))
+
+        add_metric('srwlink_probe_duration_seconds', 'histogram',
+            'Duration of probe runs (including request building and validation)', duration_samples)
+        add_metric('srwlink_probe_phase_seconds', 'gauge',
+            'Duration of each phase in the last probe run', phase_samples)
+        add_metric('srwlink_probe_errors_total', 'counter',
+            'Number of failed probe runs by exit code', error_samples)
+        add_metric('srwlink_probe_last_exit_code', 'gauge',
+            'Exit code of the last probe run', rc_samples)
+        add_metric('srwlink_probe_last_success_timestamp_seconds', 'gauge',
+            'Unix time of the last successful probe run', success_samples)
+        return '\n'.join(lines) + '\n'
+
+
+class _ProbeData(object):
+    def __init__(self, nr_buckets):
+        self.bucket_counts = [0] * nr_buckets
+        self.count = 0
+        self.sum = 0.0
+        self.errors = {}
+        self.last_rc = None
+        self.last_success = None
+        self.phases = {}
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class MetricsServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, server_address, metrics):
+        self.metrics = metrics
+        HTTPServer.__init__(self, server_address, MetricsRequestHandler)
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode('UTF-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # scraping every few seconds would flood the output
+        pass
+
+
+if __name__ == '__main__':
+    sys.exit(probe_main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+srwlink-send-batches
+
+Sends many prescription files to a fiverx server. The files are split into
+multiple "sendeRezepte" requests which are sent concurrently. A JSON report
+(outcome of each request, mapping of "avsId" to source file) is written to
+stdout.
+
+Usage:
+  srwlink-send-batches [options] <XML>...
+
+Options:
+  --config=<config>         Specify config file
+  --api-version=<apoti_version>  Version of the ApoTI protocol [default: 01.10]
+  --max-files=<N>           Maximum number of prescriptions per request [default: 300]
+  --max-bytes=<BYTES>       Maximum accumulated file size per request
+  --workers=<N>             Number of concurrent requests [default: 4]
+  --first-snd-id=<N>        "sndId" of the first request (incremented per request) [default: 1]
+  --chunked                 Use chunked HTTP requests
+  --no-cert-verification    disable TLS certificate verification
+  --test                    Set "test" flag
+  -h, --help                Show this screen
+"""
+
+import json
+import sys
+
+from docopt import docopt
+
+from .cli_client import build_header_params, contains_hostname, load_settings
+from .soapclient import preload_schemas, Transport
+from .soapclient.submission import submit_in_batches
+
+
+__all__ = ['send_batches_main']
+
+def send_batches_main(argv=sys.argv):
+    arguments = docopt(__doc__, argv=argv[1:])
+    settings = load_settings(arguments)
+    if not settings:
+        return 5
+    api_version = arguments['--api-version']
+    assert (api_version in ('01.08', '01.10'))
+    max_bytes = arguments['--max-bytes']
+    workers = int(arguments['--workers'])
+
+    ws_url = settings['url']
+    verify_cert = not arguments['--no-cert-verification']
+    if not contains_hostname(ws_url):
+        verify_cert = False
+    header_params = build_header_params(settings, is_test_request=arguments['--test'])
+    transport = Transport.from_settings(settings, pool_size=workers)
+    preload_schemas()
+    result = submit_in_batches(ws_url, header_params, arguments['<XML>'],
+        version      = api_version,
+        max_files    = int(arguments['--max-files']),
+        max_bytes    = int(max_bytes) if max_bytes else None,
+        workers      = workers,
+        transport    = transport,
+        verify_cert  = verify_cert,
+        hostname     = settings.get('hostname'),
+        use_chunking = arguments['--chunked'],
+        first_snd_id = int(arguments['--first-snd-id']),
+    )
+    report = {'batches': result.batches, 'files': result.files}
+    print(json.dumps(report, indent=2))
+    return result.value
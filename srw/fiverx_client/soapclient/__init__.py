@@ -1,13 +1,88 @@
+"""
+SOAP client for all fiverx methods.
 
-from . import(
-    ladeRzDienste,
-    ladeRzVersion,
-    ladeStatusRezept,
-    pruefeRezept,
-    raw,
-    sendeRezepte,
-    storniereRezept,
+Submodules (and the libraries they need, e.g. lxml and requests) are only
+imported when one of their names is accessed for the first time (PEP 562) so
+"srwlink-client" only loads what the selected subcommand actually needs.
+"""
+
+import importlib
+
+
+# subcommands of "srwlink-client" (modules providing "build_soap_xml()")
+SUBCOMMANDS = (
+    'ladeRzDienste',
+    'ladeRzVersion',
+    'ladeStatusRezept',
+    'pruefeRezept',
+    'raw',
+    'sendeRezepte',
+    'storniereRezept',
 )
-from .baseutils import *
-from .payload_validation import *
 
+# public names of the helper modules (must match their "__all__")
+_EXPORTS = {
+    'baseutils': (
+        'extract_payload_bytes',
+        'extract_response_payload',
+        'match_xpath',
+        'parse_soap_envelope',
+        'send_request',
+    ),
+    'compression': ('compress_chunks', 'CONTENT_ENCODINGS'),
+    'envelope_stream': ('iter_payload_chunks', 'PayloadTarget'),
+    'payload_validation': (
+        'get_schema',
+        'get_validating_parser',
+        'preload_schemas',
+        'validate_document',
+        'validate_payload',
+    ),
+    'request': (
+        'assemble_soap_request',
+        'FIVERX_NS',
+        'InvalidInputError',
+        'parse_xml',
+        'PreparedRequest',
+        'sendHeader_element',
+        'soap_envelope_parts',
+        'SoapRequest',
+    ),
+    'response': ('parse_soap_response',),
+    'retry': (
+        'call_with_retries',
+        'Deadline',
+        'DeadlineExceeded',
+        'iter_body',
+        'read_body',
+        'RetryBudget',
+        'RetryPolicy',
+    ),
+    'status_records': ('iter_status_records',),
+    'streaming': (
+        'coalesce_chunks',
+        'escape_xml_bytes',
+        'iter_base64',
+        'iter_xml_content',
+        'StreamingSoapRequest',
+    ),
+    'transport': ('get_default_transport', 'Transport'),
+}
+_MODULE_FOR_NAME = {name: module_name for module_name, names in _EXPORTS.items() for name in names}
+
+__all__ = list(SUBCOMMANDS) + sorted(_MODULE_FOR_NAME)
+
+def __getattr__(name):
+    if name in SUBCOMMANDS:
+        return importlib.import_module(f'{__name__}.{name}')
+    module_name = _MODULE_FOR_NAME.get(name)
+    if module_name is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    module = importlib.import_module(f'{__name__}.{module_name}')
+    value = getattr(module, name)
+    # cache the value so "__getattr__()" is not called again
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
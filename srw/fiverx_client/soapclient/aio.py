@@ -0,0 +1,205 @@
+
+"""
+asyncio API for all SOAP methods.
+
+    client = AsyncClient(ws_url, header_params, max_concurrency=200)
+    async with client:
+        result = await client.ladeStatusRezept('erezept', '123')
+        if result:
+            print(result.document)
+
+Network I/O is done with "aiohttp" (optional dependency, install with the
+"async" extra). All requests share one connection pool ("pool_size") and at
+most "max_concurrency" requests are in flight at the same time. Building large
+requests and parsing large responses is CPU-bound and therefore done in a
+thread pool so the event loop stays responsive.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import functools
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from . import (
+    ladeRzDienste,
+    ladeRzVersion,
+    ladeStatusRezept,
+    pruefeRezept,
+    raw,
+    sendeRezepte,
+    storniereRezept,
+)
+from .request import InvalidInputError, SoapRequest
+from .response import parse_soap_response
+from .transport import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+from ..lib import Result
+from ..utils import parse_command_args
+
+
+__all__ = ['AsyncClient', 'AsyncResponse']
+
+COMMAND_MODULES = {
+    'ladeRzDienste': ladeRzDienste,
+    'ladeRzVersion': ladeRzVersion,
+    'ladeStatusRezept': ladeStatusRezept,
+    'pruefeRezept': pruefeRezept,
+    'raw': raw,
+    'sendeRezepte': sendeRezepte,
+    'storniereRezept': storniereRezept,
+}
+# requests/responses smaller than this are built/parsed directly within the
+# event loop (a thread switch costs more than the actual work)
+INLINE_PROCESSING_LIMIT = 64 * 1024
+
+
+class AsyncResponse(object):
+    "HTTP response with the attributes of requests' response used by the parser"
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+
+class AsyncClient(object):
+    """Every request must be complete within "deadline" seconds (optional,
+    includes reading the response). Connecting to the server and each read
+    are limited by "connect_timeout"/"read_timeout" (same as Transport)."""
+    def __init__(self, ws_url, header_params, *, version='01.10', verify_cert=True, hostname=None,
+                 pool_size=100, max_concurrency=100, cpu_workers=4,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT, deadline=None):
+        if aiohttp is None:
+            raise ImportError('AsyncClient requires "aiohttp"')
+        self.ws_url = ws_url
+        self.header_params = header_params
+        self.version = version
+        self.verify_cert = verify_cert
+        self.hostname = hostname
+        self.pool_size = pool_size
+        self.max_concurrency = max_concurrency
+        self.timeout = aiohttp.ClientTimeout(
+            total        = deadline,
+            sock_connect = connect_timeout,
+            sock_read    = read_timeout,
+        )
+        self._executor = ThreadPoolExecutor(max_workers=cpu_workers)
+        # created lazily because aiohttp requires a running event loop
+        self._session = None
+        self._semaphore = None
+
+    @classmethod
+    def from_settings(cls, settings, header_params, **kwargs):
+        "use the URL, hostname, pool size, timeouts and deadline of the settings"
+        pool_size = settings.get('pool_size')
+        if pool_size:
+            kwargs.setdefault('pool_size', int(pool_size))
+        kwargs.setdefault('hostname', settings.get('hostname'))
+        for key in ('connect_timeout', 'read_timeout', 'deadline'):
+            value = settings.get(key)
+            if value:
+                kwargs.setdefault(key, float(value))
+        return cls(settings['url'], header_params, **kwargs)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self._executor.shutdown(wait=False)
+
+    def _get_session(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit = self.pool_size,
+                ssl   = None if self.verify_cert else False,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def _run_cpu_bound(self, func, *args, inline=False, **kwargs):
+        if inline:
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def build(self, command_name, command_args):
+        """Build the SOAP request (SoapRequest) for "command_name".
+        "command_args" can be a list of command line arguments (as for
+        "srwlink-client") or an already parsed dict.
+
+        Raises InvalidInputError if the arguments or input files are not
+        valid."""
+        cmd_module = COMMAND_MODULES[command_name]
+        if not isinstance(command_args, dict):
+            try:
+                command_args = parse_command_args(cmd_module.__doc__, list(command_args), {})
+            except SystemExit as e:
+                # docopt raises DocoptExit (or SystemExit for "--help"), the
+                # event loop must not be stopped by bad arguments
+                raise InvalidInputError(f'invalid arguments for {command_name}: {e}') from None
+        # only commands with input files might need significant CPU time
+        has_input_files = ('<XML>' in command_args)
+        return await self._run_cpu_bound(
+            cmd_module.build_soap_request, self.header_params, command_args,
+            version = self.version,
+            inline  = not has_input_files,
+        )
+
+    async def send(self, soap_xml):
+        session = self._get_session()
+        headers = {
+            'SOAPAction': '',
+            'User-Agent': 'Python SRW Testclient',
+            'Content-Type': 'text/xml; charset=UTF-8',
+        }
+        if self.hostname:
+            headers['Host'] = self.hostname
+        if isinstance(soap_xml, SoapRequest):
+            soap_xml = soap_xml.soap_bytes
+        elif isinstance(soap_xml, str):
+            soap_xml = soap_xml.encode('UTF-8')
+        if not isinstance(soap_xml, (bytes, bytearray)):
+            # aiohttp does not accept other buffers (e.g. the memory map of
+            # "raw" requests), a memoryview avoids copying the data
+            soap_xml = memoryview(soap_xml)
+        async with self._semaphore:
+            async with session.post(self.ws_url, data=soap_xml, headers=headers, allow_redirects=False) as response:
+                content = await response.read()
+                return AsyncResponse(response.status, response.headers, content)
+
+    async def parse(self, response, payload_xpath):
+        is_small = (len(response.content) < INLINE_PROCESSING_LIMIT)
+        return await self._run_cpu_bound(parse_soap_response, response, payload_xpath, inline=is_small)
+
+    async def call(self, command_name, command_args=()):
+        cmd_module = COMMAND_MODULES[command_name]
+        try:
+            soap_request = await self.build(command_name, command_args)
+        except (InvalidInputError, OSError) as e:
+            # e.g. missing input files
+            return Result(10, message=str(e), document=None)
+        try:
+            response = await self.send(soap_request)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return Result(15, message=f'unable to send request to {self.ws_url}: {e}', document=None)
+        return await self.parse(response, cmd_module.response_payload_xpath)
+
+
+def _command_method(command_name):
+    async def call_command(self, *command_args):
+        return await self.call(command_name, command_args)
+    call_command.__name__ = command_name
+    call_command.__doc__ = COMMAND_MODULES[command_name].__doc__
+    return call_command
+
+for _command_name in COMMAND_MODULES:
+    setattr(AsyncClient, _command_name, _command_method(_command_name))
@@ -1,42 +1,27 @@
 
-import sys
+import functools
 
 from lxml import etree
-import requests
 try:
     from requests.packages import urllib3
 except ImportError:
     import urllib3
 
-from ..utils import strip_xml_encoding
+from .compression import compress_chunks
+from .retry import call_with_retries, read_body
+from .streaming import STREAM_CHUNK_SIZE
+from .transport import get_default_transport
+from ..utils import strip_xml_declaration, strip_xml_encoding
 
 
 __all__ = [
-    'assemble_soap_xml',
+    'extract_payload_bytes',
     'extract_response_payload',
     'match_xpath',
-    'minimize_xml',
-    'sendHeader_xml',
+    'parse_soap_envelope',
     'send_request',
 ]
 
-sendHeader_template = '''
-<sendHeader>
-    <rzKdNr>%(user)s</rzKdNr>
-    <avsSw>
-        <hrst>SRW</hrst>
-        <nm>Testclient</nm>
-        <vs>1.0</vs>
-    </avsSw>
-    <apoIk>%(apoik)s</apoIk>
-    <test>%(test)s</test>
-    <pw>%(password)s</pw>
-</sendHeader>
-'''
-
-def sendHeader_xml(**kwargs):
-    return sendHeader_template % kwargs
-
 rzeParamVersion_xml = '''
 <?xml version="1.0" encoding="ISO-8859-15"?>
 <rzeParamVersion xmlns="http://fiverx.de/spec/abrechnungsservice">
@@ -44,60 +29,114 @@ rzeParamVersion_xml = '''
 </rzeParamVersion>
 '''.strip()
 
-def _escape_xml(xml):
-    return xml.replace('<', '&lt;').replace('>', '&gt;')
+def send_request(ws_url, soap_xml, chunked=True, *, verify_cert=True, hostname=None, transport=None, stream=False, timings=None, idempotent=False):
+    """Send the SOAP request and return the response. Each attempt uses the
+    timeouts of the transport, idempotent requests are retried according to
+    its retry policy (within the deadline of the transport).
 
-def assemble_soap_xml(soap_template, payload_xml, minimized=False, *, version='01.08'):
-    if minimized:
-        payload_xml = minimize_xml(payload_xml)
-    payload_str = _escape_xml(payload_xml)
-    version_str = _escape_xml(rzeParamVersion_xml % {'version': version})
-    soap_xml = soap_template.strip() % {'payload': payload_str, 'rze_param_version': version_str}
+    The request body is compressed if the transport has a
+    "request_compression". With "timings" the size of the request body
+    ("request_bytes", "request_bytes_sent") and of the response body
+    ("response_bytes", "response_bytes_received") are recorded as well.
 
-    # validate XML
-    try:
-        soap_bytes = soap_xml.encode('utf8')
-        etree.fromstring(soap_bytes)
-    except etree.XMLSyntaxError as e:
-        print('==> invalid request XML: %s <==' % e)
-        print(soap_xml)
-        sys.exit(20)
-    return soap_xml
-
-def send_request(ws_url, soap_xml, chunked=True, *, verify_cert=True, hostname=None):
+    The deadline also covers reading the response body unless "stream" is
+    set (the caller reads the body then)."""
     charset_str = 'UTF-8'
+    # requests 2.8.1 raised an exception when I passed str data for a
+    # chunked request and required byte data
+    # We set the charset anyway in the Content-Type header so we can also
+    # encode the request data here.
+    if isinstance(soap_xml, str):
+        soap_xml = soap_xml.encode(charset_str)
     def payload_gen():
-        # requests 2.8.1 raised an exception when I passed str data for a
-        # chunked request and required byte data
-        # We set the charset anyway in the Content-Type header so we can also
-        # encode the request data here.
-        yield soap_xml.encode(charset_str)
+        yield soap_xml
+    if hasattr(soap_xml, 'iter_chunks'):
+        # StreamingSoapRequest: the request body is generated while sending
+        chunked = True
+        payload_gen = soap_xml.iter_chunks
+    elif not isinstance(soap_xml, bytes):
+        # other buffers (e.g. memory-mapped files) are sent in slices, the
+        # HTTP libraries would copy a chunk (or read the file) completely
+        soap_xml = memoryview(soap_xml)
+        def payload_gen():
+            for offset in range(0, len(soap_xml), STREAM_CHUNK_SIZE):
+                yield soap_xml[offset:offset + STREAM_CHUNK_SIZE]
     headers = {
         'SOAPAction': '',
         'User-Agent': 'Python SRW Testclient',
         'Content-Type': 'text/xml; charset=' + charset_str,
+        # requests decodes compressed responses transparently
+        'Accept-Encoding': 'gzip, deflate',
     }
-    if hostname:
-        headers['Host'] = hostname
     if chunked:
         headers['Transfer-Encoding'] = 'chunked'
-        data = payload_gen()
-    else:
-        data = soap_xml
     if not verify_cert:
         # avoid "InsecureRequestWarning" from urllib3:
         # "Unverified HTTPS request is being made. Adding certificate verification is strongly advised."
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-    response = requests.post(ws_url, data=data, headers=headers, verify=verify_cert, allow_redirects=False)
+    if transport is None:
+        transport = get_default_transport()
+    compression = transport.request_compression
+    sizes = {}
+    body = soap_xml
+    if compression:
+        headers['Content-Encoding'] = compression
+        if not chunked:
+            # compress only once, retries send the same body
+            body = b''.join(compress_chunks([soap_xml], compression, sizes=sizes))
+
+    def send_attempt(timeout):
+        # a new generator for each attempt (retries must send the full request)
+        if not chunked:
+            data = body
+        elif compression:
+            data = compress_chunks(payload_gen(), compression, sizes=sizes)
+        else:
+            data = payload_gen()
+        # stream=True: the response body is only read when accessed (e.g. via
+        # "response.iter_content()")
+        return transport.post(ws_url, data=data, headers=headers, verify_cert=verify_cert,
+            hostname=hostname, stream=(stream or read_separately), timeout=timeout)
+    deadline = transport.new_deadline()
+    # the body is read after "send()" to measure the download and to check the
+    # deadline while reading
+    read_separately = (timings is not None) or (deadline is not None)
+    send = functools.partial(call_with_retries, send_attempt, transport.timeout,
+        policy     = transport.retry_policy,
+        deadline   = deadline,
+        idempotent = idempotent,
+    )
+    if timings is None:
+        response = send()
+        if not stream:
+            read_body(response, deadline)
+        return response
+
+    # "send" covers DNS lookup, connect/TLS handshake (if no connection can
+    # be reused), uploading the request and waiting for the response headers
+    # (time to first byte) including retries. requests does not expose these
+    # steps separately.
+    with timings.measure('send'):
+        response = send()
+    if (not compression) and (not chunked):
+        sizes = {'uncompressed': len(soap_xml), 'compressed': len(soap_xml)}
+    # (the size of uncompressed chunked requests is unknown)
+    if sizes:
+        timings.set_bytes('request_bytes', sizes['uncompressed'])
+        timings.set_bytes('request_bytes_sent', sizes['compressed'])
+    if not stream:
+        with timings.measure('download'):
+            read_body(response, deadline)
+        timings.set_bytes('response_bytes', len(response.content))
+        # number of (possibly compressed) bytes read from the connection
+        timings.set_bytes('response_bytes_received', response.raw.tell())
     return response
 
-def minimize_xml(xml_str):
-    minimized_payload = ''
-    for i, line in enumerate(xml_str.split('\n')):
-        minimized_payload += line.strip()
-        if i == 0:
-            minimized_payload += '\n'
-    return minimized_payload
+def parse_soap_envelope(soap_bytes):
+    # The escaped payload is a single text node which exceeds libxml2's
+    # default limit (10 MB, "Text node too long") for large requests/responses.
+    parser = etree.XMLParser(huge_tree=True)
+    return etree.fromstring(soap_bytes, parser)
 
 def match_xpath(root, xpath):
     namespaces = {
@@ -116,3 +155,13 @@ def extract_response_payload(root, xpath):
     else:
         return ''
     return strip_xml_encoding(payload_str)
+
+def extract_payload_bytes(root, xpath):
+    """Return the (escaped) fiverx payload as UTF-8 encoded bytes without XML
+    declaration so it can be passed to a (validating) parser directly."""
+    element = match_xpath(root, xpath)
+    if (element is None) or (element.text is None):
+        return b''
+    # encode first so the declaration can be removed without copying the
+    # (possibly huge) string again
+    return strip_xml_declaration(element.text.encode('UTF-8'))
@@ -0,0 +1,33 @@
+
+import zlib
+
+
+__all__ = ['compress_chunks', 'CONTENT_ENCODINGS']
+
+# "Content-Encoding" -> zlib "wbits" ("deflate" means zlib format, RFC 9110)
+CONTENT_ENCODINGS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS,
+}
+
+def compress_chunks(chunks, encoding, *, level=6, sizes=None):
+    """Compress the byte strings in "chunks" incrementally with the given HTTP
+    content coding ("gzip" or "deflate") and yield the compressed data.
+
+    If "sizes" (dict) is given the number of uncompressed/compressed bytes is
+    stored as "uncompressed"/"compressed" once all chunks were processed."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, CONTENT_ENCODINGS[encoding])
+    uncompressed_size = 0
+    compressed_size = 0
+    for chunk in chunks:
+        uncompressed_size += len(chunk)
+        data = compressor.compress(chunk)
+        if data:
+            compressed_size += len(data)
+            yield data
+    data = compressor.flush()
+    compressed_size += len(data)
+    if sizes is not None:
+        sizes['uncompressed'] = uncompressed_size
+        sizes['compressed'] = compressed_size
+    yield data
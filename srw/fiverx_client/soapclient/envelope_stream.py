@@ -0,0 +1,101 @@
+
+import re
+
+from lxml import etree
+
+
+__all__ = ['iter_payload_chunks', 'PayloadTarget']
+
+_xml_declaration = re.compile(r'^\s*<\?xml[^>]*\?>')
+
+def _is_response(tag):
+    return tag.endswith('Response')
+
+def iter_payload_chunks(chunks, *, is_container=_is_response):
+    """Yield the (unescaped) payload of the SOAP envelope read from "chunks"
+    (iterable of bytes) as UTF-8 encoded bytes while the envelope is parsed.
+    The payload is never kept in memory as a whole.
+
+    The payload is the text of the first child of the element matched by
+    "is_container(tag)" (by default the "...Response" element). Its XML
+    declaration is removed (the declared encoding does not apply anymore).
+    Raises XMLSyntaxError if the envelope is not well-formed XML and
+    ValueError if the envelope does not contain a payload."""
+    payload_chunks = _ChunkBuffer()
+    envelope_target = PayloadTarget(payload_chunks, is_container=is_container)
+    envelope_parser = etree.XMLParser(target=envelope_target, huge_tree=True)
+    for chunk in chunks:
+        envelope_parser.feed(chunk)
+        yield from payload_chunks.pop_all()
+    envelope_parser.close()
+    yield from payload_chunks.pop_all()
+    if not envelope_target.found_payload:
+        raise ValueError('no payload found in SOAP envelope')
+
+
+class _ChunkBuffer(object):
+    "collects the data passed to \"feed()\""
+    def __init__(self):
+        self._chunks = []
+
+    def feed(self, data):
+        self._chunks.append(data)
+
+    def pop_all(self):
+        chunks = self._chunks
+        self._chunks = []
+        return chunks
+
+
+class PayloadTarget(object):
+    """lxml parser target for the SOAP envelope which passes the text of the
+    payload element (first child of the element matched by "is_container",
+    by default the "...Response" element) to "payload_parser.feed()" as
+    soon as it is received."""
+    def __init__(self, payload_parser, *, is_container=_is_response):
+        self.payload_parser = payload_parser
+        self.is_container = is_container
+        self.depth = 0
+        self.payload_depth = None
+        self.found_payload = False
+        self._is_complete = False
+        self._head = ''
+
+    def start(self, tag, attrib):
+        self.depth += 1
+        if (self.payload_depth is None) and self.is_container(tag):
+            self.payload_depth = self.depth + 1
+
+    def end(self, tag):
+        if self.is_in_payload():
+            if self._head:
+                self._feed_payload('', final=True)
+            # ignore all following siblings (e.g. "rzeParamVersion")
+            self._is_complete = True
+        self.depth -= 1
+
+    def data(self, data):
+        if self.is_in_payload():
+            self._feed_payload(data)
+
+    def close(self):
+        pass
+
+    def is_in_payload(self):
+        return (self.depth == self.payload_depth) and (not self._is_complete)
+
+    def _feed_payload(self, data, final=False):
+        if not self.found_payload:
+            # The payload usually starts with an XML declaration which does
+            # not match the actual encoding (UTF-8) so it must be stripped.
+            # Buffer the start until the declaration is complete.
+            self._head += data
+            head = self._head.lstrip()
+            is_incomplete = '<?'.startswith(head) or (head.startswith('<?') and ('?>' not in head))
+            if is_incomplete and not final:
+                return
+            self.found_payload = bool(head)
+            self._head = ''
+            data = _xml_declaration.sub('', head, count=1)
+        if data:
+            self.payload_parser.feed(data.encode('UTF-8'))
@@ -5,36 +5,24 @@ Usage:
     ladeRzDienste
 """
 
-from .baseutils import assemble_soap_xml, sendHeader_xml
+from .request import assemble_soap_request, F, sendHeader_element
 
 
 __all__ = [
-    'build_soap_xml'
+    'build_soap_request',
+    'build_soap_xml',
 ]
 
 def build_soap_xml(header_params, command_args, minimized=False, *,  version):
-    template = payload_template.strip()
-    sendHeader = sendHeader_xml(**header_params)
-    payload_xml = template % {'sendHeader': sendHeader}
-    soap_xml = assemble_soap_xml(soap_template, payload_xml, minimized=minimized, version=version)
-    return soap_xml
+    return build_soap_request(header_params, command_args, minimized=minimized, version=version).soap_xml
 
-response_payload_xpath = '//fiverx:ladeRzDiensteResponse/result'
+def build_soap_request(header_params, command_args, minimized=False, *,  version):
+    payload = F.rzeParamDienste(
+        sendHeader_element(**header_params),
+    )
+    return assemble_soap_request('ladeRzDienste', payload, minimized=minimized, version=version)
 
-payload_template = '''
-<?xml version='1.0' encoding='UTF-8'?>
-<rzeParamDienste xmlns="http://fiverx.de/spec/abrechnungsservice">
-  %(sendHeader)s
-</rzeParamDienste>
-'''
-
-soap_template = '''
-<senv:Envelope xmlns:senv="http://schemas.xmlsoap.org/soap/envelope/">
-<senv:Body>
-<fiverx:ladeRzDienste xmlns:fiverx="http://fiverx.de/spec/abrechnungsservice/types">
-    <rzeParamDienste>%(payload)s</rzeParamDienste>
-    <rzeParamVersion>%(rze_param_version)s</rzeParamVersion>
-</fiverx:ladeRzDienste>
-</senv:Body></senv:Envelope>
-'''
+response_payload_xpath = '//fiverx:ladeRzDiensteResponse/result'
 
+# read-only method, can be retried safely
+is_idempotent = True
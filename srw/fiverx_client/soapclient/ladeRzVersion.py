@@ -5,35 +5,25 @@ Usage:
     ladeRzVersion
 """
 
-from .baseutils import assemble_soap_xml, sendHeader_xml
+from .request import assemble_soap_request, F, sendHeader_element
 
 
 __all__ = [
-    'build_soap_xml'
+    'build_soap_request',
+    'build_soap_xml',
 ]
 
 def build_soap_xml(header_params, command_args, minimized=False, *, version=None):
+    return build_soap_request(header_params, command_args, minimized=minimized, version=version).soap_xml
+
+def build_soap_request(header_params, command_args, minimized=False, *, version=None):
     # version not used for this SOAP method
-    template = payload_template.lstrip('\n')
-    sendHeader = sendHeader_xml(**header_params)
-    payload_xml = template % {'sendHeader': sendHeader}
-    soap_xml = assemble_soap_xml(soap_template, payload_xml, minimized=minimized)
-    return soap_xml
+    payload = F.rzeParamLadeVersion(
+        sendHeader_element(**header_params),
+    )
+    return assemble_soap_request('ladeRzVersion', payload, minimized=minimized)
 
 response_payload_xpath = '//fiverx:ladeRzVersionResponse/result'
 
-payload_template = '''
-<?xml version='1.0' encoding='UTF-8'?>
-<rzeParamLadeVersion xmlns="http://fiverx.de/spec/abrechnungsservice">
-  %(sendHeader)s
-</rzeParamLadeVersion>
-'''
-
-soap_template = '''
-<senv:Envelope xmlns:senv="http://schemas.xmlsoap.org/soap/envelope/">
-<senv:Body>
-  <fiverx:ladeRzVersion xmlns:fiverx="http://fiverx.de/spec/abrechnungsservice/types">
-    <rzeParamLadeVersion>%(payload)s</rzeParamLadeVersion>
-  </fiverx:ladeRzVersion>
-</senv:Body></senv:Envelope>
-'''
+# read-only method, can be retried safely
+is_idempotent = True
@@ -1,82 +1,86 @@
 """
 Fragt den Status von zuvor eingelieferten Rezepten ab.
 
+Mit --records wird jeder Status-Eintrag als JSON-Zeile ausgegeben, sobald er
+empfangen wurde (für Lieferungen mit sehr vielen Rezepten).
+
 Usage:
-    ladeStatusRezept lieferung <LIEFERID> [<STATUS>]
-    ladeStatusRezept erezept <EREZEPTID>
-    ladeStatusRezept muster16 <MUSTER16ID>
-    ladeStatusRezept prezept <TRANSAKTIONSNUMMER> <JAHR>
+    ladeStatusRezept [--records] lieferung <LIEFERID> [<STATUS>]
+    ladeStatusRezept [--records] erezept <EREZEPTID>
+    ladeStatusRezept [--records] muster16 <MUSTER16ID>
+    ladeStatusRezept [--records] prezept <TRANSAKTIONSNUMMER> <JAHR>
 """
 
-from .baseutils import assemble_soap_xml, sendHeader_xml
+from .request import assemble_soap_request, F, PreparedRequest, sendHeader_element
+from .status_records import iter_status_records
 from ..utils import EREZEPT, MUSTER16, PREZEPT
 
 
 __all__ = [
-    'build_soap_xml'
+    'build_soap_request',
+    'build_soap_xml',
+    'iter_response_records',
+    'prepare_request',
 ]
 
 def build_soap_xml(header_params, command_args, minimized=False, *, version):
+    return build_soap_request(header_params, command_args, minimized=minimized, version=version).soap_xml
+
+def build_soap_request(header_params, command_args, minimized=False, *, version):
     per_submission_id = bool(command_args['lieferung'])
     query_muster16 = bool(command_args['muster16'])
     query_erezept = bool(command_args['erezept'])
     query_prezept = bool(command_args['prezept'])
     if per_submission_id:
         submission_id = command_args['<LIEFERID>']
-        query_xml = query_perLieferID(submission_id, 'ALLE')
+        query = query_perLieferID(submission_id, 'ALLE')
     elif query_erezept:
         erezept_id = command_args['<EREZEPTID>']
-        query_xml = query_perRezeptID(EREZEPT, erezept_id)
+        query = query_perRezeptID(EREZEPT, erezept_id)
     elif query_muster16:
         muster16_id = command_args['<MUSTER16ID>']
-        query_xml = query_perRezeptID(MUSTER16, muster16_id)
+        query = query_perRezeptID(MUSTER16, muster16_id)
     elif query_prezept:
         tid = command_args['<TRANSAKTIONSNUMMER>']
         year = command_args['<JAHR>']
-        query_xml = query_perRezeptID(PREZEPT, tid, year)
-    template = payload_template.strip()
-    sendHeader = sendHeader_xml(**header_params)
-    payload_xml = template % {'sendHeader': sendHeader, 'query_xml': query_xml}
-    soap_xml = assemble_soap_xml(soap_template, payload_xml, minimized=minimized, version=version)
-    return soap_xml
+        query = query_perRezeptID(PREZEPT, tid, year)
+    payload = F.rzeParamStatus(
+        sendHeader_element(**header_params),
+        query,
+    )
+    return assemble_soap_request('ladeStatusRezept', payload, minimized=minimized, version=version)
 
 response_payload_xpath = '//fiverx:ladeStatusRezeptResponse/result'
 
+# read-only method, can be retried safely
+is_idempotent = True
+
+def prepare_request(header_params, *, version):
+    """Return a PreparedRequest for frequent status queries with the same
+    credentials, e.g.
+
+        prepared = prepare_request(header_params, version='01.10')
+        soap_request = prepared.build(query_perLieferID(liefer_id, 'ALLE'))"""
+    return PreparedRequest('ladeStatusRezept', 'rzeParamStatus', header_params, version=version)
+
+def iter_response_records(chunks):
+    "yield the status records of the (streamed) SOAP response one at a time"
+    return iter_status_records(chunks)
+
 def query_perLieferID(submission_id, status):
-    return u'''
-        <perLieferID>
-            <rzLieferId>%s</rzLieferId>
-            <rezeptStatus>%s</rezeptStatus>
-        </perLieferID>''' % (submission_id, status)
+    return F.perLieferID(
+        F.rzLieferId(submission_id),
+        F.rezeptStatus(status),
+    )
 
 def query_perRezeptID(ptype, document_id, year=None):
     if ptype == PREZEPT:
-        parameter_xml = '''
-                <transaktionsNummer>%s</transaktionsNummer>
-                <erstellungsJahr>%s</erstellungsJahr>
-        ''' % (document_id, year)
+        parameters = (
+            F.transaktionsNummer(document_id),
+            F.erstellungsJahr(year),
+        )
     elif ptype == EREZEPT:
-        parameter_xml = f'<eRezeptId>{document_id}</eRezeptId>'
+        parameters = (F.eRezeptId(document_id), )
     else:
-        parameter_xml = '<muster16Id>%s</muster16Id>' % document_id
-    return '<perRezeptID>%s</perRezeptID>' % parameter_xml
-
-
-payload_template = '''
-<?xml version='1.0' encoding='UTF-8'?>
-<rzeParamStatus xmlns="http://fiverx.de/spec/abrechnungsservice">
-  %(sendHeader)s
-  %(query_xml)s
-</rzeParamStatus>
-'''
-
-soap_template = '''
-<senv:Envelope xmlns:senv="http://schemas.xmlsoap.org/soap/envelope/">
-<senv:Body>
-<fiverx:ladeStatusRezept xmlns:fiverx="http://fiverx.de/spec/abrechnungsservice/types">
-    <rzeParamStatus>%(payload)s</rzeParamStatus>
-    <rzeParamVersion>%(rze_param_version)s</rzeParamVersion>
-</fiverx:ladeStatusRezept>
-</senv:Body></senv:Envelope>
-'''
-
+        parameters = (F.muster16Id(document_id), )
+    return F.perRezeptID(*parameters)
@@ -1,8 +1,14 @@
 
 from base64 import b64encode
 
+from lxml import etree
+
+from .request import F, FIVERX_NS
+from ..lib import strip_buffer
+
 
 __all__ = [
+    'append_prescription',
     'is_eDispensierung',
     'wrap_eDispensierung_in_fiverx_erezept',
 ]
@@ -12,12 +18,23 @@ def is_eDispensierung(xml_doc):
 
 def wrap_eDispensierung_in_fiverx_erezept(xml_doc, xml_bytes):
     erezept_id = xml_doc.attrib['RezeptId']
-    b64_edispensierung = b64encode(xml_bytes.strip()).decode('ASCII')
-    return erezept_template % {'id': erezept_id, 'data': b64_edispensierung}
-
-erezept_template = '''
-  <eRezept>
-    <eRezeptId>%(id)s</eRezeptId>
-    <eRezeptData>%(data)s</eRezeptData>
-  </eRezept>
-'''
+    b64_edispensierung = b64encode(strip_buffer(xml_bytes)).decode('ASCII')
+    return F.eRezept(
+        F.eRezeptId(erezept_id),
+        F.eRezeptData(b64_edispensierung),
+    )
+
+def append_prescription(parent, xml_doc, xml_bytes):
+    """Add the prescription "xml_doc" (parsed from "xml_bytes") to the fiverx
+    element "parent". eDispensierung documents are wrapped in an <eRezept>."""
+    if is_eDispensierung(xml_doc):
+        parent.append(wrap_eDispensierung_in_fiverx_erezept(xml_doc, xml_bytes))
+        return
+    parent.append(xml_doc)
+    # Prescription files might not declare the fiverx namespace. Within the
+    # serialized payload these elements inherit the default (fiverx) namespace
+    # so the tree must use the same namespace (otherwise the schema validation
+    # would fail).
+    for element in xml_doc.iter(etree.Element):
+        if etree.QName(element).namespace is None:
+            element.tag = '{%s}%s' % (FIVERX_NS, element.tag)
@@ -1,29 +1,85 @@
 
+from pathlib import Path
 import re
+import threading
 
 from lxml import etree, objectify
 from lxml.etree import XMLSchema
-import pkg_resources
 
 from ..lib import Result
 
 
-__all__ = ['validate_payload']
+__all__ = [
+    'get_schema',
+    'get_validating_parser',
+    'preload_schemas',
+    'validate_document',
+    'validate_payload',
+]
 
-def validate_payload(payload_string, *, version='01.08'):
+KNOWN_VERSIONS = ('01.08', '01.10')
+# The package is not zip-safe so the schema files can be read directly
+# ("pkg_resources" is not needed for that and very slow to import).
+SCHEMA_DIR = Path(__file__).parent / 'static'
+
+# Compiling the XML schema is by far the most expensive step of the validation
+# so every schema is only compiled once per process. XMLSchema instances can be
+# shared between threads but lxml parsers must not be used concurrently so each
+# thread gets its own (validating) parser.
+_schemas = {}
+_schemas_lock = threading.Lock()
+_thread_local = threading.local()
+
+def get_schema(version):
+    xmlschema = _schemas.get(version)
+    if xmlschema is not None:
+        return xmlschema
+    with _schemas_lock:
+        xmlschema = _schemas.get(version)
+        if xmlschema is None:
+            xmlschema = _compile_schema(version)
+            _schemas[version] = xmlschema
+    return xmlschema
+
+def get_validating_parser(version):
+    parsers = getattr(_thread_local, 'parsers', None)
+    if parsers is None:
+        parsers = {}
+        _thread_local.parsers = parsers
+    parser = parsers.get(version)
+    if parser is None:
+        parser = objectify.makeparser(schema=get_schema(version))
+        parsers[version] = parser
+    return parser
+
+def preload_schemas(versions=KNOWN_VERSIONS):
+    """Compile the XML schemas (and the parser for the current thread) upfront
+    so the first request does not have to pay for that."""
+    for version in versions:
+        get_validating_parser(version)
+
+def _compile_schema(version):
     assert re.match('^01\.\d{2}', version), version
     version_suffix = version.replace('.', '_')
     xsd_fn = f'RZeRezept_{version_suffix}.xsd'
-    parent_module = __name__.rsplit('.', 1)[0]
-    xsd_string = pkg_resources.resource_string(parent_module+'.static', xsd_fn)
-    xmlschema = XMLSchema(etree.fromstring(xsd_string))
-    parser = objectify.makeparser(schema=xmlschema)
+    xsd_string = (SCHEMA_DIR / xsd_fn).read_bytes()
+    return XMLSchema(etree.fromstring(xsd_string))
 
+def validate_payload(payload_string, *, version='01.08'):
+    parser = get_validating_parser(version)
     if isinstance(payload_string, str):
         payload_string = payload_string.encode('utf-8')
     try:
-        validated_document = objectify.fromstring(payload_string.strip(), parser=parser)
+        # leading whitespace is not allowed before an XML declaration
+        validated_document = objectify.fromstring(payload_string.lstrip(), parser=parser)
     except etree.XMLSyntaxError as e:
         return Result(False, errors=[e])
     return Result(True, validated_document=validated_document, errors=None)
 
+def validate_document(document, *, version='01.08'):
+    """Validate an already parsed "document" (lxml element) so it does not have
+    to be serialized/parsed again just for the validation."""
+    xmlschema = get_schema(version)
+    if not xmlschema.validate(document):
+        return Result(False, errors=list(xmlschema.error_log))
+    return Result(True, validated_document=document, errors=None)
@@ -7,16 +7,25 @@ Usage:
     raw <XML>
 """
 
+from .request import SoapRequest
+from ..lib import map_file
+
 
 __all__ = [
-    'build_soap_xml'
+    'build_soap_request',
+    'build_soap_xml',
 ]
 
 def build_soap_xml(header_params, command_args, minimized=False, *, version):
+    return build_soap_request(header_params, command_args, minimized=minimized, version=version).soap_xml
+
+def build_soap_request(header_params, command_args, minimized=False, *, version):
     xml_path = command_args['<XML>']
-    with open(xml_path, 'rb') as xml_fp:
-        soap_xml = xml_fp.read().decode('utf8')
-    return soap_xml
+    # Recorded requests can be huge: the memory map is sent (and parsed if
+    # necessary) directly, the file is never copied into memory as a whole.
+    # Payload (and version) are extracted from the request only when needed.
+    return SoapRequest(map_file(xml_path))
 
 response_payload_xpath = '//fiverx:*/result'
 
+is_idempotent = False
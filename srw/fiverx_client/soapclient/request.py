@@ -0,0 +1,166 @@
+
+import re
+
+from lxml import etree
+from lxml.builder import ElementMaker
+
+from .baseutils import match_xpath, parse_soap_envelope, rzeParamVersion_xml
+from .streaming import escape_xml_bytes
+from ..utils import strip_xml_declaration
+
+
+__all__ = [
+    'assemble_soap_request',
+    'FIVERX_NS',
+    'InvalidInputError',
+    'parse_xml',
+    'PreparedRequest',
+    'sendHeader_element',
+    'soap_envelope_parts',
+    'SoapRequest',
+]
+
+SOAP_ENV_NS = 'http://schemas.xmlsoap.org/soap/envelope/'
+FIVERX_NS = 'http://fiverx.de/spec/abrechnungsservice'
+FIVERX_TYPES_NS = 'http://fiverx.de/spec/abrechnungsservice/types'
+
+# builds elements in the fiverx namespace, e.g. "F.avsId('12')"
+F = ElementMaker(namespace=FIVERX_NS, nsmap={None: FIVERX_NS})
+
+
+class InvalidInputError(ValueError):
+    """Raised by "build_soap_request()" if an input file can not be used for
+    the request. The message is meant to be shown to the user."""
+
+
+class SoapRequest(object):
+    """A serialized SOAP request together with its fiverx payload (as lxml
+    tree) so the payload can be validated/printed without parsing the
+    request again.
+
+    If no payload tree is given (e.g. replayed requests) it is extracted from
+    the serialized request when it is accessed for the first time."""
+    def __init__(self, soap_bytes, payload=None, *, version=None):
+        # "soap_bytes" can be any buffer (e.g. a memory-mapped file)
+        self.soap_bytes = soap_bytes
+        self.version = version
+        self._payload = payload
+
+    @property
+    def soap_xml(self):
+        return str(self.soap_bytes, 'UTF-8')
+
+    @property
+    def payload(self):
+        if self._payload is None:
+            self._payload = _extract_request_payload(self.soap_bytes)
+        return self._payload
+
+    @property
+    def payload_version(self):
+        "version of the XML schema which should be used to validate the payload"
+        if self.version:
+            return self.version
+        match = re.search(rb'&lt;versionNr&gt;(01\.\d{2})&lt;/versionNr&gt;', self.soap_bytes)
+        if match:
+            return match.group(1).decode('ascii')
+        # This can happen for "ladeRzVersion"
+        return '01.10'
+
+
+class PreparedRequest(object):
+    """Builds requests for a fixed operation, credentials ("header_params")
+    and API version, e.g. for frequent status queries.
+
+    The SOAP envelope and the start of the payload (including <sendHeader>)
+    are serialized and escaped only once so every request just serializes
+    the variable payload elements and joins the byte strings:
+
+        prepared = PreparedRequest('ladeStatusRezept', 'rzeParamStatus', header_params, version='01.10')
+        soap_request = prepared.build(query_perLieferID('4711', 'ALLE'))
+
+    The requests are equivalent to "assemble_soap_request(..., minimized=True)"
+    (variable elements might repeat the namespace declaration). The payload
+    tree is only parsed if it is accessed (e.g. for validation)."""
+    def __init__(self, method_name, payload_name, header_params, *, version=None):
+        self.method_name = method_name
+        self.payload_name = payload_name
+        self.version = version
+        soap_prefix, soap_suffix = soap_envelope_parts(method_name, payload_name, version=version)
+        payload = F(payload_name, sendHeader_element(**header_params), etree.Comment(_PAYLOAD_MARKER))
+        payload_bytes = etree.tostring(payload, xml_declaration=True, encoding='UTF-8')
+        payload_prefix, payload_suffix = payload_bytes.split(b'<!--%s-->' % _PAYLOAD_MARKER.encode('ascii'))
+        self._prefix = soap_prefix + escape_xml_bytes(payload_prefix)
+        self._suffix = escape_xml_bytes(payload_suffix) + soap_suffix
+
+    def build(self, *elements):
+        "return a SoapRequest with the given elements appended to the payload"
+        parts = [self._prefix]
+        for element in elements:
+            parts.append(escape_xml_bytes(etree.tostring(element, encoding='UTF-8')))
+        parts.append(self._suffix)
+        return SoapRequest(b''.join(parts), version=self.version)
+
+
+def parse_xml(xml_bytes):
+    """Parse "xml_bytes" (lxml detects the encoding itself). Whitespace-only
+    text is removed so the tree can be pretty-printed later on."""
+    # lxml parsers must not be shared between threads
+    parser = etree.XMLParser(remove_blank_text=True)
+    return etree.fromstring(xml_bytes, parser)
+
+def sendHeader_element(*, user, apoik, test, password):
+    return F.sendHeader(
+        F.rzKdNr(user),
+        F.avsSw(
+            F.hrst('SRW'),
+            F.nm('Testclient'),
+            F.vs('1.0'),
+        ),
+        F.apoIk(apoik),
+        F.test(test),
+        F.pw(password),
+    )
+
+def assemble_soap_request(method_name, payload, minimized=False, *, version=None):
+    """Wrap the fiverx "payload" (lxml element) in a SOAP envelope for
+    "method_name". "rzeParamVersion" is only added if "version" is set.
+
+    The payload is serialized by lxml so the request is always well-formed
+    and does not have to be parsed again. The escaped payload bytes are
+    inserted into the serialized envelope directly (no decoding/second
+    serialization of the payload)."""
+    payload_bytes = etree.tostring(payload, xml_declaration=True, encoding='UTF-8', pretty_print=not minimized)
+    payload_name = etree.QName(payload).localname
+    soap_prefix, soap_suffix = soap_envelope_parts(method_name, payload_name, version=version)
+    soap_bytes = b''.join((soap_prefix, escape_xml_bytes(payload_bytes), soap_suffix))
+    return SoapRequest(soap_bytes, payload, version=version)
+
+def soap_envelope_parts(method_name, payload_name, *, version=None):
+    """Return the serialized SOAP envelope for "method_name" as two byte
+    strings (prefix, suffix). The escaped payload must be sent in between
+    (used to stream the payload without building the request in memory)."""
+    envelope = _build_envelope(method_name, payload_name, _PAYLOAD_MARKER, version=version)
+    soap_bytes = etree.tostring(envelope, encoding='UTF-8')
+    prefix, suffix = soap_bytes.split(_PAYLOAD_MARKER.encode('ascii'))
+    return prefix, suffix
+
+_PAYLOAD_MARKER = '__fiverx_payload__'
+
+def _build_envelope(method_name, payload_name, payload_str, *, version=None):
+    envelope = etree.Element(f'{{{SOAP_ENV_NS}}}Envelope', nsmap={'senv': SOAP_ENV_NS})
+    body = etree.SubElement(envelope, f'{{{SOAP_ENV_NS}}}Body')
+    method = etree.SubElement(body, f'{{{FIVERX_TYPES_NS}}}{method_name}', nsmap={'fiverx': FIVERX_TYPES_NS})
+    payload_param = etree.SubElement(method, payload_name)
+    payload_param.text = payload_str
+    if version is not None:
+        version_param = etree.SubElement(method, 'rzeParamVersion')
+        version_param.text = rzeParamVersion_xml % {'version': version}
+    return envelope
+
+def _extract_request_payload(soap_bytes):
+    root = parse_soap_envelope(soap_bytes)
+    fiverx_root = match_xpath(root, '//soap:Body/fiverx:*')
+    assert fiverx_root is not None
+    payload_param = fiverx_root[0]
+    return parse_xml(strip_xml_declaration(payload_param.text.encode('UTF-8')))
@@ -0,0 +1,46 @@
+
+from email.message import Message
+
+from lxml import etree
+
+from .baseutils import extract_payload_bytes, parse_soap_envelope
+from .payload_validation import validate_payload
+from ..lib import Result, Timings
+
+
+__all__ = ['parse_soap_response']
+
+def parse_soap_response(response, payload_xpath, *, version='01.08', timings=None):
+    """Extract and validate the fiverx payload from a SOAP response without
+    any output. "response" must provide "headers", "status_code" and
+    "content" (like requests' response).
+
+    The SOAP envelope is parsed from the raw response bytes and the payload
+    is parsed exactly once (using the schema-validating parser).
+
+    Returns a Result with the exit code (as used by "srwlink-client"), a
+    message, the validated document (or None) and the payload bytes (or None
+    if the response was not well-formed XML). The durations of the phases
+    "parse_response" and "validate_response" are added to "timings"."""
+    timings = Timings.or_null(timings)
+    if _content_type(response) == 'text/html':
+        msg = f'HTML response: Status {response.status_code} (text/html)'
+        return Result(21, message=msg, document=None, payload=None)
+    try:
+        with timings.measure('parse_response'):
+            root = parse_soap_envelope(response.content)
+            payload = extract_payload_bytes(root, payload_xpath)
+    except etree.XMLSyntaxError:
+        return Result(22, message='response data is not well-formed XML', document=None, payload=None)
+    with timings.measure('validate_response'):
+        is_valid = validate_payload(payload, version=version)
+    if not is_valid:
+        return Result(23, message='invalid XML response (XML Schema)', document=None, payload=payload)
+    return Result(0, message='OK', document=is_valid.validated_document, payload=payload)
+
+def _content_type(response):
+    "return the (lower-case) media type of the response without parameters"
+    # "email" parses the header like "cgi.parse_header()" (removed in Python 3.13)
+    headers = Message()
+    headers['Content-Type'] = response.headers.get('Content-Type', '')
+    return headers.get_content_type()
@@ -0,0 +1,153 @@
+
+import random
+import threading
+import time
+
+from requests.exceptions import ConnectionError, Timeout
+
+
+__all__ = [
+    'call_with_retries',
+    'Deadline',
+    'DeadlineExceeded',
+    'iter_body',
+    'read_body',
+    'RetryBudget',
+    'RetryPolicy',
+]
+
+# HTTP status codes which usually indicate a temporary problem (overloaded
+# server, failing proxy) so the request might succeed when it is repeated
+RETRY_STATUS_CODES = (502, 503, 504)
+BODY_CHUNK_SIZE = 64 * 1024
+
+
+class DeadlineExceeded(Timeout):
+    "raised if an operation can not be completed within its deadline"
+
+
+class Deadline(object):
+    """point in time when an operation (including all retries) must be complete
+
+    "call_with_retries()" only limits the time until the response headers
+    arrived, use "read_body()" or "iter_body()" to enforce the deadline while
+    reading the response body."""
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(self.expires_at - time.monotonic(), 0)
+
+    def limit(self, timeout):
+        """Return the (connect, read) "timeout" limited to the remaining time.
+        Raises DeadlineExceeded if the deadline has passed already."""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded('deadline exceeded')
+        connect_timeout, read_timeout = timeout
+        return (min(connect_timeout, remaining), min(read_timeout, remaining))
+
+
+class RetryBudget(object):
+    """Limits the number of retries across all requests so retries do not
+    multiply the load on a server which is already struggling.
+
+    Every request adds "ratio" tokens, every retry needs a full token. At most
+    "reserve" tokens are available (also the initial balance). Thread-safe."""
+    def __init__(self, ratio=0.1, *, reserve=10):
+        self.ratio = ratio
+        self.reserve = reserve
+        self._balance = reserve
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._balance = min(self._balance + self.ratio, self.reserve)
+
+    def withdraw(self):
+        "return True if a retry is allowed (and consume a token)"
+        with self._lock:
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+class RetryPolicy(object):
+    """Retry idempotent requests up to "max_retries" times after connection
+    errors, timeouts or a temporary server error (502/503/504).
+
+    The delay before the n-th retry is random between 0 and
+    "backoff * 2**n" seconds (at most "max_backoff", "full jitter") so
+    concurrent clients do not retry at the same time."""
+    def __init__(self, *, max_retries=2, backoff=0.5, max_backoff=8, budget=None,
+                 retry_status_codes=RETRY_STATUS_CODES):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget
+        self.retry_status_codes = retry_status_codes
+
+    def backoff_delay(self, retry_nr):
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** retry_nr)))
+
+
+def call_with_retries(send_attempt, timeout, *, policy=None, deadline=None, idempotent=False):
+    """Call "send_attempt(timeout)" (returns a requests response) and retry
+    according to "policy" if the operation is idempotent.
+
+    The (connect, read) "timeout" of each attempt is limited by "deadline" and
+    no retry is started if its backoff delay would exceed the deadline.
+    Returns the last response or raises the last exception."""
+    if (policy is not None) and (policy.budget is not None):
+        policy.budget.deposit()
+    retry_nr = 0
+    while True:
+        attempt_timeout = deadline.limit(timeout) if (deadline is not None) else timeout
+        try:
+            response = send_attempt(attempt_timeout)
+        except (ConnectionError, Timeout):
+            if not _may_retry(policy, retry_nr, deadline, idempotent=idempotent):
+                raise
+        else:
+            if response.status_code not in getattr(policy, 'retry_status_codes', ()):
+                return response
+            if not _may_retry(policy, retry_nr, deadline, idempotent=idempotent):
+                return response
+            # release the connection so it can be reused
+            response.close()
+        retry_nr += 1
+
+def iter_body(response, deadline=None, *, chunk_size=BODY_CHUNK_SIZE):
+    """Yield the body of a streamed requests "response" in chunks.
+
+    Each read is limited by the read timeout already, the "deadline" is checked
+    after every chunk. Raises DeadlineExceeded (and closes the response) if the
+    deadline passed before the body was read completely."""
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        if (deadline is not None) and (deadline.remaining() <= 0):
+            response.close()
+            raise DeadlineExceeded('deadline exceeded while reading the response')
+        yield chunk
+
+def read_body(response, deadline=None, *, chunk_size=BODY_CHUNK_SIZE):
+    """Read the body of a (streamed) requests "response" (see "iter_body()")
+    so it is available via "response.content" afterwards."""
+    if deadline is None:
+        response.content
+        return response
+    # same as "response.content" (which can not be used after "iter_content()")
+    response._content = b''.join(iter_body(response, deadline, chunk_size=chunk_size))
+    return response
+
+def _may_retry(policy, retry_nr, deadline, *, idempotent):
+    "wait for the backoff delay and return True if the request may be retried"
+    if (not idempotent) or (policy is None) or (retry_nr >= policy.max_retries):
+        return False
+    delay = policy.backoff_delay(retry_nr)
+    if (deadline is not None) and (deadline.remaining() <= delay):
+        return False
+    if (policy.budget is not None) and (not policy.budget.withdraw()):
+        return False
+    time.sleep(delay)
+    return True
@@ -8,117 +8,160 @@ Falls nur eine XML-Datei angegeben wurde und diese bereits die komplette
 <rzeLeistung>-Struktur enthält, wird nur der SOAP-Body zusätzlich generiert
 (Zugangsdaten aus der ini-Datei bleiben in diesem Fall unberücksichtigt).
 
+Mit --stream wird die Anfrage erst während der Übertragung erzeugt (chunked,
+ohne vorherige Validierung), so dass auch sehr viele/große Dateien ohne
+hohen Speicherverbrauch verschickt werden können.
+
 Usage:
-    sendeRezepte <XML>...
+    sendeRezepte [--stream] <XML>...
 """
 
 from pathlib import Path
-import sys
+from xml.sax.saxutils import escape
 
 from lxml import etree
 from lxml.etree import XMLSyntaxError
 
-from .baseutils import assemble_soap_xml, sendHeader_xml
-from .payload_helpers import is_eDispensierung, wrap_eDispensierung_in_fiverx_erezept
-from ..utils import decode_xml_bytes, strip_xml_encoding, textcolor, TermColor
+from .payload_helpers import append_prescription, is_eDispensierung
+from .request import (assemble_soap_request, F, FIVERX_NS, InvalidInputError,
+    parse_xml, sendHeader_element, soap_envelope_parts)
+from .streaming import (escape_xml_bytes, iter_base64, iter_xml_content,
+    StreamingSoapRequest, STREAM_CHUNK_SIZE)
+from ..lib import mapped_file
 
 
 __all__ = [
-    'build_soap_xml'
+    'build_soap_request',
+    'build_soap_xml',
+    'build_streaming_request',
 ]
 
-def build_soap_xml(header_params, command_args, minimized=False, *, version, avs_ids=None):
-    xml_paths = command_args['<XML>']
-    if avs_ids:
-        assert len(avs_ids) == len(xml_paths)
-    elif len(xml_paths) == 1:
-        avs_ids = ['12345']
-    else:
-        avs_ids = [str(i) * 5 for i in range(len(xml_paths))]
+def build_soap_xml(header_params, command_args, minimized=False, *, version, avs_ids=None, snd_id='42'):
+    soap_request = build_soap_request(header_params, command_args,
+        minimized=minimized, version=version, avs_ids=avs_ids, snd_id=snd_id)
+    return soap_request.soap_xml
 
-    xml_contents = []
+def build_soap_request(header_params, command_args, minimized=False, *, version, avs_ids=None, snd_id='42'):
+    xml_paths = command_args['<XML>']
+    avs_ids = _avs_ids(xml_paths, avs_ids)
+
+    # each file is parsed exactly once, the resulting trees are added to the
+    # payload directly
+    payload = F.rzeLeistung(
+        F.rzLeistungHeader(
+            sendHeader_element(**header_params),
+            F.sndId(snd_id),
+        ),
+    )
     for xml_path, avs_id in zip(xml_paths, avs_ids):
         source_path = Path(xml_path)
-        with source_path.open('rb') as xml_fp:
-            xml_bytes = xml_fp.read()
-        xml_contents.append(xml_bytes)
-
-    if not is_payload_xml(xml_contents):
-        rzLeistungInhalte = []
-        for xml_bytes, avs_id in zip(xml_contents, avs_ids):
-            body_str = _eleistung_body(xml_bytes, source_path, version=version)
-            leistung_params = dict(avsId=avs_id, prescription_xml=body_str)
-            rzLeistungInhalt = rzLeistungInhalt_template % leistung_params
-            rzLeistungInhalte.append(rzLeistungInhalt)
-        template = payload_template.strip()
-        sendHeader = sendHeader_xml(**header_params)
-        payload_params = {
-            'sendHeader': sendHeader,
-            'rzLeistungInhalte_xml': '\n'.join(rzLeistungInhalte),
-        }
-        payload_xml = template % payload_params
+        # lxml parses the memory-mapped file directly (no copy in memory). The
+        # map is closed as soon as the prescription was added so only one
+        # file is open at any time (requests might contain thousands of files).
+        with mapped_file(source_path) as xml_bytes:
+            xml_doc = _parse_prescription(xml_bytes, source_path)
+            if (len(xml_paths) == 1) and is_payload_xml([xml_doc]):
+                payload = xml_doc
+                break
+            if is_eDispensierung(xml_doc) and (version != '01.10'):
+                raise InvalidInputError(f'{source_path.name}: eRezepte können nur über API-Version 1.10 verschickt werden')
+            leistung_body = F.eLeistungBody()
+            append_prescription(leistung_body, xml_doc, xml_bytes)
+        payload.append(F.rzLeistungInhalt(
+            F.eLeistungHeader(F.avsId(avs_id)),
+            leistung_body,
+        ))
+    return assemble_soap_request('sendeRezepte', payload, minimized=minimized, version=version)
+
+def build_streaming_request(header_params, command_args, minimized=False, *, version, avs_ids=None, snd_id='42',
+                            chunk_size=STREAM_CHUNK_SIZE):
+    """Like "build_soap_request()" but the request is generated from the
+    input files while it is sent (see StreamingSoapRequest).
+
+    Only the start of each file is parsed upfront (to detect the document
+    type) so syntax errors later in the file are not detected client-side."""
+    xml_paths = command_args['<XML>']
+    avs_ids = _avs_ids(xml_paths, avs_ids)
+    documents = []
+    for xml_path in xml_paths:
+        source_path = Path(xml_path)
+        root_tag, root_attrib = _sniff_root_element(source_path)
+        if (root_tag == 'eDispensierung') and (version != '01.10'):
+            raise InvalidInputError(f'{source_path.name}: eRezepte können nur über API-Version 1.10 verschickt werden')
+        documents.append((source_path, root_tag, root_attrib))
+
+    soap_prefix, soap_suffix = soap_envelope_parts('sendeRezepte', 'rzeLeistung', version=version)
+    is_payload = (len(documents) == 1) and (documents[0][1] == '{%s}rzeLeistung' % FIVERX_NS)
+    if is_payload:
+        payload_prefix = payload_suffix = b''
     else:
-        payload_xml = decode_xml_bytes(xml_contents[0])
-    soap_xml = assemble_soap_xml(soap_template, payload_xml, minimized=minimized, version=version)
-    return soap_xml
+        payload = F.rzeLeistung(
+            F.rzLeistungHeader(
+                sendHeader_element(**header_params),
+                F.sndId(snd_id),
+            ),
+            etree.Comment(_CONTENT_MARKER),
+        )
+        payload_bytes = etree.tostring(payload, xml_declaration=True, encoding='UTF-8', pretty_print=not minimized)
+        payload_prefix, payload_suffix = payload_bytes.split(b'<!--%s-->' % _CONTENT_MARKER.encode('ascii'))
+
+    def iter_parts():
+        yield soap_prefix
+        yield escape_xml_bytes(payload_prefix)
+        for (source_path, root_tag, root_attrib), avs_id in zip(documents, avs_ids):
+            with source_path.open('rb') as xml_fp:
+                if is_payload:
+                    yield from map(escape_xml_bytes, iter_xml_content(xml_fp, chunk_size))
+                    continue
+                yield escape_xml_bytes(_inhalt_start % escape(avs_id).encode('UTF-8'))
+                if root_tag == 'eDispensierung':
+                    erezept_id = escape(root_attrib['RezeptId']).encode('UTF-8')
+                    yield escape_xml_bytes(_erezept_start % erezept_id)
+                    # base64 data does not need any escaping
+                    yield from iter_base64(xml_fp, chunk_size)
+                    yield escape_xml_bytes(_erezept_end)
+                else:
+                    yield from map(escape_xml_bytes, iter_xml_content(xml_fp, chunk_size))
+                yield escape_xml_bytes(_inhalt_end)
+        yield escape_xml_bytes(payload_suffix)
+        yield soap_suffix
+    return StreamingSoapRequest(iter_parts, version=version, chunk_size=chunk_size)
+
+def _avs_ids(xml_paths, avs_ids):
+    if avs_ids:
+        assert len(avs_ids) == len(xml_paths)
+        return avs_ids
+    elif len(xml_paths) == 1:
+        return ['12345']
+    return [str(i) * 5 for i in range(len(xml_paths))]
 
-def is_payload_xml(xml_contents):
-    if len(xml_contents) != 1:
+def is_payload_xml(xml_docs):
+    if len(xml_docs) != 1:
         return False
-    xml_bytes = xml_contents[0]
-    xml_str = strip_xml_encoding(decode_xml_bytes(xml_bytes))
-    xml_doc = etree.fromstring(xml_str)
-    tag_name = xml_doc.tag
-    return (tag_name == '{http://fiverx.de/spec/abrechnungsservice}rzeLeistung')
-
-def _eleistung_body(xml_bytes, source_path, *, version):
-    xml_str = strip_xml_encoding(decode_xml_bytes(xml_bytes))
+    tag_name = xml_docs[0].tag
+    return (tag_name == '{%s}rzeLeistung' % FIVERX_NS)
+
+def _parse_prescription(xml_bytes, source_path):
     try:
-        xml_doc = etree.fromstring(xml_str)
+        return parse_xml(xml_bytes)
     except XMLSyntaxError as e:
-        with textcolor(TermColor.Fore.RED):
-            print(f'{source_path.name}: invalid XML for eLeistungBody {e.msg}')
-        sys.exit(1)
-
-    if not is_eDispensierung(xml_doc):
-        return xml_str
-    if version != '01.10':
-        with textcolor(TermColor.Fore.RED):
-            print(f'{source_path.name}: eRezepte können nur über API-Version 1.10 verschickt werden')
-        sys.exit(1)
-    return wrap_eDispensierung_in_fiverx_erezept(xml_doc, xml_bytes)
+        raise InvalidInputError(f'{source_path.name}: invalid XML for eLeistungBody {e.msg}')
+
+def _sniff_root_element(source_path):
+    # iterparse only reads the start of the file to find the root element
+    with source_path.open('rb') as xml_fp:
+        try:
+            event, element = next(etree.iterparse(xml_fp, events=('start',)))
+        except (XMLSyntaxError, StopIteration) as e:
+            raise InvalidInputError(f'{source_path.name}: invalid XML for eLeistungBody {getattr(e, "msg", "")}')
+        return element.tag, dict(element.attrib)
+
+_CONTENT_MARKER = 'rzLeistungInhalte'
+_inhalt_start = b'<rzLeistungInhalt><eLeistungHeader><avsId>%s</avsId></eLeistungHeader><eLeistungBody>'
+_inhalt_end = b'</eLeistungBody></rzLeistungInhalt>'
+_erezept_start = b'<eRezept><eRezeptId>%s</eRezeptId><eRezeptData>'
+_erezept_end = b'</eRezeptData></eRezept>'
 
 response_payload_xpath = '//fiverx:sendeRezepteResponse/result'
 
-rzLeistungInhalt_template = '''
-    <rzLeistungInhalt>
-        <eLeistungHeader>
-            <avsId>%(avsId)s</avsId>
-        </eLeistungHeader>
-        <eLeistungBody>
-            %(prescription_xml)s
-        </eLeistungBody>
-    </rzLeistungInhalt>
-'''
-
-payload_template = '''
-<?xml version='1.0' encoding='UTF-8'?>
-<rzeLeistung xmlns="http://fiverx.de/spec/abrechnungsservice">
-  <rzLeistungHeader>
-    %(sendHeader)s
-    <sndId>42</sndId>
-  </rzLeistungHeader>
-  %(rzLeistungInhalte_xml)s
-</rzeLeistung>
-'''
-
-soap_template = '''
-<senv:Envelope xmlns:senv="http://schemas.xmlsoap.org/soap/envelope/">
-<senv:Body>
-<fiverx:sendeRezepte xmlns:fiverx="http://fiverx.de/spec/abrechnungsservice/types">
-    <rzeLeistung>%(payload)s</rzeLeistung>
-    <rzeParamVersion>%(rze_param_version)s</rzeParamVersion>
-</fiverx:sendeRezepte>
-</senv:Body></senv:Envelope>
-'''
-
+is_idempotent = False
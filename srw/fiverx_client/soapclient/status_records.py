@@ -0,0 +1,86 @@
+
+from lxml import etree
+
+from .envelope_stream import PayloadTarget
+from .request import FIVERX_NS
+
+
+__all__ = ['iter_status_records']
+
+_STATUS_UPD = f'{{{FIVERX_NS}}}statusUpd'
+_STATUS_TAGS = ('status', 'm16Status', 'vStatus', 'p16Status')
+_ID_TAGS = ('eRezeptId', 'muster16Id', 'transaktionsNummer')
+_FINDING_TAGS = ('fCode', 'fStatus', 'fKommentar', 'fWert', 'fristEnde')
+
+def iter_status_records(chunks):
+    """Yield the status records ("statusUpd") of a "rzeLeistungStatus"
+    response one at a time while reading the SOAP response from "chunks"
+    (iterable of bytes, e.g. "response.iter_content()").
+
+    Both the SOAP envelope and the (escaped) payload are parsed incrementally
+    and each record is removed from the tree once it was processed so the
+    memory usage does not depend on the number of records. The payload is
+    not validated against the XML schema.
+
+    Every record is a dict like
+        {'type': 'eRezeptStatus', 'avsId': ..., 'id': ..., 'status': ...,
+         'rzLieferId': ..., 'findings': [{'fCode': ..., 'fStatus': ...}]}
+    Raises XMLSyntaxError if the response is not well-formed XML and
+    ValueError if the response does not contain a payload."""
+    payload_parser = etree.XMLPullParser(events=('end',), tag=_STATUS_UPD)
+    envelope_target = PayloadTarget(payload_parser)
+    envelope_parser = etree.XMLParser(target=envelope_target, huge_tree=True)
+    for chunk in chunks:
+        envelope_parser.feed(chunk)
+        yield from _read_records(payload_parser)
+    envelope_parser.close()
+    if not envelope_target.found_payload:
+        raise ValueError('no payload found in SOAP response')
+    payload_parser.close()
+    yield from _read_records(payload_parser)
+
+def _read_records(payload_parser):
+    for event, status_upd in payload_parser.read_events():
+        for status_element in status_upd:
+            yield _status_record(status_element)
+        # free memory of all processed records
+        status_upd.clear()
+        parent = status_upd.getparent()
+        while status_upd.getprevious() is not None:
+            del parent[0]
+
+def _status_record(status_element):
+    values = {}
+    findings = []
+    for child in status_element:
+        tag = etree.QName(child).localname
+        if tag == 'statusInfo':
+            findings.append(_child_values(child, _FINDING_TAGS))
+        else:
+            values[tag] = child.text
+    record = {
+        'type': etree.QName(status_element).localname,
+        'avsId': values.get('avsId'),
+        'id': _first_value(values, _ID_TAGS),
+        'status': _first_value(values, _STATUS_TAGS),
+        'rzLieferId': values.get('rzLieferId'),
+        'findings': findings,
+    }
+    if 'erstellungsJahr' in values:
+        record['erstellungsJahr'] = values['erstellungsJahr']
+    return record
+
+def _child_values(element, tags):
+    values = {}
+    for child in element:
+        tag = etree.QName(child).localname
+        if tag in tags:
+            values[tag] = child.text
+    return values
+
+def _first_value(values, keys):
+    for key in keys:
+        if key in values:
+            return values[key]
+    return None
+
@@ -0,0 +1,119 @@
+
+from base64 import b64encode
+import codecs
+import re
+
+
+__all__ = [
+    'coalesce_chunks',
+    'escape_xml_bytes',
+    'iter_base64',
+    'iter_xml_content',
+    'StreamingSoapRequest',
+]
+
+# multiple of 3 so every chunk can be base64-encoded without padding
+STREAM_CHUNK_SIZE = 3 * 16 * 1024
+
+_xml_declaration = re.compile(rb'^\s*<\?xml[^>]*\?>\s*')
+_xml_encoding = re.compile(rb'''^\s*<\?xml[^>]*?encoding=["']([^"']+)["']''')
+
+
+class StreamingSoapRequest(object):
+    """A SOAP request which is generated incrementally while it is sent so
+    the memory usage does not depend on the size of the request.
+
+    "parts" is a callable which returns an iterable of byte strings. It is
+    called again for every iteration so the request can be sent multiple
+    times (e.g. for retries). The payload is not available as a tree so
+    streaming requests can not be validated before they are sent."""
+    def __init__(self, parts, *, version=None, chunk_size=STREAM_CHUNK_SIZE):
+        self._parts = parts
+        self.version = version
+        self.chunk_size = chunk_size
+
+    def iter_chunks(self):
+        return coalesce_chunks(self._parts(), self.chunk_size)
+
+    @property
+    def soap_bytes(self):
+        # only meant for debugging/tests, defeats the purpose of streaming
+        return b''.join(self.iter_chunks())
+
+
+def coalesce_chunks(parts, chunk_size):
+    """Join small byte strings (e.g. XML tags) so each yielded chunk is about
+    "chunk_size" bytes. Chunks are never much larger than "chunk_size" as
+    long as the parts are not."""
+    buffer = []
+    buffered_size = 0
+    for part in parts:
+        if not part:
+            continue
+        buffer.append(part)
+        buffered_size += len(part)
+        if buffered_size >= chunk_size:
+            yield b''.join(buffer)
+            buffer = []
+            buffered_size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+def escape_xml_bytes(data):
+    # UTF-8 multi-byte sequences never contain ASCII bytes so it is safe to
+    # escape arbitrary chunks of UTF-8 encoded data.
+    return data.replace(b'&', b'&amp;').replace(b'<', b'&lt;').replace(b'>', b'&gt;')
+
+def iter_xml_content(fp, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the content of the XML file "fp" (opened in binary mode) as UTF-8
+    encoded chunks without the XML declaration."""
+    # the XML declaration must be contained completely in the first chunk
+    head = fp.read(max(chunk_size, 1024))
+    if head.startswith(codecs.BOM_UTF8):
+        head = head[len(codecs.BOM_UTF8):]
+    match = _xml_encoding.match(head)
+    encoding = match.group(1).decode('ascii') if match else 'UTF-8'
+    head = _xml_declaration.sub(b'', head, count=1)
+    if codecs.lookup(encoding).name == 'utf-8':
+        chunk = head
+        while chunk:
+            yield chunk
+            chunk = fp.read(chunk_size)
+        return
+
+    decoder = codecs.getincrementaldecoder(encoding)()
+    chunk = head
+    while chunk:
+        yield decoder.decode(chunk).encode('UTF-8')
+        chunk = fp.read(chunk_size)
+    yield decoder.decode(b'', final=True).encode('UTF-8')
+
+def iter_base64(fp, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the base64 encoded content of "fp" (without leading/trailing
+    whitespace) in chunks."""
+    pending = b''
+    trailing_whitespace = b''
+    is_start = True
+    while True:
+        data = fp.read(chunk_size)
+        if not data:
+            break
+        if is_start:
+            data = data.lstrip()
+            if not data:
+                continue
+            is_start = False
+        content = data.rstrip()
+        if content:
+            # whitespace is only part of the content if it is followed by
+            # something else
+            pending += trailing_whitespace + content
+            trailing_whitespace = data[len(content):]
+        else:
+            trailing_whitespace += data
+        encodable = len(pending) - (len(pending) % 3)
+        if encodable:
+            yield b64encode(pending[:encodable])
+            pending = pending[encodable:]
+    if pending:
+        yield b64encode(pending)
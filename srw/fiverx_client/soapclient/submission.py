@@ -0,0 +1,142 @@
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+from requests.exceptions import RequestException
+
+from . import sendeRezepte
+from .baseutils import send_request
+from .request import FIVERX_NS, InvalidInputError
+from .response import parse_soap_response
+from .transport import get_default_transport
+from ..lib import Result
+
+
+__all__ = [
+    'split_into_batches',
+    'submit_in_batches',
+]
+
+# XML schema: "rzLeistungInhalt" may occur at most 300 times per "rzeLeistung"
+MAX_FILES_PER_REQUEST = 300
+
+def split_into_batches(xml_paths, *, max_files=MAX_FILES_PER_REQUEST, max_bytes=None):
+    """Yield lists of paths so that each list contains at most "max_files"
+    paths and (if "max_bytes" is set) the accumulated file size does not
+    exceed "max_bytes". A single file larger than "max_bytes" is put in a
+    batch of its own."""
+    assert 0 < max_files <= MAX_FILES_PER_REQUEST, max_files
+    batch = []
+    batch_size = 0
+    for xml_path in xml_paths:
+        file_size = os.path.getsize(xml_path) if max_bytes else 0
+        is_full = (len(batch) >= max_files)
+        if max_bytes and batch and (batch_size + file_size > max_bytes):
+            is_full = True
+        if is_full:
+            yield batch
+            batch = []
+            batch_size = 0
+        batch.append(xml_path)
+        batch_size += file_size
+    if batch:
+        yield batch
+
+def submit_in_batches(ws_url, header_params, xml_paths, *, version, max_files=MAX_FILES_PER_REQUEST,
+                      max_bytes=None, workers=4, transport=None, verify_cert=True, hostname=None,
+                      use_chunking=False, first_snd_id=1):
+    """Send all "xml_paths" via multiple "sendeRezepte" requests (at most
+    "workers" requests at the same time).
+
+    Every request gets its own "sndId" (counting from "first_snd_id").
+    Returns a Result with the first non-zero exit code (or 0) and a report:
+    "batches" lists the outcome of each request, "files" maps each "avsId"
+    to its source file (including the status reported by the RZ if present).
+    """
+    if transport is None:
+        transport = get_default_transport()
+    batches = []
+    avs_nr = 0
+    batch_paths_list = split_into_batches(xml_paths, max_files=max_files, max_bytes=max_bytes)
+    for batch_nr, batch_paths in enumerate(batch_paths_list):
+        avs_ids = [str(avs_nr + i + 1) for i in range(len(batch_paths))]
+        avs_nr += len(batch_paths)
+        batches.append((batch_paths, avs_ids, str(first_snd_id + batch_nr)))
+
+    def _submit(batch_paths, avs_ids, snd_id):
+        return _submit_batch(ws_url, header_params, batch_paths, avs_ids, snd_id,
+            version      = version,
+            transport    = transport,
+            verify_cert  = verify_cert,
+            hostname     = hostname,
+            use_chunking = use_chunking,
+        )
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_submit, *batch) for batch in batches]
+        batch_results = [future.result() for future in futures]
+    return _merge_results(batches, batch_results)
+
+def _submit_batch(ws_url, header_params, xml_paths, avs_ids, snd_id, *, version, transport, verify_cert, hostname, use_chunking):
+    command_args = {'<XML>': xml_paths}
+    try:
+        soap_request = sendeRezepte.build_soap_request(header_params, command_args,
+            version = version,
+            avs_ids = avs_ids,
+            snd_id  = snd_id,
+        )
+    except (InvalidInputError, OSError) as e:
+        return Result(10, message=f'invalid request: {e}', document=None)
+    try:
+        response = send_request(ws_url, soap_request.soap_bytes, use_chunking,
+            verify_cert = verify_cert,
+            hostname    = hostname,
+            transport   = transport,
+        )
+    except RequestException as e:
+        return Result(15, message=f'unable to send request to {ws_url}: {e}', document=None)
+    return parse_soap_response(response, sendeRezepte.response_payload_xpath)
+
+def _merge_results(batches, batch_results):
+    rc = 0
+    batch_reports = []
+    file_reports = []
+    for batch_nr, ((xml_paths, avs_ids, snd_id), result) in enumerate(zip(batches, batch_results)):
+        if result.value and (not rc):
+            rc = result.value
+        document = result.document
+        rz_liefer_id = None
+        avs_status = {}
+        if document is not None:
+            rz_liefer_id = _first_text(document, '//f:rzLieferId')
+            avs_status = _status_per_avs_id(document)
+        batch_reports.append({
+            'batch': batch_nr,
+            'sndId': snd_id,
+            'rc': result.value,
+            'message': result.message,
+            'rzLieferId': rz_liefer_id,
+            'files': len(xml_paths),
+        })
+        for xml_path, avs_id in zip(xml_paths, avs_ids):
+            file_reports.append({
+                'avsId': avs_id,
+                'path': str(xml_path),
+                'batch': batch_nr,
+                'rc': result.value,
+                'status': avs_status.get(avs_id),
+            })
+    return Result(rc, batches=batch_reports, files=file_reports)
+
+def _first_text(document, xpath):
+    elements = document.xpath(xpath, namespaces={'f': FIVERX_NS})
+    return str(elements[0].text) if elements else None
+
+def _status_per_avs_id(document):
+    # only "rzeLeistungStatus" responses contain per-prescription states
+    avs_status = {}
+    for status_element in document.xpath('//f:statusUpd/*', namespaces={'f': FIVERX_NS}):
+        avs_id = _first_text(status_element, 'f:avsId')
+        status = _first_text(status_element, 'f:status|f:m16Status|f:vStatus|f:p16Status')
+        avs_status[avs_id] = status
+    return avs_status
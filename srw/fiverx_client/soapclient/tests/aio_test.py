@@ -0,0 +1,110 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+from pythonic_testcase import *
+
+from ..aio import aiohttp, AsyncClient
+from ..ladeRzVersion import build_soap_request as build_ladeRzVersion
+from ..request import InvalidInputError, SoapRequest
+from ...mock_server import MockConfig, MockFiverxServer
+
+
+HEADER_PARAMS = {'user': '123456789', 'apoik': '123456789', 'test': 'false', 'password': 'secret'}
+
+@unittest.skipIf(aiohttp is None, 'requires "aiohttp"')
+class AsyncClientTest(PythonicTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = MockFiverxServer(('127.0.0.1', 0), MockConfig(quiet=True))
+        self.server.serve_in_thread()
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tempdir)
+        super().tearDown()
+
+    def _run(self, coro_func, ws_url=None, **kwargs):
+        async def _run_with_client():
+            client = AsyncClient(ws_url or self.server.url, HEADER_PARAMS, verify_cert=False, **kwargs)
+            async with client:
+                return await coro_func(client)
+        return asyncio.run(_run_with_client())
+
+    def test_can_build_and_send_requests(self):
+        async def _build_and_send(client):
+            soap_request = await client.build('ladeRzVersion', [])
+            response = await client.send(soap_request)
+            return soap_request, response
+
+        soap_request, response = self._run(_build_and_send)
+        assert_isinstance(soap_request, SoapRequest)
+        assert_equals(200, response.status_code)
+        assert_contains(b'rzeVersion', response.content)
+
+    def test_can_call_commands(self):
+        result = self._run(lambda client: client.ladeRzVersion())
+        assert_equals(0, result.value)
+        assert_not_none(result.document)
+
+    def test_can_send_raw_requests(self):
+        request_path = os.path.join(self.tempdir, 'request.xml')
+        with open(request_path, 'wb') as fp:
+            fp.write(build_ladeRzVersion(HEADER_PARAMS, {}, version='01.10').soap_bytes)
+        # "raw" sends the memory-mapped file
+        result = self._run(lambda client: client.raw(request_path))
+        assert_equals(0, result.value)
+        assert_not_none(result.document)
+
+    def test_build_raises_exception_for_invalid_arguments(self):
+        async def _build(client):
+            with assert_raises(InvalidInputError):
+                await client.build('ladeRzVersion', ['--invalid'])
+        self._run(_build)
+
+    def test_call_returns_error_for_invalid_input(self):
+        invalid_path = os.path.join(self.tempdir, 'invalid.xml')
+        with open(invalid_path, 'wb') as fp:
+            fp.write(b'<foo>')
+        result = self._run(lambda client: client.ladeRzVersion('--invalid'))
+        assert_equals(10, result.value)
+        result = self._run(lambda client: client.sendeRezepte(invalid_path))
+        assert_equals(10, result.value)
+        assert_contains('invalid.xml', result.message)
+
+        missing_path = os.path.join(self.tempdir, 'missing.xml')
+        result = self._run(lambda client: client.sendeRezepte(missing_path))
+        assert_equals(10, result.value)
+        assert_contains('missing.xml', result.message)
+
+    def test_call_returns_error_if_server_is_unreachable(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        result = self._run(lambda client: client.ladeRzVersion(), ws_url=f'http://127.0.0.1:{port}/')
+        assert_equals(15, result.value)
+
+    def test_call_returns_error_if_server_does_not_respond(self):
+        with socket.socket() as sock:
+            # connections are accepted (backlog) but never answered
+            sock.bind(('127.0.0.1', 0))
+            sock.listen(1)
+            port = sock.getsockname()[1]
+            ws_url = f'http://127.0.0.1:{port}/'
+            result = self._run(lambda client: client.ladeRzVersion(), ws_url=ws_url, read_timeout=0.2)
+        assert_equals(15, result.value)
+
+    def test_can_use_timeouts_from_settings(self):
+        settings = {'url': self.server.url, 'connect_timeout': '2', 'read_timeout': '3', 'deadline': '4'}
+        client = AsyncClient.from_settings(settings, HEADER_PARAMS)
+        assert_equals(self.server.url, client.ws_url)
+        assert_equals((2, 3, 4), (client.timeout.sock_connect, client.timeout.sock_read, client.timeout.total))
+        asyncio.run(client.close())
@@ -0,0 +1,42 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+import gzip
+import zlib
+
+from pythonic_testcase import *
+
+from ..compression import compress_chunks
+from ..transport import Transport
+
+
+class CompressChunksTest(PythonicTestCase):
+    def test_can_compress_with_gzip(self):
+        chunks = [b'<foo>', b'bar' * 1000, b'</foo>']
+        sizes = {}
+        compressed = b''.join(compress_chunks(chunks, 'gzip', sizes=sizes))
+        assert_equals(b''.join(chunks), gzip.decompress(compressed))
+        assert_equals({'uncompressed': 3011, 'compressed': len(compressed)}, sizes)
+
+    def test_can_compress_with_deflate(self):
+        compressed = b''.join(compress_chunks([b'foo', b'bar'], 'deflate'))
+        assert_equals(b'foobar', zlib.decompress(compressed))
+
+    def test_compresses_lazily(self):
+        def chunks():
+            yield b'foo'
+            raise AssertionError('must not consume all chunks')
+        compressed_chunks = compress_chunks(chunks(), 'gzip')
+        # zlib buffers the input, the gzip header is returned first
+        assert_not_none(next(compressed_chunks))
+
+
+class TransportCompressionTest(PythonicTestCase):
+    def test_can_read_request_compression_from_settings(self):
+        transport = Transport.from_settings({'request_compression': 'GZIP'})
+        assert_equals('gzip', transport.request_compression)
+        assert_none(Transport.from_settings({}).request_compression)
+
+    def test_rejects_unknown_compression(self):
+        with assert_raises(ValueError):
+            Transport(request_compression='br')
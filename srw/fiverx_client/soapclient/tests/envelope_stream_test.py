@@ -0,0 +1,38 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+from pythonic_testcase import *
+
+from ..envelope_stream import iter_payload_chunks
+from .status_records_test import in_chunks
+
+
+def soap_request(*payloads):
+    children = b''.join(b'<p%d>%s</p%d>' % (i, _escape(payload), i) for i, payload in enumerate(payloads))
+    return (
+        b'<senv:Envelope xmlns:senv="http://schemas.xmlsoap.org/soap/envelope/"><senv:Body>'
+        b'<fiverx:sendeRezepte xmlns:fiverx="http://fiverx.de/spec/abrechnungsservice/types">'
+        + children +
+        b'</fiverx:sendeRezepte></senv:Body></senv:Envelope>'
+    )
+
+def _escape(data):
+    return data.replace(b'&', b'&amp;').replace(b'<', b'&lt;').replace(b'>', b'&gt;')
+
+def is_sendeRezepte(tag):
+    return tag.endswith('}sendeRezepte')
+
+
+class IterPayloadChunksTest(PythonicTestCase):
+    def test_yields_payload_of_first_child(self):
+        payload = b"<?xml version='1.0' encoding='ISO-8859-15'?>\n<foo>a &amp; b \xc3\xa4</foo>"
+        envelope = soap_request(payload, b'<bar />')
+        chunks = list(iter_payload_chunks(in_chunks(envelope, 7), is_container=is_sendeRezepte))
+        assert_true(len(chunks) > 1)
+        # the declaration is removed, the payload is UTF-8 encoded
+        assert_equals(b'\n<foo>a &amp; b \xc3\xa4</foo>', b''.join(chunks))
+
+    def test_raises_error_if_envelope_contains_no_payload(self):
+        chunks = iter_payload_chunks([soap_request(b'<foo />')])
+        with assert_raises(ValueError):
+            list(chunks)
@@ -0,0 +1,21 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+import importlib
+
+from pythonic_testcase import *
+
+from ... import soapclient
+
+
+class LazySoapclientPackageTest(PythonicTestCase):
+    def test_lazy_exports_match_module_all(self):
+        for module_name, names in soapclient._EXPORTS.items():
+            module = importlib.import_module(f'{soapclient.__name__}.{module_name}')
+            assert_equals(sorted(module.__all__), sorted(names), message=module_name)
+
+    def test_can_access_subcommands_and_helpers(self):
+        for subcommand in soapclient.SUBCOMMANDS:
+            assert_true(hasattr(getattr(soapclient, subcommand), 'build_soap_xml'))
+        assert_true(callable(soapclient.validate_payload))
+        assert_false(hasattr(soapclient, 'F'))
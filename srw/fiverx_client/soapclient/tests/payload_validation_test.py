@@ -0,0 +1,34 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+import threading
+
+from pythonic_testcase import *
+
+from ..payload_validation import get_schema, get_validating_parser, validate_payload
+
+
+class PayloadValidationTest(PythonicTestCase):
+    def test_compiles_schema_only_once(self):
+        assert_is(get_schema('01.10'), get_schema('01.10'))
+        assert_not_equals(get_schema('01.08'), get_schema('01.10'))
+
+    def test_uses_separate_parsers_per_thread(self):
+        parser = get_validating_parser('01.10')
+        assert_is(parser, get_validating_parser('01.10'))
+
+        thread_parsers = []
+        thread = threading.Thread(target=lambda: thread_parsers.append(get_validating_parser('01.10')))
+        thread.start()
+        thread.join()
+        assert_length(1, thread_parsers)
+        assert_not_equals(parser, thread_parsers[0])
+
+    def test_can_validate_payload(self):
+        version_xml = (
+            '<rzeParamVersion xmlns="http://fiverx.de/spec/abrechnungsservice">'
+            '<versionNr>01.10</versionNr>'
+            '</rzeParamVersion>'
+        )
+        assert_true(validate_payload(version_xml, version='01.10'))
+        assert_false(validate_payload(version_xml.replace('01.10', '1.1'), version='01.10'))
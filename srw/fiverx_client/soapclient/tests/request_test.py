@@ -0,0 +1,47 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+from lxml import etree
+from pythonic_testcase import *
+
+from ..payload_validation import validate_document
+from ..ladeStatusRezept import query_perLieferID
+from ..request import assemble_soap_request, F, PreparedRequest, sendHeader_element, SoapRequest
+
+
+class SoapRequestTest(PythonicTestCase):
+    def test_can_assemble_request(self):
+        payload = F.rzeParamVersion(F.versionNr('01.10'))
+        soap_request = assemble_soap_request('ladeRzVersion', payload)
+
+        assert_is(payload, soap_request.payload)
+        root = etree.fromstring(soap_request.soap_bytes)
+        assert_equals('{http://schemas.xmlsoap.org/soap/envelope/}Envelope', root.tag)
+        assert_true(validate_document(soap_request.payload, version='01.10'))
+
+    def test_escapes_payload_values(self):
+        payload = F.rzeParamVersion(F.versionNr('01.10 & <foo>'))
+        soap_request = assemble_soap_request('ladeRzVersion', payload, version='01.10')
+
+        # payload is extracted from the serialized request again
+        replayed_request = SoapRequest(soap_request.soap_bytes)
+        version_nr = replayed_request.payload.find('{http://fiverx.de/spec/abrechnungsservice}versionNr')
+        assert_equals('01.10 & <foo>', version_nr.text)
+        assert_equals('01.10', replayed_request.payload_version)
+
+
+class PreparedRequestTest(PythonicTestCase):
+    def test_builds_same_request_as_assemble_soap_request(self):
+        header_params = dict(user='123', apoik='123456789', test='true', password='secret & <pw>')
+        prepared = PreparedRequest('ladeStatusRezept', 'rzeParamStatus', header_params, version='01.10')
+        soap_request = prepared.build(query_perLieferID('4711', 'ALLE'))
+        payload = F.rzeParamStatus(
+            sendHeader_element(**header_params),
+            query_perLieferID('4711', 'ALLE'),
+        )
+        expected_request = assemble_soap_request('ladeStatusRezept', payload, minimized=True, version='01.10')
+
+        c14n = lambda element: etree.tostring(element, method='c14n')
+        assert_equals(c14n(expected_request.payload), c14n(soap_request.payload))
+        assert_equals('01.10', soap_request.payload_version)
+        assert_true(validate_document(soap_request.payload, version='01.10'))
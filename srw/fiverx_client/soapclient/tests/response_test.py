@@ -0,0 +1,80 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+from pythonic_testcase import *
+
+from ..response import parse_soap_response
+from ...lib import Timings
+
+
+class FakeResponse(object):
+    status_code = 200
+    headers = {'Content-Type': 'text/xml; charset=UTF-8'}
+
+    def __init__(self, content):
+        self.content = content
+
+
+def soap_response(payload_bytes):
+    escaped_payload = payload_bytes.replace(b'&', b'&amp;').replace(b'<', b'&lt;').replace(b'>', b'&gt;')
+    return FakeResponse(
+        b'<?xml version="1.0" encoding="UTF-8"?>'
+        b'<senv:Envelope xmlns:senv="http://schemas.xmlsoap.org/soap/envelope/"><senv:Body>'
+        b'<fiverx:ladeRzVersionResponse xmlns:fiverx="http://fiverx.de/spec/abrechnungsservice/types">'
+        b'<result>' + escaped_payload + b'</result>'
+        b'</fiverx:ladeRzVersionResponse></senv:Body></senv:Envelope>'
+    )
+
+payload_xpath = '//fiverx:ladeRzVersionResponse/result'
+
+
+class ParseSoapResponseTest(PythonicTestCase):
+    def test_can_parse_valid_response(self):
+        payload = (
+            b'<?xml version="1.0" encoding="ISO-8859-15"?>\n'
+            b'<rzeParamVersion xmlns="http://fiverx.de/spec/abrechnungsservice">'
+            b'<versionNr>01.08</versionNr>'
+            b'</rzeParamVersion>'
+        )
+        result = parse_soap_response(soap_response(payload), payload_xpath)
+        assert_equals(0, result.value)
+        assert_equals('01.08', result.document.versionNr.text)
+
+    def test_can_record_timings(self):
+        payload = b'<rzeParamVersion xmlns="http://fiverx.de/spec/abrechnungsservice"/>'
+        timings = Timings()
+        parse_soap_response(soap_response(payload), payload_xpath, timings=timings)
+        assert_equals(['parse_response', 'validate_response'], list(timings.phases))
+
+    def test_rejects_invalid_payload(self):
+        payload = b'<rzeParamVersion xmlns="http://fiverx.de/spec/abrechnungsservice"/>'
+        result = parse_soap_response(soap_response(payload), payload_xpath)
+        assert_equals(23, result.value)
+        assert_none(result.document)
+        assert_equals(payload, result.payload)
+
+    def test_returns_payload_as_utf8_bytes_without_declaration(self):
+        payload = (
+            b'<?xml version="1.0" encoding="ISO-8859-15"?>\n'
+            b'<rzeParamVersion xmlns="http://fiverx.de/spec/abrechnungsservice">\xa4</rzeParamVersion>'
+        )
+        # the complete response uses ISO-8859-15
+        response = soap_response(payload)
+        response.content = response.content.replace(b'encoding="UTF-8"', b'encoding="ISO-8859-15"')
+        result = parse_soap_response(response, payload_xpath)
+        assert_equals(23, result.value)
+        expected_payload = '<rzeParamVersion xmlns="http://fiverx.de/spec/abrechnungsservice">€</rzeParamVersion>'
+        assert_equals(expected_payload.encode('UTF-8'), result.payload)
+
+    def test_rejects_html_response(self):
+        response = FakeResponse(b'<html><body>Service Unavailable</body></html>')
+        response.status_code = 503
+        response.headers = {'Content-Type': 'Text/HTML; charset=ISO-8859-1'}
+        result = parse_soap_response(response, payload_xpath)
+        assert_equals(21, result.value)
+        assert_equals('HTML response: Status 503 (text/html)', result.message)
+
+    def test_rejects_malformed_response(self):
+        result = parse_soap_response(FakeResponse(b'foo'), payload_xpath)
+        assert_equals(22, result.value)
+        assert_none(result.payload)
@@ -0,0 +1,115 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+from io import BytesIO
+import time
+
+from pythonic_testcase import *
+from requests import Response
+from requests.exceptions import ConnectionError
+
+from ..retry import (call_with_retries, Deadline, DeadlineExceeded, iter_body, read_body,
+    RetryBudget, RetryPolicy)
+
+
+class FakeResponse(object):
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.is_closed = False
+
+    def close(self):
+        self.is_closed = True
+
+
+class FakeServer(object):
+    "returns the given status codes (or raises the given exceptions) in order"
+    def __init__(self, *results):
+        self.results = list(results)
+        self.timeouts = []
+
+    def __call__(self, timeout):
+        self.timeouts.append(timeout)
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return FakeResponse(result)
+
+
+class CallWithRetriesTest(PythonicTestCase):
+    def test_retries_idempotent_requests(self):
+        server = FakeServer(ConnectionError(), 503, 200)
+        policy = RetryPolicy(max_retries=2, backoff=0)
+        response = call_with_retries(server, (1, 2), policy=policy, idempotent=True)
+        assert_equals(200, response.status_code)
+        assert_equals([(1, 2)] * 3, server.timeouts)
+
+    def test_does_not_retry_non_idempotent_requests(self):
+        server = FakeServer(503, 200)
+        response = call_with_retries(server, (1, 2), policy=RetryPolicy(backoff=0), idempotent=False)
+        assert_equals(503, response.status_code)
+
+    def test_raises_last_exception_after_max_retries(self):
+        server = FakeServer(ConnectionError(), ConnectionError(), 200)
+        with assert_raises(ConnectionError):
+            call_with_retries(server, (1, 2), policy=RetryPolicy(max_retries=1, backoff=0), idempotent=True)
+
+    def test_retries_are_limited_by_budget(self):
+        budget = RetryBudget(ratio=0.5, reserve=1)
+        policy = RetryPolicy(max_retries=5, backoff=0, budget=budget)
+        server = FakeServer(503, 503, 200)
+        response = call_with_retries(server, (1, 2), policy=policy, idempotent=True)
+        # only one token available
+        assert_equals(503, response.status_code)
+        assert_length(2, server.timeouts)
+
+    def test_limits_timeouts_by_deadline(self):
+        server = FakeServer(200)
+        call_with_retries(server, (10, 60), deadline=Deadline(5))
+        connect_timeout, read_timeout = server.timeouts[0]
+        assert_true(connect_timeout <= 5)
+        assert_true(read_timeout <= 5)
+
+    def test_does_not_retry_after_deadline(self):
+        server = FakeServer(503, 200)
+        policy = RetryPolicy(max_retries=2, backoff=10, max_backoff=10)
+        # the backoff delay is random so it might be shorter than the deadline
+        policy.backoff_delay = lambda retry_nr: 10
+        response = call_with_retries(server, (1, 2), policy=policy, deadline=Deadline(1), idempotent=True)
+        assert_equals(503, response.status_code)
+
+    def test_raises_exception_if_deadline_has_passed(self):
+        with assert_raises(DeadlineExceeded):
+            call_with_retries(FakeServer(200), (1, 2), deadline=Deadline(0))
+
+
+class ReadBodyTest(PythonicTestCase):
+    def _response(self, body):
+        response = Response()
+        response.status_code = 200
+        response.raw = BytesIO(body)
+        return response
+
+    def test_can_read_body_within_deadline(self):
+        response = read_body(self._response(b'x' * 100), Deadline(10), chunk_size=10)
+        assert_equals(b'x' * 100, response.content)
+
+    def test_raises_exception_if_deadline_passes_while_reading(self):
+        with assert_raises(DeadlineExceeded):
+            read_body(self._response(b'x' * 100), Deadline(0), chunk_size=10)
+
+    def test_raises_exception_if_stream_stalls(self):
+        class StalledResponse(object):
+            is_closed = False
+            def iter_content(self, chunk_size):
+                yield b'x' * chunk_size
+                time.sleep(0.2)
+                yield b'x' * chunk_size
+            def close(self):
+                self.is_closed = True
+
+        response = StalledResponse()
+        chunks = iter_body(response, Deadline(0.1), chunk_size=10)
+        assert_equals(b'x' * 10, next(chunks))
+        with assert_raises(DeadlineExceeded):
+            next(chunks)
+        assert_true(response.is_closed)
@@ -0,0 +1,51 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+from pythonic_testcase import *
+
+from ..request import FIVERX_NS
+from ..sendeRezepte import build_soap_request
+
+
+HEADER_PARAMS = {'user': '123456789', 'apoik': '123456789', 'test': 'false', 'password': 'secret'}
+
+class BuildSoapRequestTest(PythonicTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+        super().tearDown()
+
+    def _create_prescriptions(self, nr_files):
+        paths = []
+        for nr in range(1, nr_files + 1):
+            path = os.path.join(self.tempdir, f'{nr}.xml')
+            with open(path, 'wb') as fp:
+                fp.write(b'<eMuster16><muster16Id>%09d</muster16Id></eMuster16>' % nr)
+            paths.append(path)
+        return paths
+
+    @unittest.skipIf(resource is None, 'requires "resource" module')
+    def test_can_use_more_files_than_file_descriptors(self):
+        soft_limit, hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+        fd_limit = 64
+        xml_paths = self._create_prescriptions(2 * fd_limit)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (fd_limit, hard_limit))
+        try:
+            soap_request = build_soap_request(HEADER_PARAMS, {'<XML>': xml_paths}, version='01.10')
+        finally:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (soft_limit, hard_limit))
+        inhalte = soap_request.payload.findall('{%s}rzLeistungInhalt' % FIVERX_NS)
+        assert_length(2 * fd_limit, inhalte)
@@ -0,0 +1,64 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+from pythonic_testcase import *
+
+from ..status_records import iter_status_records
+
+
+def soap_response(payload_bytes):
+    escaped_payload = payload_bytes.replace(b'&', b'&amp;').replace(b'<', b'&lt;').replace(b'>', b'&gt;')
+    return (
+        b'<?xml version="1.0" encoding="UTF-8"?>'
+        b'<senv:Envelope xmlns:senv="http://schemas.xmlsoap.org/soap/envelope/"><senv:Body>'
+        b'<fiverx:ladeStatusRezeptResponse xmlns:fiverx="http://fiverx.de/spec/abrechnungsservice/types">'
+        b'<result>\n' + escaped_payload + b'</result>'
+        b'</fiverx:ladeStatusRezeptResponse></senv:Body></senv:Envelope>'
+    )
+
+status_payload = (
+    b"<?xml version='1.0' encoding='ISO-8859-15'?>\n"
+    b'<rzeLeistungStatus xmlns="http://fiverx.de/spec/abrechnungsservice">'
+    b'<retHeader><rzDatum>2020-01-01T00:00:00</rzDatum></retHeader>'
+    b'<statusUpd><muster16Status>'
+    b'<avsId>1</avsId><muster16Id>123</muster16Id><m16Status>FEHLER</m16Status><rzLieferId>42</rzLieferId>'
+    b'<statusInfo><fCode>F1</fCode><fStatus>FEHLER</fStatus><fKommentar>a &amp; b</fKommentar></statusInfo>'
+    b'</muster16Status></statusUpd>'
+    b'<statusUpd><eRezeptStatus>'
+    b'<avsId>2</avsId><eRezeptId>160.1</eRezeptId><status>ABRECHENBAR</status><rzLieferId>42</rzLieferId>'
+    b'</eRezeptStatus></statusUpd>'
+    b'</rzeLeistungStatus>'
+)
+
+
+def in_chunks(data, chunk_size):
+    for i in range(0, len(data), chunk_size):
+        yield data[i:i+chunk_size]
+
+
+class IterStatusRecordsTest(PythonicTestCase):
+    def test_yields_records(self):
+        response_bytes = soap_response(status_payload)
+        for chunk_size in (1, 13, len(response_bytes)):
+            records = list(iter_status_records(in_chunks(response_bytes, chunk_size)))
+            assert_length(2, records, message=f'chunk size {chunk_size}')
+
+        m16_record, erezept_record = records
+        assert_equals({
+                'type': 'muster16Status',
+                'avsId': '1',
+                'id': '123',
+                'status': 'FEHLER',
+                'rzLieferId': '42',
+                'findings': [{'fCode': 'F1', 'fStatus': 'FEHLER', 'fKommentar': 'a & b'}],
+            },
+            m16_record
+        )
+        assert_equals('160.1', erezept_record['id'])
+        assert_equals('ABRECHENBAR', erezept_record['status'])
+        assert_equals([], erezept_record['findings'])
+
+    def test_raises_error_if_response_contains_no_payload(self):
+        response_bytes = b'<senv:Envelope xmlns:senv="http://schemas.xmlsoap.org/soap/envelope/"/>'
+        with assert_raises(ValueError):
+            list(iter_status_records([response_bytes]))
@@ -0,0 +1,30 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+from base64 import b64encode
+from io import BytesIO
+
+from pythonic_testcase import *
+
+from ..streaming import coalesce_chunks, escape_xml_bytes, iter_base64, iter_xml_content
+
+
+class StreamingTest(PythonicTestCase):
+    def test_can_encode_base64_incrementally(self):
+        data = b'\n  <eDispensierung>\n  foo bar \n</eDispensierung>\n \n'
+        expected = b64encode(data.strip())
+        for chunk_size in (1, 2, 3, 4, 5, 30, 3000):
+            encoded = b''.join(iter_base64(BytesIO(data), chunk_size))
+            assert_equals(expected, encoded, message=f'chunk size {chunk_size}')
+
+    def test_strips_xml_declaration_and_reencodes_content(self):
+        xml_bytes = '<?xml version="1.0" encoding="ISO-8859-15"?>\n<foo>äöü</foo>'.encode('ISO-8859-15')
+        content = b''.join(iter_xml_content(BytesIO(xml_bytes), chunk_size=2))
+        assert_equals('<foo>äöü</foo>'.encode('UTF-8'), content)
+
+    def test_can_escape_xml(self):
+        assert_equals(b'&lt;a&gt;&amp;amp;&lt;/a&gt;', escape_xml_bytes(b'<a>&amp;</a>'))
+
+    def test_coalesces_small_chunks(self):
+        chunks = list(coalesce_chunks([b'ab', b'', b'c', b'defg', b'h'], chunk_size=3))
+        assert_equals([b'abc', b'defg', b'h'], chunks)
@@ -0,0 +1,112 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+import os
+import shutil
+import tempfile
+
+from pythonic_testcase import *
+
+from ..submission import split_into_batches, submit_in_batches
+from ...mock_server import MockConfig, MockFiverxServer
+
+
+class SplitIntoBatchesTest(PythonicTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+        super().tearDown()
+
+    def _create_file(self, name, size):
+        path = os.path.join(self.tempdir, name)
+        with open(path, 'wb') as fp:
+            fp.write(b'x' * size)
+        return path
+
+    def test_limits_number_of_files(self):
+        paths = ['a', 'b', 'c', 'd', 'e']
+        batches = list(split_into_batches(paths, max_files=2))
+        assert_equals([['a', 'b'], ['c', 'd'], ['e']], batches)
+
+    def test_limits_accumulated_file_size(self):
+        a = self._create_file('a.xml', 40)
+        b = self._create_file('b.xml', 40)
+        c = self._create_file('c.xml', 150)
+        d = self._create_file('d.xml', 10)
+        batches = list(split_into_batches([a, b, c, d], max_bytes=100))
+        # files exceeding the limit on their own are sent in a separate batch
+        assert_equals([[a, b], [c], [d]], batches)
+
+
+class SubmitInBatchesTest(PythonicTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = MockFiverxServer(('127.0.0.1', 0), MockConfig(quiet=True))
+        self.server.serve_in_thread()
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tempdir)
+        super().tearDown()
+
+    def _create_prescription(self, nr):
+        path = os.path.join(self.tempdir, f'{nr}.xml')
+        with open(path, 'wb') as fp:
+            fp.write(
+                b'<?xml version="1.0" encoding="UTF-8"?>\n'
+                b'<eMuster16><muster16Id>%09d</muster16Id></eMuster16>' % nr
+            )
+        return path
+
+    def _submit(self, xml_paths, **kwargs):
+        header_params = {'user': '123456789', 'apoik': '123456789', 'test': 'false', 'password': 'secret'}
+        return submit_in_batches(self.server.url, header_params, xml_paths,
+            version     = '01.10',
+            max_files   = 2,
+            verify_cert = False,
+            **kwargs
+        )
+
+    def test_can_merge_reports_of_all_batches(self):
+        paths = [self._create_prescription(nr) for nr in range(1, 6)]
+        result = self._submit(paths, first_snd_id=7)
+
+        assert_equals(0, result.value)
+        assert_length(3, result.batches)
+        assert_equals([0, 1, 2], [batch['batch'] for batch in result.batches])
+        # every request needs its own "sndId"
+        assert_equals(['7', '8', '9'], [batch['sndId'] for batch in result.batches])
+        assert_equals([2, 2, 1], [batch['files'] for batch in result.batches])
+        for batch in result.batches:
+            assert_equals(0, batch['rc'])
+            assert_not_none(batch['rzLieferId'])
+
+        file_map = {report['avsId']: (report['path'], report['batch']) for report in result.files}
+        assert_equals({
+            '1': (paths[0], 0),
+            '2': (paths[1], 0),
+            '3': (paths[2], 1),
+            '4': (paths[3], 1),
+            '5': (paths[4], 2),
+        }, file_map)
+
+    def test_reports_invalid_input_files_per_batch(self):
+        valid_path = self._create_prescription(1)
+        invalid_path = os.path.join(self.tempdir, 'invalid.xml')
+        with open(invalid_path, 'wb') as fp:
+            fp.write(b'<foo>')
+        other_path = self._create_prescription(2)
+        result = self._submit([valid_path, invalid_path, other_path])
+
+        assert_equals(10, result.value)
+        first, second = result.batches
+        assert_equals(10, first['rc'])
+        assert_contains('invalid.xml', first['message'])
+        assert_none(first['rzLieferId'])
+        assert_equals(0, second['rc'])
+        assert_equals([10, 10, 0], [report['rc'] for report in result.files])
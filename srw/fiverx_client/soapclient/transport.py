@@ -0,0 +1,121 @@
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .compression import CONTENT_ENCODINGS
+from .retry import Deadline, RetryBudget, RetryPolicy
+
+
+__all__ = [
+    'get_default_transport',
+    'Transport',
+]
+
+DEFAULT_POOL_SIZE = 10
+# number of per-host pools kept by urllib3 (requests' default), the client
+# only talks to a few hosts so it is independent of "pool_size"
+DEFAULT_POOL_CONNECTIONS = 10
+# seconds, "read" is the maximum time without receiving any data
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 120
+
+class Transport(object):
+    """HTTP transport which keeps (TLS) connections alive so subsequent
+    requests to the same RZ can reuse them.
+
+    "pool_size" limits the number of idle connections kept per host. With
+    "pool_block" enabled at most "pool_size" concurrent connections per host
+    are opened (additional requests wait for a free connection).
+
+    Every request uses the (connect, read) "timeout" unless the caller
+    passes a different one. "deadline" (seconds, optional) limits the total
+    time of an operation including retries and reading the response body
+    (unless the caller streams the response, see "new_deadline()"). Idempotent
+    operations are retried according to "retry_policy".
+
+    "request_compression" ("gzip" or "deflate", optional) compresses request
+    bodies. Only enable it if the RZ accepts a compressed "Content-Encoding".
+
+    A transport can be shared between threads."""
+    def __init__(self, *, pool_size=DEFAULT_POOL_SIZE, pool_block=False, verify_cert=True, hostname=None,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT, deadline=None,
+                 retry_policy=None, request_compression=None):
+        if request_compression and (request_compression not in CONTENT_ENCODINGS):
+            raise ValueError(f'unsupported request compression: {request_compression!r}')
+        self.verify_cert = verify_cert
+        self.hostname = hostname
+        self.timeout = (connect_timeout, read_timeout)
+        self.deadline = deadline
+        if retry_policy is None:
+            retry_policy = RetryPolicy(budget=RetryBudget())
+        self.retry_policy = retry_policy
+        self.request_compression = request_compression or None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections = DEFAULT_POOL_CONNECTIONS,
+            pool_maxsize     = pool_size,
+            pool_block       = pool_block,
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @classmethod
+    def from_settings(cls, settings, **kwargs):
+        pool_size = settings.get('pool_size')
+        if pool_size:
+            kwargs.setdefault('pool_size', int(pool_size))
+        kwargs.setdefault('hostname', settings.get('hostname'))
+        for key in ('connect_timeout', 'read_timeout', 'deadline'):
+            value = settings.get(key)
+            if value:
+                kwargs.setdefault(key, float(value))
+        max_retries = settings.get('max_retries')
+        retry_budget = settings.get('retry_budget')
+        if max_retries or retry_budget:
+            budget = RetryBudget(float(retry_budget)) if retry_budget else RetryBudget()
+            policy = RetryPolicy(max_retries=int(max_retries or 2), budget=budget)
+            kwargs.setdefault('retry_policy', policy)
+        request_compression = settings.get('request_compression')
+        if request_compression:
+            kwargs.setdefault('request_compression', request_compression.strip().lower())
+        return cls(**kwargs)
+
+    def new_deadline(self):
+        "return a Deadline for a new operation (or None if there is no deadline)"
+        if not self.deadline:
+            return None
+        return Deadline(self.deadline)
+
+    def post(self, url, data=None, *, headers=None, verify_cert=None, hostname=None, **kwargs):
+        if verify_cert is None:
+            verify_cert = self.verify_cert
+        hostname = hostname or self.hostname
+        headers = dict(headers or ())
+        if hostname:
+            headers['Host'] = hostname
+        kwargs.setdefault('allow_redirects', False)
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.post(url, data=data, headers=headers, verify=verify_cert, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
+
+def get_default_transport():
+    global _default_transport
+    if _default_transport is None:
+        with _default_transport_lock:
+            if _default_transport is None:
+                _default_transport = Transport()
+    return _default_transport
@@ -0,0 +1,96 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+from io import StringIO
+import json
+import os
+import shutil
+import tempfile
+
+from pythonic_testcase import *
+
+from ..batch_client import run_batch, run_manifest_entry
+from ..mock_server import MockConfig, MockFiverxServer
+from ..soapclient import ladeRzVersion, sendeRezepte
+
+
+class BatchClientTest(PythonicTestCase):
+    def _run(self, line):
+        subcommands = {'ladeRzVersion': ladeRzVersion}
+        return run_manifest_entry(line, settings={}, global_args={}, subcommand_modules=subcommands)
+
+    def test_rejects_invalid_json(self):
+        record = self._run('{"command": ')
+        assert_equals(10, record['rc'])
+        assert_none(record['command'])
+
+    def test_rejects_unknown_commands(self):
+        record = self._run('{"id": "foo", "command": "doesNotExist"}')
+        assert_equals(10, record['rc'])
+        assert_equals('foo', record['id'])
+        assert_equals('unknown command', record['message'])
+
+
+class RunBatchTest(PythonicTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = MockFiverxServer(('127.0.0.1', 0), MockConfig(quiet=True))
+        self.server.serve_in_thread()
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tempdir)
+        super().tearDown()
+
+    def _run_batch(self, entries):
+        manifest_path = os.path.join(self.tempdir, 'manifest.jsonl')
+        with open(manifest_path, 'w', encoding='utf-8') as manifest_fp:
+            for entry in entries:
+                manifest_fp.write(json.dumps(entry) + '\n')
+        settings = {
+            'url': self.server.url,
+            'soap_user': '123456789',
+            'soap_password': 'secret',
+        }
+        global_args = {
+            '--api-version': '01.10',
+            '--chunked': False,
+            '--no-cert-verification': False,
+            '--test': False,
+        }
+        subcommands = {'ladeRzVersion': ladeRzVersion, 'sendeRezepte': sendeRezepte}
+        output = StringIO()
+        rc = run_batch(manifest_path, settings, global_args, subcommands, output=output)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        return rc, records
+
+    def test_can_run_commands(self):
+        rc, records = self._run_batch([
+            {'id': 'first', 'command': 'ladeRzVersion'},
+            {'id': 'second', 'command': 'ladeRzVersion'},
+        ])
+        assert_equals(0, rc)
+        assert_equals(['first', 'second'], [record['id'] for record in records])
+        assert_equals([0, 0], [record['rc'] for record in records])
+        assert_contains('<rzeVersion ', records[0]['payload'])
+
+    def test_continues_after_failing_entries(self):
+        invalid_path = os.path.join(self.tempdir, 'invalid.xml')
+        with open(invalid_path, 'wb') as xml_fp:
+            xml_fp.write(b'<foo>')
+        missing_path = os.path.join(self.tempdir, 'missing.xml')
+        rc, records = self._run_batch([
+            {'id': 'invalid', 'command': 'sendeRezepte', 'args': [invalid_path]},
+            {'id': 'missing', 'command': 'sendeRezepte', 'args': [missing_path]},
+            {'id': 'ok', 'command': 'ladeRzVersion'},
+        ])
+        assert_equals(10, rc)
+        invalid, missing, ok = records
+        assert_equals(10, invalid['rc'])
+        assert_contains('invalid.xml: invalid XML', invalid['message'])
+        assert_equals(1, missing['rc'])
+        assert_contains('FileNotFoundError', missing['message'])
+        assert_equals(0, ok['rc'])
+        assert_equals(3, ok['line'])
@@ -0,0 +1,15 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+from pythonic_testcase import *
+
+from ..benchmark import BENCHMARKS, IMPORT_BENCHMARKS, run_benchmarks
+
+
+class BenchmarkTest(PythonicTestCase):
+    def test_can_run_all_benchmarks(self):
+        reports = list(run_benchmarks([1], repeat=1))
+        assert_length(len(BENCHMARKS) + len(IMPORT_BENCHMARKS), reports)
+        for report in reports:
+            assert_equals(1, report['size'])
+            assert_true(report['seconds'] > 0)
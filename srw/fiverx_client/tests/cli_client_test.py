@@ -0,0 +1,25 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+import subprocess
+import sys
+
+from pythonic_testcase import *
+
+
+HEAVY_MODULES = ('lxml', 'pkg_resources', 'requests', 'soapfish', 'srw.fiverx_client.soapclient.baseutils')
+
+class ClientStartupTest(PythonicTestCase):
+    def test_help_does_not_import_heavy_modules(self):
+        code = (
+            'import sys\n'
+            'from srw.fiverx_client.cli_client import client_main\n'
+            'try:\n'
+            '    client_main(["srwlink-client", "--help"])\n'
+            'except SystemExit:\n'
+            '    pass\n'
+            f'print("imported:" + ",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n'
+        )
+        output = subprocess.check_output([sys.executable, '-c', code], universal_newlines=True)
+        imported_modules = output.strip().splitlines()[-1]
+        assert_equals('imported:', imported_modules)
@@ -0,0 +1,59 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+from io import BytesIO
+import os
+import shutil
+import tempfile
+
+from pythonic_testcase import *
+
+from ..extract_payload import iter_capture_payload, parse_payload, write_payload
+
+
+version_xml = (
+    b"<?xml version='1.0' encoding='UTF-8'?>\n"
+    b'<rzeParamVersion xmlns="http://fiverx.de/spec/abrechnungsservice">'
+    b'<versionNr>%s</versionNr>'
+    b'</rzeParamVersion>'
+)
+
+class ExtractPayloadTest(PythonicTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+        super().tearDown()
+
+    def _capture(self, payload):
+        escaped_payload = payload.replace(b'&', b'&amp;').replace(b'<', b'&lt;').replace(b'>', b'&gt;')
+        capture_path = os.path.join(self.tempdir, 'capture.xml')
+        with open(capture_path, 'wb') as capture_fp:
+            capture_fp.write(
+                b'<senv:Envelope xmlns:senv="http://schemas.xmlsoap.org/soap/envelope/"><senv:Body>'
+                b'<fiverx:sendeRezepteResponse xmlns:fiverx="http://fiverx.de/spec/abrechnungsservice/types">'
+                b'<result>' + escaped_payload + b'</result>'
+                b'</fiverx:sendeRezepteResponse></senv:Body></senv:Envelope>'
+            )
+        return capture_path
+
+    def test_can_parse_payload(self):
+        capture_path = self._capture(version_xml % b'01.10')
+        result = parse_payload(iter_capture_payload(capture_path, chunk_size=16), version='01.10')
+        assert_true(result)
+        assert_equals('01.10', result.validated_document.versionNr.text)
+
+    def test_can_write_payload_while_reading(self):
+        capture_path = self._capture(version_xml % b'01.10')
+        output = BytesIO()
+        result = write_payload(iter_capture_payload(capture_path, chunk_size=16), output, version='01.10')
+        assert_true(result)
+        assert_equals(b'\n' + (version_xml % b'01.10').split(b'\n', 1)[1], output.getvalue())
+
+    def test_reports_invalid_payload(self):
+        capture_path = self._capture(version_xml % b'1.1')
+        result = write_payload(iter_capture_payload(capture_path), BytesIO(), version='01.10')
+        assert_false(result)
+        assert_length(1, result.errors)
@@ -0,0 +1,61 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+from datetime import datetime as DateTime, timezone
+import os
+import shutil
+import tempfile
+
+from pythonic_testcase import *
+
+from ..fetch_checkpoint import FetchCheckpoint, IDS_FILENAME, SINCE_OVERLAP
+
+
+class FetchCheckpointTest(PythonicTestCase):
+    def setUp(self):
+        super().setUp()
+        self.export_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.export_dir)
+        super().tearDown()
+
+    def test_empty_checkpoint(self):
+        checkpoint = FetchCheckpoint.load(self.export_dir)
+        assert_none(checkpoint.resume_since())
+        assert_false(checkpoint.is_stored(42))
+
+    def test_remembers_stored_ids_and_last_complete_run(self):
+        checkpoint = FetchCheckpoint.load(self.export_dir)
+        checkpoint.mark_stored(42)
+        checkpoint.close()
+        # ids are persisted even if the run was not completed
+        checkpoint = FetchCheckpoint.load(self.export_dir)
+        assert_true(checkpoint.is_stored(42))
+        assert_none(checkpoint.resume_since())
+
+        started_at = DateTime(2020, 5, 1, 10, 30, tzinfo=timezone.utc)
+        checkpoint.mark_run_completed(started_at)
+        checkpoint = FetchCheckpoint.load(self.export_dir)
+        assert_equals(started_at - SINCE_OVERLAP, checkpoint.resume_since())
+        assert_true(checkpoint.is_stored('42'))
+        assert_false(checkpoint.is_stored(43))
+
+    def test_removes_ids_which_are_older_than_the_next_run(self):
+        ids_path = os.path.join(self.export_dir, IDS_FILENAME)
+        # stored in 1970 (and an id without timestamp from older versions)
+        with open(ids_path, 'w', encoding='utf-8') as ids_fp:
+            ids_fp.write('41\t0\n40\n')
+        checkpoint = FetchCheckpoint.load(self.export_dir)
+        assert_true(checkpoint.is_stored(40))
+        assert_true(checkpoint.is_stored(41))
+        checkpoint.mark_stored(42)
+
+        checkpoint.mark_run_completed(DateTime.now(timezone.utc))
+        assert_false(checkpoint.is_stored(41))
+        checkpoint = FetchCheckpoint.load(self.export_dir)
+        assert_false(checkpoint.is_stored(40))
+        assert_false(checkpoint.is_stored(41))
+        assert_true(checkpoint.is_stored(42))
+        with open(ids_path, 'r', encoding='utf-8') as ids_fp:
+            assert_length(1, ids_fp.readlines())
@@ -0,0 +1,62 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+from collections import Counter
+import itertools
+
+from pythonic_testcase import *
+
+from ..cli_client import submit_soap_request
+from ..loadtest import ERROR_EXCEPTION, run_load_test, LoadTestReport
+from ..mock_server import MockConfig, MockFiverxServer
+from .. import soapclient
+
+
+HEADER_PARAMS = {'user': '123456789', 'password': 'secret', 'apoik': '123456789', 'test': 'true'}
+
+class LoadTestTest(PythonicTestCase):
+    def test_can_compute_latency_percentiles(self):
+        latencies = [i / 1000 for i in range(1, 101)]
+        report = LoadTestReport(latencies, Counter({0: 98, 21: 2}), elapsed=2)
+        assert_equals(0.050, report.percentile(50))
+        assert_equals(0.095, report.percentile(95))
+        assert_equals(0.099, report.percentile(99))
+        assert_equals(0.100, report.max_latency)
+        assert_equals(2, report.nr_errors)
+        assert_equals(49, report.throughput)
+        assert_equals({'21': 2}, report.as_dict()['errors'])
+
+    def test_respects_rate(self):
+        counter = itertools.count()
+        report = run_load_test(lambda: next(counter) % 2 and 15, duration=0.5, concurrency=4, rate=20)
+        assert_equals(10, report.nr_requests)
+        assert_equals({0: 5, 15: 5}, dict(report.exit_codes))
+
+    def test_counts_exceptions_as_errors(self):
+        counter = itertools.count()
+        def send():
+            if next(counter) % 2:
+                raise ConnectionError('connection refused')
+            return 0
+
+        report = run_load_test(send, duration=0.5, concurrency=2, rate=20)
+        assert_equals(10, report.nr_requests)
+        assert_equals({0: 5, ERROR_EXCEPTION: 5}, dict(report.exit_codes))
+        assert_length(10, report.latencies)
+
+    def test_can_run_against_mock_server(self):
+        server = MockFiverxServer(('127.0.0.1', 0), MockConfig(quiet=True, error_rate=0.5))
+        server.serve_in_thread()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        cmd_module = soapclient.ladeRzVersion
+        soap_bytes = cmd_module.build_soap_request(HEADER_PARAMS, {}, version='01.10').soap_bytes
+        def send():
+            result = submit_soap_request(server.url, soap_bytes, cmd_module.response_payload_xpath,
+                quiet=True, as_result=True)
+            return result.value
+
+        report = run_load_test(send, duration=0.5, concurrency=2)
+        assert_true(report.nr_requests > 0)
+        assert_true(report.exit_codes[0] > 0)
+        assert_equals(set(), set(report.exit_codes) - {0, 21, 22, 23})
@@ -0,0 +1,65 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+import json
+from urllib.request import Request, urlopen
+
+from lxml import etree
+from pythonic_testcase import *
+
+from ..mock_server import MockConfig, MockFiverxServer, RESPONSE_BUILDERS, soap_response
+from ..lib import Timings
+from ..soapclient import extract_payload_bytes, parse_soap_envelope, send_request, Transport, validate_payload
+from ..soapclient.request import F
+
+
+class MockServerTest(PythonicTestCase):
+    def setUp(self):
+        self.server = MockFiverxServer(('127.0.0.1', 0), MockConfig(quiet=True))
+        self.server.serve_in_thread()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_generates_schema_valid_responses(self):
+        request_payload = F.rzeLeistung(F.apoIk('123456789'))
+        config = MockConfig(records=300)
+        for operation, build_response in RESPONSE_BUILDERS.items():
+            payload = build_response(request_payload, config)
+            payload_bytes = etree.tostring(payload, xml_declaration=True, encoding='UTF-8')
+            for version in ('01.08', '01.10'):
+                result = validate_payload(payload_bytes, version=version)
+                assert_true(result, message=f'{operation} ({version}): {result.errors}')
+
+    def test_can_answer_soap_request(self):
+        request_bytes = soap_response('ladeRzVersion', F.rzeLadeRzVersion(F.apoIk('123456789')))
+        request_bytes = request_bytes.replace(b'ladeRzVersionResponse', b'ladeRzVersion')
+        with urlopen(Request(self.server.url, data=request_bytes, method='POST')) as response:
+            response_bytes = response.read()
+        root = parse_soap_envelope(response_bytes)
+        payload = extract_payload_bytes(root, '//fiverx:ladeRzVersionResponse/result')
+        assert_true(validate_payload(payload, version='01.10'))
+
+    def test_can_export_prescriptions(self):
+        self.server.config.prescriptions = 3
+        export_url = self.server.url + 'internal/export-prescriptions/'
+        with urlopen(Request(export_url, data=b'', method='POST')) as response:
+            data = json.loads(response.read())
+        assert_length(3, data['prescriptions'])
+
+    def test_accepts_compressed_requests(self):
+        self.server.config.gzip = True
+        request_bytes = soap_response('ladeRzVersion', F.rzeLadeRzVersion(F.apoIk('123456789')))
+        request_bytes = request_bytes.replace(b'ladeRzVersionResponse', b'ladeRzVersion')
+        timings = Timings()
+        for chunked in (False, True):
+            with Transport(request_compression='gzip') as transport:
+                response = send_request(self.server.url, request_bytes, chunked, transport=transport, timings=timings)
+            assert_equals(200, response.status_code)
+            assert_equals('gzip', response.headers['Content-Encoding'])
+            assert_equals(len(request_bytes), timings.byte_counts['request_bytes'])
+            assert_true(timings.byte_counts['request_bytes_sent'] < len(request_bytes))
+            assert_true(timings.byte_counts['response_bytes_received'] < timings.byte_counts['response_bytes'])
+            root = parse_soap_envelope(response.content)
+            assert_not_none(extract_payload_bytes(root, '//fiverx:ladeRzVersionResponse/result'))
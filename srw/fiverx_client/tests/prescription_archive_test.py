@@ -0,0 +1,49 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+import os
+import shutil
+import tempfile
+import zipfile
+
+from pythonic_testcase import *
+
+from ..prescription_archive import PrescriptionArchive, read_archive_index, read_archived_prescription
+
+
+class PrescriptionArchiveTest(PythonicTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'export.zip')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+        super().tearDown()
+
+    def test_can_read_prescriptions_via_index(self):
+        stored_ids = []
+        with PrescriptionArchive(self.path) as archive:
+            for i in range(5):
+                archive.add('%02d.xml' % i, b'<xml>%d</xml>' % i, id=i, pharmacy_id='123456789',
+                    on_stored=lambda i=i: stored_ids.append(i))
+            assert_equals([], stored_ids)
+        assert_equals(list(range(5)), stored_ids)
+        assert_equals(['export.zip'], os.listdir(self.tempdir))
+
+        index = read_archive_index(self.path)
+        assert_equals([0, 1, 2, 3, 4], [entry['id'] for entry in index])
+        assert_equals('123456789', index[3]['pharmacy_id'])
+        with open(self.path, 'rb') as fp:
+            assert_equals(b'<xml>3</xml>', read_archived_prescription(fp, index[3]['offset']))
+        with zipfile.ZipFile(self.path) as zip_file:
+            assert_equals(b'<xml>3</xml>', zip_file.read(index[3]['name']))
+
+    def test_discards_archive_after_error(self):
+        stored_ids = []
+        with assert_raises(ValueError):
+            with PrescriptionArchive(self.path) as archive:
+                archive.add('foo.xml', b'<xml />', id=1, on_stored=lambda: stored_ids.append(1))
+                raise ValueError()
+        assert_equals([], os.listdir(self.tempdir))
+        assert_equals([], stored_ids)
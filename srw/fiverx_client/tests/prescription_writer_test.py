@@ -0,0 +1,37 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+import os
+import shutil
+import tempfile
+
+from pythonic_testcase import *
+
+from ..prescription_writer import PrescriptionWriter
+
+
+class PrescriptionWriterTest(PythonicTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+        super().tearDown()
+
+    def test_writes_all_files_without_leaving_temporary_files(self):
+        with PrescriptionWriter(self.tempdir, workers=3, queue_size=2, sync_every=5) as writer:
+            for i in range(20):
+                writer.submit('%02d.xml' % i, b'<xml>%d</xml>' % i)
+
+        filenames = sorted(os.listdir(self.tempdir))
+        assert_equals(['%02d.xml' % i for i in range(20)], filenames)
+        with open(os.path.join(self.tempdir, '07.xml'), 'rb') as fp:
+            assert_equals(b'<xml>7</xml>', fp.read())
+
+    def test_close_raises_write_errors(self):
+        missing_dir = os.path.join(self.tempdir, 'missing')
+        writer = PrescriptionWriter(missing_dir, workers=1)
+        writer.submit('foo.xml', b'<xml />')
+        with assert_raises(OSError):
+            writer.close()
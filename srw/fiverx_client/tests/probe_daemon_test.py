@@ -0,0 +1,43 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+from pythonic_testcase import *
+
+from ..lib import Timings
+from ..mock_server import MockConfig, MockFiverxServer
+from ..probe_daemon import ProbeMetrics, run_probe
+from .. import soapclient
+
+
+class ProbeMetricsTest(PythonicTestCase):
+    def test_can_render_prometheus_metrics(self):
+        metrics = ProbeMetrics(buckets=(0.1, 1))
+        timings = Timings()
+        timings.add('send', 0.25)
+        metrics.observe('ladeRzVersion', 0, 0.5, timings=timings, timestamp=1600000000)
+        metrics.observe('ladeRzVersion', 21, 0.05)
+
+        lines = metrics.render().splitlines()
+        assert_contains('srwlink_probe_duration_seconds_bucket{probe="ladeRzVersion",le="0.1"} 1', lines)
+        assert_contains('srwlink_probe_duration_seconds_bucket{probe="ladeRzVersion",le="1"} 2', lines)
+        assert_contains('srwlink_probe_duration_seconds_bucket{probe="ladeRzVersion",le="+Inf"} 2', lines)
+        assert_contains('srwlink_probe_duration_seconds_count{probe="ladeRzVersion"} 2', lines)
+        assert_contains('srwlink_probe_phase_seconds{probe="ladeRzVersion",phase="send"} 0.25', lines)
+        assert_contains('srwlink_probe_errors_total{probe="ladeRzVersion",rc="21"} 1', lines)
+        assert_contains('srwlink_probe_last_exit_code{probe="ladeRzVersion"} 21', lines)
+        assert_contains('srwlink_probe_last_success_timestamp_seconds{probe="ladeRzVersion"} 1600000000', lines)
+
+
+class RunProbeTest(PythonicTestCase):
+    def test_can_run_probe_against_mock_server(self):
+        server = MockFiverxServer(('127.0.0.1', 0), MockConfig(quiet=True))
+        server.serve_in_thread()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        settings = {'url': server.url, 'soap_user': '123456789', 'soap_password': 'secret-password'}
+        global_args = {'--api-version': '01.10', '--chunked': False, '--no-cert-verification': False, '--test': False}
+        metrics = ProbeMetrics()
+
+        rc = run_probe('ladeRzVersion', soapclient.ladeRzVersion, settings, global_args, metrics=metrics)
+        assert_equals(0, rc)
+        assert_contains('srwlink_probe_last_exit_code{probe="ladeRzVersion"} 0', metrics.render().splitlines())
@@ -0,0 +1,18 @@
+# -*- coding: UTF-8 -*-
+# SPDX-License-Identifier: MIT
+
+from pythonic_testcase import *
+
+from ..utils import prettify_xml, strip_xml_declaration
+
+
+class UtilsTest(PythonicTestCase):
+    def test_can_strip_xml_declaration_from_bytes(self):
+        xml_bytes = b'<foo/>'
+        assert_equals(b'<foo/>', strip_xml_declaration(b' \n<?xml version="1.0" encoding="ISO-8859-15"?>\n<foo/>'))
+        assert_equals(b'<foo/>', strip_xml_declaration(b'\n<foo/>'))
+        assert_is(xml_bytes, strip_xml_declaration(xml_bytes))
+
+    def test_can_prettify_bytes_in_any_encoding(self):
+        xml_bytes = b'\n<?xml version="1.0" encoding="ISO-8859-15"?>\n<foo><bar>\xa4</bar></foo>'
+        assert_equals('<foo>\n  <bar>€</bar>\n</foo>\n', prettify_xml(xml_bytes))
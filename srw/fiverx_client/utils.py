@@ -2,18 +2,16 @@
 import re
 
 from docopt import docopt
-from lxml import etree
-from soapfish.lib.attribute_dict import AttrDict
 
 
 __all__ = [
     'EREZEPT',
     'MUSTER16',
-    'decode_xml_bytes',
     'parse_command_args',
     'pprint_xml',
     'prettify_xml',
     'PREZEPT',
+    'strip_xml_declaration',
     'strip_xml_encoding',
     'textcolor',
 ]
@@ -31,29 +29,37 @@ def parse_command_args(doc_str, command_args, global_args):
     return args
 
 def prettify_xml(xml):
-    if not isinstance(xml, str):
+    # lxml is imported lazily so the CLI starts faster if no XML is printed
+    from lxml import etree
+
+    if etree.iselement(xml):
+        # trees built by lxml (e.g. SOAP requests) can be printed directly
+        return etree.tostring(xml, pretty_print=True, encoding='unicode')
+    if isinstance(xml, str):
+        xml = strip_xml_encoding(xml)
+    elif isinstance(xml, bytes):
+        # lxml detects the encoding (XML declaration) itself
+        xml = xml.lstrip()
+    else:
         xml = etree.tostring(xml)
-    xml_str = strip_xml_encoding(xml)
     # lxml FAQ: "Why doesn't the pretty_print option reformat my XML output?"
     # https://lxml.de/FAQ.html#why-doesn-t-the-pretty-print-option-reformat-my-xml-output
     parser = etree.XMLParser(remove_blank_text=True)
-    xml_doc = etree.fromstring(xml_str, parser)
+    xml_doc = etree.fromstring(xml, parser)
     indented_xml = etree.tostring(xml_doc, pretty_print=True, encoding='unicode')
     return indented_xml
 
 def pprint_xml(xml_str):
     print(prettify_xml(xml_str))
 
-def decode_xml_bytes(xml_bytes):
-    xml_decl_pattern = b'^<\?xml [^>]*?encoding="([^"]+)".*?>\s*'
-    regex_xml_declaration = re.compile(xml_decl_pattern)
-    match_decl = regex_xml_declaration.search(xml_bytes)
-    if match_decl:
-        encoding = match_decl.group(1).decode('ascii')
-        xml_str = xml_bytes.decode(encoding)
-    else:
-        xml_str = xml_bytes.decode('utf8')
-    return xml_str
+def strip_xml_declaration(xml_bytes):
+    """Return "xml_bytes" without XML declaration (and leading whitespace).
+    Needed if the bytes were re-encoded (e.g. a payload extracted from a SOAP
+    envelope) so the declared encoding might be wrong."""
+    end = _xml_declaration.match(xml_bytes).end()
+    return xml_bytes[end:] if end else xml_bytes
+
+_xml_declaration = re.compile(rb'\s*(<\?xml[^>]*\?>\s*)?')
 
 def strip_xml_encoding(xml_str):
     # lxml will complain when loading a ("unicode") string with XML encoding declaration
@@ -74,8 +80,12 @@ except ImportError:
     colorama = None
     is_colorama_available = False
     class TermColor:
-        Fore = AttrDict({'GREEN': None, 'RED': None, 'YELLOW': None})
-        Style = AttrDict({'BRIGHT': None})
+        class Fore:
+            GREEN = None
+            RED = None
+            YELLOW = None
+        class Style:
+            BRIGHT = None
 
 def is_colorama_initialized():
     if not is_colorama_available: